@@ -7,22 +7,29 @@ import streamlit as st
 import ollama
 import psutil
 import time
+import logging
 from rag_agent import RAGAgent
+from conversation import ConversationSession
+from feedback import record_feedback
+from ollama_runtime import ollama_options, parse_keep_alive
+from telemetry import configure_logging, start_metrics_server, log_event
 import config
 
+configure_logging()
+start_metrics_server()
+
 # --- Pomoćne Funkcije ---
 
 def get_ollama_models():
     """Pribavlja listu preuzetih modela iz Ollama na robustan način."""
     try:
         models_data = ollama.list().get('models', [])
-        print(f"DEBUG: Raw Ollama models data: {models_data}")  # Debug output
         # Filtriramo samo modele koji imaju 'name' ključ da bismo izbegli greške
         models = [model['name'] for model in models_data if 'name' in model]
-        print(f"DEBUG: Extracted model names: {models}")  # Debug output
+        log_event("ollama_models", logging.DEBUG, models=models)
         return models
     except Exception as e:
-        print(f"DEBUG: Error getting Ollama models: {e}")  # Debug output
+        log_event("ollama_models_error", logging.ERROR, error=str(e))
         st.error(f"Nije moguće povezati se sa Ollama: {e}")
         return []
 
@@ -39,6 +46,34 @@ def format_context(docs):
         context_str += f"> {content_preview}\n\n"
     return context_str
 
+def submit_feedback(index: int, rating: int):
+    """Upisuje ocenu odgovora (i ispravku, ako je uneta) u log ocena."""
+    message = st.session_state.messages[index]
+    correction = st.session_state.get(f"correction_{index}", "").strip()
+    record_feedback(
+        question=message["feedback"]["question"],
+        point_ids=message["feedback"]["point_ids"],
+        doc_ids=message["feedback"]["doc_ids"],
+        answer=message["content"],
+        rating=rating,
+        correction=correction,
+        model=st.session_state.selected_llm,
+    )
+    message["rated"] = {1: "👍", -1: "👎"}.get(rating, "✏️")
+    log_event("feedback", rating=rating, correction=bool(correction), points=len(message["feedback"]["point_ids"]))
+
+def render_feedback(index: int, message: dict):
+    """Dugmad za ocenu ispod odgovora; posle ocene prikazuje samo potvrdu."""
+    if message.get("rated"):
+        st.caption(f"Hvala na oceni {message['rated']}")
+        return
+    col_up, col_down, _ = st.columns([1, 1, 10])
+    col_up.button("👍", key=f"up_{index}", on_click=submit_feedback, args=(index, 1))
+    col_down.button("👎", key=f"down_{index}", on_click=submit_feedback, args=(index, -1))
+    with st.expander("Ispravka odgovora"):
+        st.text_area("Tačan odgovor ili napomena:", key=f"correction_{index}")
+        st.button("Pošalji ispravku", key=f"correct_{index}", on_click=submit_feedback, args=(index, 0))
+
 # --- Podešavanje Stranice i Session State ---
 st.set_page_config(page_title="Drveni Advokat", layout="wide")
 
@@ -46,6 +81,8 @@ if 'agent' not in st.session_state:
     st.session_state.agent = None
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "Dobar dan! Molim vas odaberite podešavanja u meniju sa leve strane i kliknite na 'Inicijalizuj Agenta'."}]
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationSession()
 if "selected_llm" not in st.session_state:
     st.session_state.selected_llm = config.DEFAULT_LLM_MODEL
 if "selected_device" not in st.session_state:
@@ -84,18 +121,30 @@ with st.sidebar:
     )
     st.session_state.selected_device = selected_device
 
+    # Parametri Ollama modela (primenjuju se pri inicijalizaciji agenta)
+    with st.expander("Ollama parametri"):
+        keep_alive = st.text_input("Keep alive (npr. 30m, -1 = zauvek):", value=str(config.OLLAMA_KEEP_ALIVE))
+        num_ctx = st.number_input("Kontekst prozor (num_ctx):", min_value=0, step=512, value=config.OLLAMA_NUM_CTX)
+        num_thread = st.number_input("CPU niti (num_thread, 0 = auto):", min_value=0, step=1, value=config.OLLAMA_NUM_THREAD)
+        num_predict = st.number_input("Najviše tokena odgovora (num_predict):", min_value=0, step=128, value=config.OLLAMA_NUM_PREDICT)
+
     # Dugme za inicijalizaciju/re-inicijalizaciju agenta
     if st.button("Inicijalizuj Agenta", type="primary"):
         with st.spinner(f"Inicijalizacija sa modelom '{st.session_state.selected_llm}' na '{st.session_state.selected_device.upper()}'..."):
             try:
+                if st.session_state.agent:
+                    st.session_state.agent.close()
                 st.session_state.agent = RAGAgent(
                     llm_model=st.session_state.selected_llm,
                     embedding_model=config.DEFAULT_EMBEDDING_MODEL,
-                    device=st.session_state.selected_device
+                    device=st.session_state.selected_device,
+                    options=ollama_options(int(num_ctx), int(num_thread), int(num_predict)),
+                    keep_alive=parse_keep_alive(keep_alive),
                 )
                 st.success("Agent je uspešno inicijalizovan!", icon="✅")
                 # Resetujemo chat pri promeni agenta
                 st.session_state.messages = [{"role": "assistant", "content": "Agent je spreman. Kako vam mogu pomoći?"}]
+                st.session_state.conversation.reset()
                 st.rerun() # Ponovo pokrećemo skriptu da se osveži interfejs
             except Exception as e:
                 st.error(f"Greška pri inicijalizaciji: {e}", icon="🔥")
@@ -111,12 +160,14 @@ with st.sidebar:
 st.title("Drveni Advokat - RAG Sistem")
 
 # Prikaz istorije razgovora
-for message in st.session_state.messages:
+for index, message in enumerate(st.session_state.messages):
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
         if "context" in message:
             with st.expander("Prikaži Kontekst Korišćen za Odgovor"):
                 st.info(format_context(message["context"]))
+        if "feedback" in message:
+            render_feedback(index, message)
 
 # Polje za unos
 if prompt := st.chat_input("Postavite vaše pitanje..."):
@@ -135,7 +186,12 @@ if prompt := st.chat_input("Postavite vaše pitanje..."):
             with st.status("Pretražujem bazu znanja...", expanded=True) as status:
                 try:
                     # Strimujemo odgovor
-                    stream, source_docs = st.session_state.agent.stream_ask(prompt)
+                    # Istorija bez pozdravne poruke i bez trenutnog pitanja
+                    stream, source_docs = st.session_state.agent.stream_ask(
+                        prompt,
+                        history=st.session_state.messages[1:-1],
+                        session=st.session_state.conversation,
+                    )
                     status.update(label="Pronađen kontekst. Generišem odgovor...", state="running")
                     
                     for chunk in stream:
@@ -147,20 +203,35 @@ if prompt := st.chat_input("Postavite vaše pitanje..."):
                     if source_docs:
                         sources_text = "\n\n**Korišćeni izvori:**\n" + "\n".join([f"- `{file}`" for file in source_docs])
                         full_response += sources_text
+                        # Slični predmeti za najrelevantniji izvor (jedno čitanje iz kolekcije dokumenata)
+                        similar = st.session_state.agent.similar_cases(source_file=source_docs[0], limit=5)
+                        if similar:
+                            full_response += "\n\n**Slični predmeti:**\n" + "\n".join(
+                                [f"- `{case['source_file']}` ({case['score']:.2f})" for case in similar]
+                            )
                         message_placeholder.markdown(full_response)
                         
                     status.update(label="Odgovor generisan!", state="complete", expanded=False)
                     
-                    # Čuvamo odgovor i kontekst u istoriji
+                    # Čuvamo odgovor i kontekst u istoriji, uz pronađene tačke za ocenu odgovora
+                    conversation = st.session_state.conversation
                     st.session_state.messages.append({
                         "role": "assistant",
                         "content": full_response,
-                        "context": source_docs
+                        "context": source_docs,
+                        "feedback": {
+                            "question": prompt,
+                            "point_ids": [str(point_id) for point_id in conversation.point_ids if point_id is not None],
+                            "doc_ids": list(conversation.doc_ids),
+                        },
                     })
 
                 except Exception as e:
                     st.error(f"Došlo je do greške: {e}", icon="🔥")
 
+            if st.session_state.messages[-1]["role"] == "assistant" and st.session_state.messages[-2].get("content") == prompt:
+                render_feedback(len(st.session_state.messages) - 1, st.session_state.messages[-1])
+
 # Petlja za osvežavanje statusa sistema
 while True:
     cpu_usage.metric(label="CPU Zauzeće", value=f"{psutil.cpu_percent()}%")
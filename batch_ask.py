@@ -0,0 +1,149 @@
+# batch_ask.py (Paketna obrada pitanja nad arhivom)
+#
+# Za stotine pitanja ("za svaki predmet klijenta sažmi ishod") RAGAgent.ask je
+# prespor jer radi pitanje po pitanje. Ovde se pitanja obrađuju u paketima:
+# jedan embedding poziv i jedan Qdrant query_batch_points zahtev po paketu, isti
+# kontekst (isti skup pogodaka) se sastavlja samo jednom, identična pitanja se
+# šalju LLM-u samo jednom, a LLM pozivi idu paralelno uz ograničen broj niti.
+#
+# Ulaz (JSONL): {"id": "q1", "question": "...", "section_types": ["obrazlozenje"]}
+# Izlaz (JSONL): {"id", "question", "answer", "sources", "stats"} - red po odgovoru.
+# Prekinut rad se nastavlja ponovnim pokretanjem: već upisani ID-jevi se preskaču.
+#
+# Primer:
+#   python batch_ask.py data/pitanja.jsonl data/odgovori.jsonl --concurrency 2
+
+import os
+import json
+import argparse
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+import config
+from text_normalization import fold_key
+from rag_agent import RAGAgent
+
+logging.basicConfig(filename='batch_ask_log.txt', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def load_questions(path: str) -> list[dict]:
+    """Učitava pitanja; ako red nema 'id', koristi se redni broj reda."""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Greška pri parsiranju reda {line_number}. Red preskočen.")
+                continue
+            if not record.get("question"):
+                continue
+            record["id"] = str(record.get("id", line_number))
+            questions.append(record)
+    return questions
+
+
+def load_done_ids(output_path: str) -> set:
+    """ID-jevi pitanja koja već imaju odgovor u izlaznom fajlu (za nastavak posle prekida)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (json.JSONDecodeError, KeyError):
+                continue  # Nedovršen poslednji red posle prekida
+    return done
+
+
+def batch_ask(input_path: str, output_path: str, llm_model: str | None = None, batch_size: int = config.BATCH_ASK_BATCH_SIZE,
+              concurrency: int = config.BATCH_ASK_CONCURRENCY, expand: str | None = None, agent: RAGAgent | None = None):
+    done = load_done_ids(output_path)
+    pending = [q for q in load_questions(input_path) if q["id"] not in done]
+    if done:
+        print(f"Nastavak: {len(done)} pitanja već ima odgovor.")
+    if not pending:
+        print("Nema novih pitanja za obradu.")
+        return
+
+    # Identična pitanja (posle normalizacije, na bilo kom pismu) sa istim filtrom šalju se LLM-u samo jednom
+    groups = defaultdict(list)
+    for record in pending:
+        key = (fold_key(record["question"]), tuple(record.get("section_types") or ()))
+        groups[key].append(record)
+    unique_keys = list(groups)
+    print(f"Pitanja: {len(pending)}, jedinstvenih: {len(unique_keys)}")
+
+    agent = agent or RAGAgent(llm_model=llm_model)
+    context_cache = {}  # (ID-jevi pogodaka) -> (kontekst, izvori)
+    answered, failed, shared_contexts = 0, 0, 0
+
+    with open(output_path, 'a', encoding='utf-8') as outfile, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor, \
+            tqdm(total=len(pending), desc="Odgovori") as progress:
+        for start in range(0, len(unique_keys), batch_size):
+            batch = unique_keys[start:start + batch_size]
+            representatives = [groups[key][0] for key in batch]
+            try:
+                results = agent.retrieve_batch(
+                    [record["question"] for record in representatives],
+                    [record.get("section_types") for record in representatives],
+                )
+            except Exception as e:
+                logging.error(f"Greška pri pretrazi paketa od {len(batch)} pitanja: {e}")
+                failed += sum(len(groups[key]) for key in batch)
+                progress.update(sum(len(groups[key]) for key in batch))
+                continue
+
+            futures = {}
+            for key, record, scored_docs in zip(batch, representatives, results):
+                context_key = tuple(doc.metadata.get("_id") for doc, _ in scored_docs)
+                if context_key in context_cache:
+                    shared_contexts += 1
+                else:
+                    context, blocks, _ = agent.assemble(scored_docs, expand)
+                    context_cache[context_key] = (context, list(dict.fromkeys(block["source"] for block in blocks)))
+                context, sources = context_cache[context_key]
+                prompt_text = agent.prompt.format(context=context, question=record["question"])
+                futures[executor.submit(agent.complete, prompt_text)] = (key, sources)
+
+            # Upis čim odgovor stigne, da bi prekid izgubio što manje posla
+            for future in as_completed(futures):
+                key, sources = futures[future]
+                records = groups[key]
+                try:
+                    answer, stats = future.result()
+                except Exception as e:
+                    logging.error(f"Greška pri generisanju odgovora za '{records[0]['id']}': {e}")
+                    failed += len(records)
+                    progress.update(len(records))
+                    continue
+                for record in records:
+                    json.dump({"id": record["id"], "question": record["question"], "answer": answer,
+                               "sources": sources, "stats": stats}, outfile, ensure_ascii=False)
+                    outfile.write('\n')
+                outfile.flush()
+                answered += len(records)
+                progress.update(len(records))
+
+    print(f"\nOdgovoreno: {answered}, greške: {failed}, deljenih konteksta: {shared_contexts}")
+    if failed:
+        print("Pitanja sa greškom nisu upisana; ponovnim pokretanjem se obrađuju ponovo.")
+    print(f"Izlaz: {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Paketno odgovaranje na pitanja iz JSONL fajla.")
+    parser.add_argument("input_file", type=str, help="JSONL sa pitanjima (polja: id, question, opciono section_types).")
+    parser.add_argument("output_file", type=str, help="JSONL sa odgovorima (dopisuje se; postojeći odgovori se preskaču).")
+    parser.add_argument("--llm-model", type=str, default=config.DEFAULT_LLM_MODEL, help="Ollama model za odgovore.")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_ASK_BATCH_SIZE, help="Pitanja po paketu pretrage.")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_ASK_CONCURRENCY, help="Broj paralelnih LLM poziva.")
+    parser.add_argument("--expand", type=str, choices=['section', 'window', 'none'], default=None, help="Proširenje konteksta (podrazumevano iz config.py).")
+    args = parser.parse_args()
+    expand = "" if args.expand == "none" else args.expand
+    batch_ask(args.input_file, args.output_file, args.llm_model, args.batch_size, args.concurrency, expand)
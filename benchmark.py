@@ -0,0 +1,723 @@
+# benchmark.py (Merenje performansi RAG sistema)
+#
+# Primer:
+#   python benchmark.py context pitanja.txt --output data/bench_context.json
+#   python benchmark.py rerank upiti.jsonl --output data/bench_rerank.json
+#   python benchmark.py payload drveni_advokat drveni_advokat_slim --output data/bench_payload.json
+#   python benchmark.py synthesize data/structured_corpus.jsonl data/eval_queries.jsonl --limit 300
+#   python benchmark.py retrieval data/eval_queries.jsonl --k 5 10 20 --rerank --output data/bench_retrieval.json
+#   python benchmark.py ingest --docs 500 --stub-embeddings --output data/bench_ingest.json
+#   python benchmark.py warmup pitanja.txt --limit 5 --output data/bench_warmup.json
+#
+# Za 'rerank' i 'retrieval' svaki red .jsonl fajla ima "question" i "expected_sources"
+# (lista source_file putanja) i/ili "expected_doc_ids".
+
+import os
+import json
+import time
+import random
+import argparse
+import shutil
+import datetime
+import tempfile
+import threading
+import subprocess
+import statistics
+import ollama
+import config
+from context_assembler import estimate_tokens
+from text_normalization import canonical_text
+
+
+def load_queries(path: str) -> list[dict]:
+    """Učitava upite iz .txt (jedno pitanje po redu) ili .jsonl fajla (polje 'question')."""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.lower().endswith('.jsonl'):
+                queries.append(json.loads(line))
+            else:
+                queries.append({"question": line})
+    return queries
+
+
+def measure_generation(model: str, prompt: str, options: dict | None = None, keep_alive=None) -> dict:
+    """Strimuje odgovor iz Ollama i meri vreme do prvog tokena i broj tokena prompta."""
+    start_time = time.perf_counter()
+    first_token_time = None
+    final_chunk = {}
+    for chunk in ollama.generate(model=model, prompt=prompt, stream=True, options=options, keep_alive=keep_alive):
+        if first_token_time is None and chunk.get('response'):
+            first_token_time = time.perf_counter()
+        if chunk.get('done'):
+            final_chunk = chunk
+    end_time = time.perf_counter()
+    return {
+        "prompt_tokens": final_chunk.get('prompt_eval_count', estimate_tokens(prompt)),
+        "prompt_eval_s": final_chunk.get('prompt_eval_duration', 0) / 1e9,
+        "load_s": (final_chunk.get('load_duration') or 0) / 1e9,
+        "time_to_first_token_s": (first_token_time or end_time) - start_time,
+        "total_s": end_time - start_time,
+    }
+
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {"mean": statistics.mean(values), "median": statistics.median(values)}
+
+
+def recall_at_k(scored_docs: list, expected_sources: list, k: int) -> float:
+    """Udeo očekivanih izvora koji se pojavljuju u prvih k rezultata."""
+    if not expected_sources:
+        return 0.0
+    found = {doc.metadata.get("source_file") for doc, _ in scored_docs[:k]}
+    return len(found & set(expected_sources)) / len(set(expected_sources))
+
+
+def benchmark_context(queries_path: str, llm_model: str, output_path: str | None):
+    """Poredi "sirovo" nadovezivanje chunk-ova sa sastavljenim kontekstom (budžet tokena)."""
+    from rag_agent import RAGAgent
+
+    agent = RAGAgent(llm_model=llm_model)
+    queries = load_queries(queries_path)
+    results = []
+    for query in queries:
+        question = query["question"]
+        scored_docs = agent.retrieve(question)
+        raw_context = "\n\n".join(doc.page_content for doc, _ in scored_docs)
+        assembled_context, _, stats = agent.build_context(question)
+        row = {"question": question, "assembler_stats": stats}
+        for label, context in (("raw", raw_context), ("assembled", assembled_context)):
+            prompt_text = agent.prompt.format(context=context, question=question)
+            row[label] = measure_generation(agent.llm_model, prompt_text)
+        results.append(row)
+        print(f"{question[:60]:60} | tokeni {row['raw']['prompt_tokens']:>5} -> {row['assembled']['prompt_tokens']:>5}"
+              f" | TTFT {row['raw']['time_to_first_token_s']:.2f}s -> {row['assembled']['time_to_first_token_s']:.2f}s")
+
+    summary = {}
+    for label in ("raw", "assembled"):
+        summary[label] = {
+            "prompt_tokens": summarize([row[label]["prompt_tokens"] for row in results]),
+            "time_to_first_token_s": summarize([row[label]["time_to_first_token_s"] for row in results]),
+        }
+    print("\n--- Sažetak ---")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": agent.llm_model, "summary": summary, "queries": results}, f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+def benchmark_rerank(queries_path: str, fetch_k: int, top_n: int, output_path: str | None):
+    """Meri recall@top_n i dodatne milisekunde po upitu sa i bez cross-encoder rerangiranja."""
+    from rag_agent import RAGAgent
+    from reranker import CrossEncoderReranker
+
+    agent = RAGAgent(rerank=False)
+    # Budžet isključujemo da bi se merio pun efekat rerangiranja
+    reranker = CrossEncoderReranker(time_budget_ms=0)
+    queries = load_queries(queries_path)
+    results = []
+    for query in queries:
+        # Isti put kao u agentu: upit u kanonskom pismu, a slim tačke se dopunjuju tekstom iz skladišta
+        question = canonical_text(query["question"])
+        expected = query.get("expected_sources", [])
+        search_start = time.perf_counter()
+        candidates = agent.search_by_vector(agent.embedding_model.embed_query(question), fetch_k)
+        search_ms = (time.perf_counter() - search_start) * 1000
+        reranked, stats = reranker.rerank(question, candidates, top_n)
+        row = {
+            "question": query["question"],
+            "recall_dense": recall_at_k(candidates, expected, top_n),
+            "recall_reranked": recall_at_k(reranked, expected, top_n),
+            "search_ms": search_ms,
+            "rerank_ms": stats["elapsed_ms"],
+        }
+        results.append(row)
+        print(f"{question[:60]:60} | recall@{top_n} {row['recall_dense']:.2f} -> {row['recall_reranked']:.2f}"
+              f" | +{row['rerank_ms']:.0f} ms")
+
+    summary = {
+        f"recall@{top_n}_dense": statistics.mean(row["recall_dense"] for row in results) if results else 0.0,
+        f"recall@{top_n}_reranked": statistics.mean(row["recall_reranked"] for row in results) if results else 0.0,
+        "search_ms": summarize([row["search_ms"] for row in results]),
+        "rerank_ms": summarize([row["rerank_ms"] for row in results]),
+    }
+    print("\n--- Sažetak ---")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"reranker": reranker.model_name, "fetch_k": fetch_k, "summary": summary, "queries": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_payload(collection_names: list[str], qdrant_url: str, sample_size: int, top_k: int,
+                      document_store_path: str, output_path: str | None):
+    """
+    Poredi veličinu payload-a i vreme pretrage između kolekcija (npr. puna vs. "slim").
+    Kao upiti se koriste vektori nasumičnih tačaka, pa embedding model nije potreban.
+    """
+    from qdrant_client import QdrantClient
+    from document_store import DocumentStore
+
+    client = QdrantClient(url=qdrant_url)
+    store = DocumentStore(document_store_path, readonly=True, mmap_bytes=config.DOCUMENT_STORE_MMAP_BYTES) \
+        if os.path.exists(document_store_path) else None
+    report = {}
+    for collection_name in collection_names:
+        count = client.count(collection_name=collection_name, exact=True).count
+        points, _ = client.scroll(collection_name=collection_name, limit=sample_size, with_payload=True, with_vectors=True)
+        payload_bytes = [len(json.dumps(point.payload, ensure_ascii=False).encode('utf-8')) for point in points]
+        avg_payload = statistics.mean(payload_bytes) if payload_bytes else 0
+
+        search_ms, hydrate_ms, response_bytes = [], [], []
+        for point in points:
+            start_time = time.perf_counter()
+            hits = client.query_points(collection_name=collection_name, query=point.vector, limit=top_k, with_payload=True).points
+            search_ms.append((time.perf_counter() - start_time) * 1000)
+            response_bytes.append(sum(len(json.dumps(hit.payload, ensure_ascii=False).encode('utf-8')) for hit in hits))
+            # Slim tačke moraju i da se dopune tekstom iz document_store - i to ulazi u cenu
+            if store is not None and hits and "page_content" not in hits[0].payload:
+                start_time = time.perf_counter()
+                for hit in hits:
+                    meta = hit.payload.get("metadata", {})
+                    store.get_text(meta.get("doc_id"), meta.get("char_start", 0), meta.get("char_end", 0))
+                hydrate_ms.append((time.perf_counter() - start_time) * 1000)
+
+        report[collection_name] = {
+            "points": count,
+            "avg_payload_bytes": avg_payload,
+            "estimated_payload_mb": avg_payload * count / (1024 * 1024),
+            "avg_response_payload_bytes": statistics.mean(response_bytes) if response_bytes else 0,
+            "search_ms_p50": percentile(search_ms, 50),
+            "search_ms_p95": percentile(search_ms, 95),
+            "hydrate_ms_p50": percentile(hydrate_ms, 50) if hydrate_ms else None,
+        }
+        print(f"{collection_name}: {count} tačaka, ~{avg_payload:.0f} B payload po tački "
+              f"(~{report[collection_name]['estimated_payload_mb']:.1f} MB), pretraga p50 "
+              f"{report[collection_name]['search_ms_p50']:.1f} ms / p95 {report[collection_name]['search_ms_p95']:.1f} ms")
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+def git_revision() -> str:
+    """Trenutni commit, da bi se rezultati mogli porediti kroz istoriju."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "nepoznato"
+
+
+def synthesize_queries(corpus_path: str, output_path: str, limit: int, seed: int = 42):
+    """
+    Pravi skup upita iz samog korpusa: broj predmeta i imena stranaka iz metapodataka,
+    sa očekivanim dokumentom kao tačnim odgovorom.
+    """
+    from document_store import document_id
+
+    queries = []
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            metadata = doc.get("metadata", {})
+            expected = {"expected_doc_ids": [document_id(doc)], "expected_sources": [doc.get("source_file", "")]}
+            case_id = doc.get("case_id", "Nepoznato")
+            if case_id and case_id != "Nepoznato":
+                queries.append({"question": f"Predmet broj {case_id}", "kind": "case_id", **expected})
+            plaintiffs, defendants = metadata.get("plaintiff", []), metadata.get("defendant", [])
+            if plaintiffs and defendants:
+                queries.append({"question": f"Spor {plaintiffs[0]} protiv {defendants[0]}", "kind": "parties", **expected})
+            elif plaintiffs or defendants:
+                queries.append({"question": f"Slučaj {(plaintiffs or defendants)[0]}", "kind": "party", **expected})
+
+    random.Random(seed).shuffle(queries)
+    queries = queries[:limit]
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for query in queries:
+            json.dump(query, f, ensure_ascii=False)
+            f.write('\n')
+    print(f"Sintetisano {len(queries)} upita u: {output_path}")
+
+
+def _relevant_documents(doc, query: dict) -> set:
+    """
+    Očekivani dokumenti (doc_id ili source_file) koje pogodak sadrži. Deljeni chunk pripada
+    svim dokumentima iz chunk_refs (_documents), a ne samo onom čiji je doc_id u payload-u.
+    """
+    meta = doc.metadata
+    expected_doc_ids, expected_sources = set(query.get("expected_doc_ids", [])), set(query.get("expected_sources", []))
+    documents = meta.get("_documents") or [(meta.get("doc_id"), meta.get("source_file"))]
+    return ({doc_id for doc_id, _ in documents if doc_id in expected_doc_ids}
+            | {source_file for _, source_file in documents if source_file in expected_sources})
+
+
+def _is_relevant(doc, query: dict) -> bool:
+    return bool(_relevant_documents(doc, query))
+
+
+def _hits_to_docs(hits, store) -> list:
+    """
+    Qdrant rezultati -> (Document, score) parovi; slim tačke se dopunjuju iz document_store,
+    a u _documents idu svi dokumenti koji sadrže chunk (za ocenu relevantnosti).
+    """
+    from langchain_core.documents import Document
+
+    point_documents = store.point_documents([hit.id for hit in hits]) if store is not None else {}
+    scored_docs = []
+    for hit in hits:
+        meta = dict(hit.payload.get("metadata", {}))
+        meta["_id"] = hit.id
+        if str(hit.id) in point_documents:
+            meta["_documents"] = point_documents[str(hit.id)]
+        text = hit.payload.get("page_content", "")
+        if not text and store is not None and meta.get("doc_id"):
+            text = store.get_text(meta["doc_id"], meta.get("char_start", 0), meta.get("char_end", 0)) or ""
+        scored_docs.append((Document(page_content=text, metadata=meta), hit.score))
+    return scored_docs
+
+
+def benchmark_retrieval(queries_path: str, collection_name: str, qdrant_url: str, qdrant_path: str | None,
+                        k_values: list[int], with_rerank: bool, document_store_path: str, output_path: str | None):
+    """
+    Pokreće konfiguracije pretrage (k, sa/bez rerangiranja) nad skupom upita i meri
+    recall@k, MRR, p50/p95/p99 latenciju i propusnost. Rezultat je JSON za praćenje regresija.
+    """
+    from qdrant_client import QdrantClient
+    from sentence_transformers import SentenceTransformer
+    from document_store import DocumentStore
+    from reranker import CrossEncoderReranker
+
+    client = QdrantClient(path=qdrant_path) if qdrant_path else QdrantClient(url=qdrant_url)
+    embedding_model = SentenceTransformer(config.DEFAULT_EMBEDDING_MODEL, device=config.DEFAULT_DEVICE)
+    store = DocumentStore(document_store_path, readonly=True, mmap_bytes=config.DOCUMENT_STORE_MMAP_BYTES) \
+        if os.path.exists(document_store_path) else None
+    queries = [q for q in load_queries(queries_path) if q.get("expected_doc_ids") or q.get("expected_sources")]
+    if not queries:
+        print("Nema upita sa očekivanim dokumentima.")
+        return
+
+    configurations = [{"name": f"dense_k{k}", "k": k, "rerank": False} for k in k_values]
+    if with_rerank:
+        configurations += [{"name": f"rerank_k{k}", "k": k, "rerank": True} for k in k_values]
+    reranker = CrossEncoderReranker(time_budget_ms=0) if with_rerank else None
+
+    results = []
+    for configuration in configurations:
+        k = configuration["k"]
+        fetch_k = max(k, config.RERANK_FETCH_K) if configuration["rerank"] else k
+        latencies_ms, recalls, reciprocal_ranks = [], [], []
+        run_start = time.perf_counter()
+        for query in queries:
+            start_time = time.perf_counter()
+            # Indeks je u latinici, kao i u RAGAgent.retrieve upit se prevodi pre embedovanja i rerangiranja
+            question = canonical_text(query["question"])
+            vector = embedding_model.encode(question).tolist()
+            hits = client.query_points(collection_name=collection_name, query=vector, limit=fetch_k, with_payload=True).points
+            scored_docs = _hits_to_docs(hits, store)
+            if configuration["rerank"]:
+                scored_docs, _ = reranker.rerank(question, scored_docs, k)
+            latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+            relevant_ranks = [rank for rank, (doc, _) in enumerate(scored_docs[:k], start=1) if _is_relevant(doc, query)]
+            expected = set(query.get("expected_doc_ids") or query.get("expected_sources"))
+            found = set().union(*(_relevant_documents(doc, query) for doc, _ in scored_docs[:k]))
+            recalls.append(len(expected & found) / len(expected))
+            reciprocal_ranks.append(1 / relevant_ranks[0] if relevant_ranks else 0.0)
+        elapsed_s = time.perf_counter() - run_start
+
+        row = {
+            **configuration,
+            "queries": len(queries),
+            f"recall@{k}": statistics.mean(recalls),
+            "mrr": statistics.mean(reciprocal_ranks),
+            "latency_ms_p50": percentile(latencies_ms, 50),
+            "latency_ms_p95": percentile(latencies_ms, 95),
+            "latency_ms_p99": percentile(latencies_ms, 99),
+            "throughput_qps": len(queries) / elapsed_s if elapsed_s else 0.0,
+        }
+        results.append(row)
+        print(f"{row['name']:14} | recall@{k} {row[f'recall@{k}']:.3f} | MRR {row['mrr']:.3f} | "
+              f"p50 {row['latency_ms_p50']:.1f} ms p95 {row['latency_ms_p95']:.1f} ms p99 {row['latency_ms_p99']:.1f} ms | "
+              f"{row['throughput_qps']:.1f} upita/s")
+
+    report = {
+        "benchmark": "retrieval",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "collection": collection_name,
+        "embedding_model": config.DEFAULT_EMBEDDING_MODEL,
+        "queries_file": queries_path,
+        "results": results,
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+# --- Benchmark ingest pipeline-a ---
+
+YUSCII_ENCODE = str.maketrans({'š': '{', 'ć': '}', 'đ': '|', 'č': '~', 'ž': '`',
+                               'Š': '[', 'Ć': ']', 'Đ': '\\', 'Č': '^', 'Ž': '@'})
+SYNTHETIC_SENTENCES = [
+    "Tužilac je u tužbi naveo da mu tuženi duguje naknadu štete zbog izgubljene zarade.",
+    "Sud je izveo dokaze saslušanjem stranaka, čitanjem isprava i finansijskim veštačenjem.",
+    "Tuženi je osporio osnov i visinu tužbenog zahteva i predložio da se tužba odbije.",
+    "Veštak je utvrdio da razlika u zaradi za navedeni period iznosi iznos iz izreke.",
+    "Prema članu 154 Zakona o obligacionim odnosima ko drugome prouzrokuje štetu dužan je da je naknadi.",
+    "Žalba je blagovremena, potpuna i dozvoljena, pa je sud ispitao pobijanu presudu.",
+    "Na osnovu izloženog sud je odlučio kao u izreci ove presude.",
+    "Đorđe Čolić i Šćepan Žužić su saslušani kao svedoci i njihovi iskazi su saglasni.",
+]
+SYNTHETIC_NAMES = ["Bojin Vasa", "Tot Silvester", "Bojičić Dušanka", "Česljević Veljko", "Đurić Žarko", "Šarac Čedomir"]
+
+
+def _synthetic_text(rng: random.Random, paragraphs: int) -> list[str]:
+    plaintiff, defendant = rng.sample(SYNTHETIC_NAMES, 2)
+    lines = [
+        "OPŠTINSKI SUD U NOVOM SADU",
+        f"Broj predmeta: P {rng.randint(100, 9999)}/{rng.randint(1995, 2010)}",
+        f"Tužilac: {plaintiff}",
+        f"Tuženi: {defendant}",
+        "Sud: Opštinski sud u Novom Sadu",
+        f"Datum presude: {rng.randint(1, 28)}.{rng.randint(1, 12)}.{rng.randint(1995, 2010)}.",
+        "U IME NARODA",
+        "P R E S U D U",
+        rng.choice(SYNTHETIC_SENTENCES),
+        "O b r a z l o ž e n j e",
+    ]
+    for _ in range(paragraphs):
+        lines.append(" ".join(rng.choice(SYNTHETIC_SENTENCES) for _ in range(rng.randint(2, 6))))
+        if rng.random() < 0.1:
+            lines.append(rng.choice(config.BOILERPLATE_PHRASES_TO_REMOVE))
+    return lines
+
+
+def generate_synthetic_corpus(target_dir: str, doc_count: int, paragraphs: int, duplicate_ratio: float,
+                              yuscii_ratio: float, seed: int = 42) -> list[str]:
+    """Pravi .docx korpus: YUSCII tekst, boilerplate u zaglavlju/podnožju i nacrte istih podnesaka."""
+    import docx
+
+    rng = random.Random(seed)
+    os.makedirs(target_dir, exist_ok=True)
+    paths, previous = [], []
+    for i in range(doc_count):
+        if previous and rng.random() < duplicate_ratio:
+            # Nacrt postojećeg dokumenta: isti tekst sa jednom izmenjenom rečenicom
+            lines = list(rng.choice(previous))
+            lines[rng.randrange(len(lines))] = rng.choice(SYNTHETIC_SENTENCES)
+        else:
+            lines = _synthetic_text(rng, paragraphs)
+            previous.append(lines)
+        if rng.random() < yuscii_ratio:
+            lines = [line.translate(YUSCII_ENCODE) for line in lines]
+        document = docx.Document()
+        document.sections[0].header.paragraphs[0].text = config.BOILERPLATE_PHRASES_TO_REMOVE[0]
+        document.sections[0].footer.paragraphs[0].text = config.BOILERPLATE_PHRASES_TO_REMOVE[1]
+        for line in lines:
+            document.add_paragraph(line)
+        path = os.path.join(target_dir, f"sinteticki_{i:06d}.docx")
+        document.save(path)
+        paths.append(path)
+    return paths
+
+
+class StubEmbeddingModel:
+    """Deterministički "embedding" iz hash-a teksta - meri pipeline bez troška pravog modela."""
+
+    class _Tokenizer:
+        def encode(self, text: str, add_special_tokens: bool = False) -> list:
+            return text.split()
+
+    def __init__(self, dimension: int = config.VECTOR_DIMENSION):
+        self.dimension = dimension
+        self.max_seq_length = 512
+        self.tokenizer = self._Tokenizer()
+
+    def encode(self, texts, **kwargs):
+        import zlib
+        import numpy as np
+
+        single = isinstance(texts, str)
+        vectors = []
+        for text in [texts] if single else texts:
+            vector = np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(self.dimension)
+            vectors.append(vector / np.linalg.norm(vector))
+        return vectors[0] if single else np.array(vectors, dtype=np.float32)
+
+
+class StageMonitor:
+    """Meri trajanje, CPU vreme i najveći RSS (uključujući podprocese kao što je soffice) tokom jedne faze."""
+
+    def __init__(self, interval: float = 0.05):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    def _rss(self) -> int:
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except Exception:
+                pass
+        return rss
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_rss = self._rss()
+        self._cpu_start = self.process.cpu_times()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+        cpu_end = self.process.cpu_times()
+        self.cpu_s = sum(getattr(cpu_end, field) - getattr(self._cpu_start, field)
+                         for field in ("user", "system", "children_user", "children_system")
+                         if hasattr(cpu_end, field))
+        return False
+
+    def report(self, doc_count: int, input_bytes: int) -> dict:
+        return {
+            "wall_s": self.wall_s,
+            "docs_per_s": doc_count / self.wall_s if self.wall_s else 0.0,
+            "mb_per_s": input_bytes / (1024 * 1024) / self.wall_s if self.wall_s else 0.0,
+            "peak_rss_mb": self.peak_rss / (1024 * 1024),
+            "cpu_s": self.cpu_s,
+            # 100% = jedno potpuno zauzeto jezgro
+            "cpu_utilization_pct": 100 * self.cpu_s / self.wall_s if self.wall_s else 0.0,
+            "input_mb": input_bytes / (1024 * 1024),
+            "docs": doc_count,
+        }
+
+
+def _dir_size(path: str, extension: str) -> tuple[int, int]:
+    files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.lower().endswith(extension)]
+    return len(files), sum(os.path.getsize(f) for f in files)
+
+
+def _count_lines(path: str) -> int:
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+
+def benchmark_ingest(doc_count: int, paragraphs: int, duplicate_ratio: float, yuscii_ratio: float,
+                     stub_embeddings: bool, with_convert: bool, workdir: str | None, output_path: str | None):
+    """Meri docs/s, MB/s, najveći RSS i iskorišćenost CPU-a za svaku fazu ingest-a nad sintetičkim korpusom."""
+    from qdrant_client import QdrantClient
+    from extract_and_structure import process_docx_files
+    from dedup import deduplicate_corpus
+    from index_corpus import index_corpus
+
+    workdir = workdir or tempfile.mkdtemp(prefix="drveni_advokat_bench_")
+    docx_dir = os.path.join(workdir, "docx")
+    jsonl_path = os.path.join(workdir, "structured_corpus.jsonl")
+    deduped_path = os.path.join(workdir, "deduped_corpus.jsonl")
+    print(f"Generisanje {doc_count} sintetičkih dokumenata u: {workdir}")
+    generate_synthetic_corpus(docx_dir, doc_count, paragraphs, duplicate_ratio, yuscii_ratio)
+    stages = {}
+
+    if with_convert:
+        from convert_corpus import convert_doc_to_docx
+        soffice = shutil.which("soffice")
+        if soffice is None:
+            print("soffice nije pronađen - faza konverzije se preskače.")
+        else:
+            # Priprema (ne meri se): .docx -> .doc, pa se meri konverzija nazad kao u pravom pipeline-u
+            doc_dir = os.path.join(workdir, "doc")
+            subprocess.run([soffice, "--headless", "--convert-to", "doc", "--outdir", doc_dir,
+                            *sorted(os.path.join(docx_dir, name) for name in os.listdir(docx_dir))],
+                           capture_output=True, check=False)
+            count, size = _dir_size(doc_dir, ".doc")
+            with StageMonitor() as monitor:
+                convert_doc_to_docx(doc_dir, os.path.join(workdir, "converted"), soffice)
+            stages["convert"] = monitor.report(count, size)
+
+    count, size = _dir_size(docx_dir, ".docx")
+    with StageMonitor() as monitor:
+        process_docx_files(docx_dir, jsonl_path, os.path.join(workdir, "facets.sqlite"))
+    stages["extract"] = monitor.report(count, size)
+
+    with StageMonitor() as monitor:
+        deduplicate_corpus(jsonl_path, deduped_path, "link", config.DEDUP_THRESHOLD)
+    stages["dedup"] = monitor.report(_count_lines(jsonl_path), os.path.getsize(jsonl_path))
+
+    if stub_embeddings:
+        embedding_model = StubEmbeddingModel()
+    else:
+        from sentence_transformers import SentenceTransformer
+        embedding_model = SentenceTransformer(config.DEFAULT_EMBEDDING_MODEL, device=config.DEFAULT_DEVICE)
+    with StageMonitor() as monitor:
+        index_corpus(deduped_path, None, "bench_ingest", os.path.join(workdir, "document_store.sqlite"),
+                     qdrant_client=QdrantClient(location=":memory:"), embedding_model=embedding_model)
+    stages["index"] = monitor.report(_count_lines(deduped_path), os.path.getsize(deduped_path))
+
+    print("\n--- Rezultati po fazama ---")
+    for name, stage in stages.items():
+        print(f"{name:8} | {stage['docs_per_s']:8.1f} dok/s | {stage['mb_per_s']:7.2f} MB/s | "
+              f"RSS {stage['peak_rss_mb']:7.1f} MB | CPU {stage['cpu_utilization_pct']:6.1f}%")
+
+    report = {
+        "benchmark": "ingest",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "corpus": {"docs": doc_count, "paragraphs": paragraphs, "duplicate_ratio": duplicate_ratio,
+                   "yuscii_ratio": yuscii_ratio, "seed": 42},
+        "embedding_model": "stub" if stub_embeddings else config.DEFAULT_EMBEDDING_MODEL,
+        "cpu_count": os.cpu_count(),
+        "stages": stages,
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+def benchmark_warmup(queries_path: str, llm_model: str, limit: int, output_path: str | None):
+    """
+    Vreme do prvog tokena: hladan start (model izbačen iz memorije), topao model sa novim
+    pitanjem (keširano je samo uputstvo na početku prompta) i isti prompt ponovo (keširan ceo prefiks).
+    """
+    from rag_agent import RAGAgent
+    from ollama_runtime import unload
+
+    agent = RAGAgent(llm_model=llm_model, keep_warm=False)
+    prompts = [agent.prepare(query["question"])[0] for query in load_queries(queries_path)[:limit]]
+    if not prompts:
+        print("Nema pitanja za merenje.")
+        return
+
+    def measure(prompt_text):
+        return measure_generation(agent.llm_model, prompt_text, agent.ollama_options, agent.keep_alive)
+
+    results = []
+    for index, prompt_text in enumerate(prompts):
+        unload(agent.ollama_client, agent.llm_model)
+        row = {"cold": measure(prompt_text), "warm_same_prompt": measure(prompt_text)}
+        # Topao model, drugačiji kontekst: zajednički je samo početak (uputstvo)
+        row["warm_new_prompt"] = measure(prompts[(index + 1) % len(prompts)]) if len(prompts) > 1 else row["warm_same_prompt"]
+        results.append(row)
+        print(f"Pitanje {index + 1}: TTFT hladno {row['cold']['time_to_first_token_s']:.2f}s"
+              f" (učitavanje {row['cold']['load_s']:.2f}s) | toplo, novo pitanje {row['warm_new_prompt']['time_to_first_token_s']:.2f}s"
+              f" | toplo, isti prompt {row['warm_same_prompt']['time_to_first_token_s']:.2f}s")
+
+    summary = {
+        label: {metric: summarize([row[label][metric] for row in results])
+                for metric in ("time_to_first_token_s", "load_s", "prompt_eval_s")}
+        for label in ("cold", "warm_new_prompt", "warm_same_prompt")
+    }
+    print("\n--- Sažetak ---")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": agent.llm_model, "options": agent.ollama_options, "keep_alive": agent.keep_alive,
+                       "summary": summary, "queries": results}, f, ensure_ascii=False, indent=2)
+        print(f"Rezultati sačuvani u: {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark alati za Drveni Advokat.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    context_parser = subparsers.add_parser("context", help="Broj tokena prompta i TTFT: sirov vs. sastavljen kontekst.")
+    context_parser.add_argument("queries", type=str, help="Putanja do .txt ili .jsonl fajla sa pitanjima.")
+    context_parser.add_argument("--llm-model", type=str, default=config.DEFAULT_LLM_MODEL, help="Ollama model.")
+    context_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    rerank_parser = subparsers.add_parser("rerank", help="Recall i latencija: gusta pretraga vs. cross-encoder.")
+    rerank_parser.add_argument("queries", type=str, help="Putanja do .jsonl fajla sa 'question' i 'expected_sources'.")
+    rerank_parser.add_argument("--fetch-k", type=int, default=config.RERANK_FETCH_K, help="Broj kandidata iz Qdrant-a.")
+    rerank_parser.add_argument("--top-n", type=int, default=config.RETRIEVAL_K, help="Broj rezultata posle rerangiranja.")
+    rerank_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    payload_parser = subparsers.add_parser("payload", help="Veličina payload-a i vreme pretrage po kolekciji.")
+    payload_parser.add_argument("collections", nargs="+", help="Imena kolekcija za poređenje.")
+    payload_parser.add_argument("--qdrant-url", type=str, default=config.QDRANT_URL, help="URL Qdrant instance.")
+    payload_parser.add_argument("--sample-size", type=int, default=200, help="Broj tačaka za uzorak i upite.")
+    payload_parser.add_argument("--top-k", type=int, default=config.RETRIEVAL_K, help="Broj rezultata po pretrazi.")
+    payload_parser.add_argument("--document-store", type=str, default=config.DOCUMENT_STORE_PATH, help="SQLite skladište dokumenata.")
+    payload_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    synthesize_parser = subparsers.add_parser("synthesize", help="Pravi skup upita iz korpusa (broj predmeta, stranke).")
+    synthesize_parser.add_argument("corpus", type=str, help="Putanja do structured_corpus.jsonl fajla.")
+    synthesize_parser.add_argument("output", type=str, help="Putanja do izlaznog .jsonl fajla sa upitima.")
+    synthesize_parser.add_argument("--limit", type=int, default=500, help="Najveći broj upita.")
+
+    retrieval_parser = subparsers.add_parser("retrieval", help="Recall@k, MRR, latencija i propusnost pretrage.")
+    retrieval_parser.add_argument("queries", type=str, help="Putanja do .jsonl fajla sa upitima i očekivanim dokumentima.")
+    retrieval_parser.add_argument("--collection-name", type=str, default=config.QDRANT_COLLECTION_NAME, help="Ime Qdrant kolekcije.")
+    retrieval_parser.add_argument("--qdrant-url", type=str, default=config.QDRANT_URL, help="URL Qdrant instance.")
+    retrieval_parser.add_argument("--qdrant-path", type=str, default=None, help="Lokalni Qdrant (bez servera) na datoj putanji.")
+    retrieval_parser.add_argument("--k", type=int, nargs="+", default=[config.RETRIEVAL_K], help="Vrednosti k za poređenje.")
+    retrieval_parser.add_argument("--rerank", action="store_true", help="Pokreni i konfiguracije sa cross-encoder rerangiranjem.")
+    retrieval_parser.add_argument("--document-store", type=str, default=config.DOCUMENT_STORE_PATH, help="SQLite skladište dokumenata.")
+    retrieval_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    ingest_parser = subparsers.add_parser("ingest", help="Propusnost, RSS i CPU po fazama ingest-a nad sintetičkim korpusom.")
+    ingest_parser.add_argument("--docs", type=int, default=200, help="Broj sintetičkih dokumenata.")
+    ingest_parser.add_argument("--paragraphs", type=int, default=30, help="Broj pasusa obrazloženja po dokumentu.")
+    ingest_parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Udeo dokumenata koji su nacrti postojećih.")
+    ingest_parser.add_argument("--yuscii-ratio", type=float, default=0.5, help="Udeo dokumenata pisanih YUSCII kodiranjem.")
+    ingest_parser.add_argument("--stub-embeddings", action="store_true", help="Hash \"embedding\" umesto pravog modela (brzo na CPU).")
+    ingest_parser.add_argument("--with-convert", action="store_true", help="Meri i .doc -> .docx konverziju (zahteva soffice).")
+    ingest_parser.add_argument("--workdir", type=str, default=None, help="Radni direktorijum (podrazumevano privremeni).")
+    ingest_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    warmup_parser = subparsers.add_parser("warmup", help="TTFT: hladan start vs. topao model (keep_alive, keširan prefiks).")
+    warmup_parser.add_argument("queries", type=str, help="Putanja do .txt ili .jsonl fajla sa pitanjima.")
+    warmup_parser.add_argument("--llm-model", type=str, default=config.DEFAULT_LLM_MODEL, help="Ollama model.")
+    warmup_parser.add_argument("--limit", type=int, default=5, help="Broj pitanja (svako sa jednim hladnim startom).")
+    warmup_parser.add_argument("--output", type=str, default=None, help="Putanja za JSON rezultate.")
+
+    args = parser.parse_args()
+
+    if args.action == 'context':
+        benchmark_context(args.queries, args.llm_model, args.output)
+    elif args.action == 'rerank':
+        benchmark_rerank(args.queries, args.fetch_k, args.top_n, args.output)
+    elif args.action == 'payload':
+        benchmark_payload(args.collections, args.qdrant_url, args.sample_size, args.top_k, args.document_store, args.output)
+    elif args.action == 'synthesize':
+        synthesize_queries(args.corpus, args.output, args.limit)
+    elif args.action == 'retrieval':
+        benchmark_retrieval(args.queries, args.collection_name, args.qdrant_url, args.qdrant_path, args.k,
+                            args.rerank, args.document_store, args.output)
+    elif args.action == 'ingest':
+        benchmark_ingest(args.docs, args.paragraphs, args.duplicate_ratio, args.yuscii_ratio,
+                         args.stub_embeddings, args.with_convert, args.workdir, args.output)
+    elif args.action == 'warmup':
+        benchmark_warmup(args.queries, args.llm_model, args.limit, args.output)
@@ -9,6 +9,20 @@ SOURCE_DOC_DIR = r"I:\drveni_advokat_gemini\docs"
 CONVERTED_DOCX_DIR = r"I:\drveni_advokat_gemini\converted_docs"
 STRUCTURED_JSONL_PATH = r"data/structured_corpus.jsonl"
 FEEDBACK_LOG_PATH = r"data/feedback_log.jsonl"
+DOCUMENT_STORE_PATH = r"data/document_store.sqlite"
+DOCUMENT_STORE_MMAP_BYTES = 1024 * 1024 * 1024  # SQLite mmap za brzo čitanje teksta chunk-ova
+PIPELINE_DB_PATH = r"data/pipeline.sqlite"  # Tabela poslova za pipeline.py
+FACETS_DB_PATH = r"data/facets.sqlite"  # Datum, sud, sudija i tip po dokumentu (facets.py)
+FACETS_MAX_FILTER_POINTS = 50000  # Najviše ID-jeva tačaka u jednom Qdrant filteru; širi filter je greška, ne pretraga bez filtera
+
+# Protočna obrada (pipeline.py)
+PIPELINE_POLL_INTERVAL_S = 5  # Koliko često se skenira izvorni direktorijum i proverava red
+PIPELINE_SETTLE_S = 10  # Fajl ulazi u obradu tek kad se ovoliko dugo nije menjao (kopiranje u toku)
+PIPELINE_CONVERT_WORKERS = 2  # Paralelni soffice procesi
+PIPELINE_EXTRACT_WORKERS = 2  # Procesi za ekstrakciju teksta
+PIPELINE_INDEX_BATCH = 32  # Dokumenata po paketu za embedovanje
+PIPELINE_INDEX_MAX_WAIT_S = 30  # Najduže čekanje da se paket popuni
+PIPELINE_MAX_ATTEMPTS = 3  # Posle ovoliko neuspeha posao se označava kao 'failed'
 
 # --- Konfiguracija Modela i Uređaja ---
 # Podrazumevane vrednosti koje će biti ponuđene u aplikaciji
@@ -17,14 +31,98 @@ AVAILABLE_LLMS = ["YugoGPT", "mistral:7b"]
 DEFAULT_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 DEFAULT_DEVICE = "cuda"
 
+# Ollama parametri (ollama_runtime.py); 0 znači podrazumevanu vrednost servera
+OLLAMA_KEEP_ALIVE = "30m"  # Koliko model ostaje u memoriji posle poslednjeg zahteva (-1 = zauvek)
+OLLAMA_NUM_CTX = 4096  # Kontekst prozor modela; mora da primi budžet konteksta + istoriju + odgovor
+OLLAMA_NUM_THREAD = 0  # Broj CPU niti (0 = Ollama sam bira)
+OLLAMA_NUM_PREDICT = 1024  # Najveći broj generisanih tokena po odgovoru
+OLLAMA_KEEP_WARM_INTERVAL_S = 240  # Ping modela na svakih N sekundi; 0 isključuje
+
 # Parametri za Indeksiranje (moraju odgovarati embedding modelu)
 VECTOR_DIMENSION = 768 # Za paraphrase-multilingual-mpnet-base-v2
 DISTANCE_METRIC = "Cosine"
 BATCH_SIZE = 32
 
+# Podela na chunk-ove po pravnoj strukturi (legal_chunker.py), u tokenima embedding modela
+# Small-to-big: indeksiraju se mali chunk-ovi (128 = prirodna dužina sekvence embedding modela, umesto
+# ranijih 256) radi precizne pretrage, a širi kontekst (ceo deo ili prozor oko pogotka) daje document_store
+CHUNK_MAX_TOKENS = 128
+CHUNK_OVERLAP_TOKENS = 40  # Ponavlja se samo poslednja rečenica/pasus, i to samo ako je kraća od ovoga
+
 # --- Qdrant Konfiguracija ---
 QDRANT_URL = "http://localhost:6333"
 QDRANT_COLLECTION_NAME = "drveni_advokat"
+# Alias koji pokazuje na aktivnu (verzionisanu) kolekciju; RAGAgent ga koristi ako postoji.
+# Novi indeks se pravi sa "manage_qdrant.py build", a alias se prebacuje sa "manage_qdrant.py switch".
+QDRANT_COLLECTION_ALIAS = "drveni_advokat_live"
+QDRANT_ALIAS_REFRESH_S = 30  # Koliko često RAGAgent i pipeline.py proveravaju na koju kolekciju alias pokazuje
+QDRANT_EXPORT_BATCH_SIZE = 1000  # Tačaka po paketu pri izvozu/uvozu
+
+# Detekcija skoro identičnih dokumenata (dedup.py, MinHash + LSH)
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 32  # 32 banda x 4 reda: visok odziv kandidata, potvrda ide preko DEDUP_THRESHOLD
+DEDUP_SHINGLE_SIZE = 5  # Shingle = 5 uzastopnih reči
+DEDUP_THRESHOLD = 0.85
+DEDUP_MIN_SHINGLES = 20  # Kraći dokumenti (prazni, samo naslov) dobili bi isti potpis, pa se ne grupišu
+
+# "Slim" payload: tačke nose samo doc_id, offset-e i ova polja za filtriranje.
+# Tekst i pune metapodatke RAGAgent čita iz document_store.
+SLIM_PAYLOADS = False
+SLIM_PAYLOAD_FIELDS = ["document_type", "court", "decision_date"]
+
+# --- Pretraga i Sastavljanje Konteksta ---
+RETRIEVAL_K = 5
+# Budžet tokena za kontekst po modelu (ostatak prozora ostaje za pitanje i odgovor)
+DEFAULT_CONTEXT_TOKEN_BUDGET = 1500
+MODEL_CONTEXT_TOKEN_BUDGETS = {
+    "mistral:7b": 1500,
+    "YugoGPT": 1500,
+}
+CONTEXT_CHARS_PER_TOKEN = 3.5  # Gruba procena za srpski tekst (latinica)
+CONTEXT_MIN_OVERLAP_CHARS = 40  # Najmanje preklapanje da bi se dva chunk-a spojila
+CONTEXT_MAX_OVERLAP_CHARS = 250  # Za stare kolekcije (chunk_overlap=200), nove imaju char_start/char_end
+CONTEXT_NEAR_DUPLICATE_THRESHOLD = 0.8  # Udeo 3-grama reči bloka koji već postoje u boljem bloku
+CONTEXT_MIN_BLOCK_TOKENS = 80  # Ne ubacujemo skraćene blokove kraće od ovoga
+# Proširenje pogodaka na okolni tekst iz document_store: "section", "window" ili None
+PARENT_EXPANSION = "section"
+PARENT_WINDOW_CHARS = 1500  # Veličina prozora oko chunk-a
+PARENT_MAX_SECTION_CHARS = 4000  # Duži delovi (npr. obrazloženje) se ne ubacuju celi, već prozor
+
+# --- Rerangiranje (Cross-encoder) ---
+RERANK_ENABLED = False
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Mali višejezični model, radi i na CPU
+RERANK_DEVICE = "cpu"
+RERANK_FETCH_K = 50  # Koliko kandidata tražimo od Qdrant-a pre rerangiranja
+RERANK_BATCH_SIZE = 16
+RERANK_CACHE_SIZE = 10000  # Broj keširanih (pitanje, chunk) ocena
+RERANK_TIME_BUDGET_MS = 800  # Posle ovoga se preostali kandidati ne boduju
+RERANK_MAX_CONCURRENT = 2  # Pod većim opterećenjem rerangiranje se preskače
+
+# --- Telemetrija (Logovi i metrike) ---
+DEBUG_LOGGING = False  # True: u log idu i pregledi chunk-ova i prompta
+TELEMETRY_LOG_PATH = "rag_agent_log.jsonl"  # JSON red po događaju/span-u, sa request_id
+METRICS_PORT = 9108  # Prometheus /metrics na localhost; 0 isključuje
+
+# --- Paketna obrada pitanja (batch_ask.py) ---
+BATCH_ASK_BATCH_SIZE = 32  # Pitanja po jednom embedding pozivu i query_batch_points zahtevu
+BATCH_ASK_CONCURRENCY = 2  # Paralelni LLM pozivi (uskladiti sa OLLAMA_NUM_PARALLEL)
+
+# --- Slični predmeti (similar_cases.py) ---
+SIMILAR_CASES_TOP_N = 10  # Koliko sličnih dokumenata se čuva po dokumentu
+SIMILAR_CASES_BATCH_SIZE = 256  # Dokumenata po query_batch_points zahtevu
+
+# --- Razgovor (conversation.py) ---
+CONVERSATION_HISTORY_TURNS = 4  # Poslednje poruke koje idu u prompt
+CONVERSATION_HISTORY_MAX_CHARS = 500  # Skraćivanje pojedinačne poruke u istoriji
+CONVERSATION_FOLLOW_UP_MAX_CONTENT_WORDS = 3  # Nastavak ("a šta je sud odlučio o tome?") ima malo svojih reči
+CONVERSATION_FOLLOW_UP_MIN_SIMILARITY = 0.35  # Najmanja kosinusna sličnost pitanja sa blokom prethodnog konteksta
+CONVERSATION_BLOCK_EMBED_CHARS = 1000  # Početak bloka koji se embeduje za proveru nastavka
+
+# --- Ocene odgovora (feedback.py) ---
+FEEDBACK_BOOST_CACHE_PATH = r"data/feedback_boosts.json"  # Zbirovi ocena + offset u logu (brzo učitavanje)
+FEEDBACK_POINT_WEIGHT = 0.3  # Najveći pomeraj ocenjenog chunk-a, kao udeo dužine liste kandidata
+FEEDBACK_DOC_WEIGHT = 0.1  # Najveći pomeraj za ostale chunk-ove ocenjenog dokumenta
+FEEDBACK_SATURATION = 3  # Posle otprilike ovoliko istih ocena pomeraj je blizu najvećeg
 
 # --- Čišćenje teksta (Text Cleaning) ---
 REMOVE_HEADERS_FOOTERS = True
@@ -41,6 +139,8 @@ BOILERPLATE_PHRASES_TO_REMOVE = [
     "Kontakt telefon:",
     "E-mail address:   nikkosan@EUnet.yu"
 ]
+EXTRACTION_METADATA_WINDOW_CHARS = 20000  # Metapodaci (broj predmeta, stranke, datum) se traže na početku dokumenta
+EXTRACTION_METADATA_TAIL_CHARS = 5000  # ...a ono što tamo nije nađeno (sudija, potpis) i na kraju
 
 
 # ############ fali neki TXT - nadji na starijim verzijama
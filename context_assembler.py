@@ -0,0 +1,165 @@
+# context_assembler.py (Sastavljanje konteksta za prompt)
+#
+# Umesto da se top-k chunk-ova samo nalepi jedan na drugi, ovde se susedni
+# chunk-ovi istog fajla spajaju (uklanja se preklapanje od 200 karaktera),
+# izbacuju se skoro identični delovi i sve se pakuje u budžet tokena
+# izabranog modela. Manji prompt = kraći "prompt eval" na 7B modelu.
+
+import re
+import config
+from text_normalization import fold_key
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+SENTENCE_END_PATTERN = re.compile(r"[.!?;:]\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Gruba procena broja tokena (tokenizator Ollama modela nije dostupan lokalno)."""
+    if not text:
+        return 0
+    return max(1, round(len(text) / config.CONTEXT_CHARS_PER_TOKEN))
+
+
+def get_token_budget(model_name: str) -> int:
+    """Vraća budžet tokena za kontekst za dati LLM model."""
+    return config.MODEL_CONTEXT_TOKEN_BUDGETS.get(model_name, config.DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = WORD_PATTERN.findall(fold_key(text))
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(candidate: set, other: set) -> float:
+    """Udeo shingle-ova kandidata koji se već nalaze u drugom bloku."""
+    if not candidate or not other:
+        return 0.0
+    return len(candidate & other) / len(candidate)
+
+
+def _merge_overlapping(left: str, right: str, min_overlap: int) -> str | None:
+    """Spaja dva teksta ako se kraj levog poklapa sa početkom desnog."""
+    if right in left:
+        return left
+    if left in right:
+        return right
+    max_overlap = min(len(left), len(right), config.CONTEXT_MAX_OVERLAP_CHARS)
+    for size in range(max_overlap, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return None
+
+
+def _merge_by_offsets(block: dict, doc) -> bool:
+    """Spaja chunk u blok na osnovu char_start/char_end iz payload-a (ako postoje)."""
+    start = doc.metadata["char_start"]
+    end = doc.metadata.get("char_end", start + len(doc.page_content))
+    if start > block["end"] or end < block["start"]:
+        return False
+    text = doc.page_content
+    if start < block["start"]:
+        block["text"] = text + block["text"][end - block["start"]:] if end < block["end"] else text
+    elif end > block["end"]:
+        block["text"] = block["text"] + text[block["end"] - start:]
+    block["start"] = min(block["start"], start)
+    block["end"] = max(block["end"], end)
+    return True
+
+
+def _merge_into_blocks(scored_docs: list) -> list:
+    """Grupiše chunk-ove po izvoru i spaja susedne/preklapajuće u blokove."""
+    blocks = []
+    for rank, (doc, score) in enumerate(scored_docs):
+        source = doc.metadata.get("source_file", "Nepoznat")
+        merged = False
+        for block in blocks:
+            if block["source"] != source:
+                continue
+            if block["start"] is not None and doc.metadata.get("char_start") is not None:
+                merged = _merge_by_offsets(block, doc)
+            else:
+                combined = (_merge_overlapping(block["text"], doc.page_content, config.CONTEXT_MIN_OVERLAP_CHARS)
+                            or _merge_overlapping(doc.page_content, block["text"], config.CONTEXT_MIN_OVERLAP_CHARS))
+                if combined is not None:
+                    block["text"] = combined
+                    merged = True
+            if merged:
+                block["docs"].append(doc)
+                break
+        if not merged:
+            blocks.append({
+                "source": source,
+                "text": doc.page_content,
+                "start": doc.metadata.get("char_start"),
+                "end": doc.metadata.get("char_end"),
+                "rank": rank,
+                "score": score,
+                "docs": [doc],
+            })
+    return blocks
+
+
+def _drop_near_duplicates(blocks: list) -> list:
+    """Izbacuje blokove koji su skoro identični (ili sadržani u) nekom bolje rangiranom bloku."""
+    kept = []
+    kept_shingles = []
+    for block in blocks:
+        shingles = _shingles(block["text"])
+        if any(_containment(shingles, other) >= config.CONTEXT_NEAR_DUPLICATE_THRESHOLD for other in kept_shingles):
+            continue
+        kept.append(block)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Skraćuje tekst na budžet, po mogućstvu na kraju rečenice."""
+    max_chars = int(max_tokens * config.CONTEXT_CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_ends = [m.end() for m in SENTENCE_END_PATTERN.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] > max_chars // 2:
+        cut = cut[:sentence_ends[-1]]
+    return cut.rstrip() + " ..."
+
+
+def assemble_context(scored_docs: list, token_budget: int) -> tuple[str, list, dict]:
+    """
+    Sastavlja kontekst iz liste (Document, score) parova sortiranih po relevantnosti.
+    Vraća (tekst konteksta, korišćeni blokovi, statistika).
+    """
+    stats = {
+        "input_chunks": len(scored_docs),
+        "input_tokens": sum(estimate_tokens(doc.page_content) for doc, _ in scored_docs),
+    }
+    blocks = _merge_into_blocks(scored_docs)
+    stats["merged_blocks"] = len(blocks)
+    blocks = _drop_near_duplicates(blocks)
+    stats["deduplicated_blocks"] = len(blocks)
+    blocks.sort(key=lambda block: block["rank"])
+
+    parts = []
+    used_blocks = []
+    remaining = token_budget
+    for block in blocks:
+        header = f"[Izvor: {block['source']}]\n"
+        header_tokens = estimate_tokens(header)
+        block_tokens = estimate_tokens(block["text"])
+        if header_tokens + block_tokens <= remaining:
+            text = block["text"]
+        elif remaining - header_tokens >= config.CONTEXT_MIN_BLOCK_TOKENS:
+            text = _truncate_to_tokens(block["text"], remaining - header_tokens)
+        else:
+            continue
+        parts.append(header + text)
+        used_blocks.append(block)
+        remaining -= header_tokens + estimate_tokens(text)
+
+    context = "\n\n".join(parts)
+    stats["output_blocks"] = len(used_blocks)
+    stats["output_tokens"] = estimate_tokens(context)
+    stats["token_budget"] = token_budget
+    return context, used_blocks, stats
@@ -0,0 +1,145 @@
+# conversation.py (Istorija razgovora za RAGAgent: pitanja koja se nastavljaju na prethodna)
+#
+# Potpitanje tipa "a šta je bilo posle?" samo za sebe daje lošu pretragu. Umesto
+# dodatnog LLM poziva za preformulisanje, ovde je jeftina heuristika: pitanje
+# koje počinje veznikom ("a", "pa", "onda") ili se zamenicom ("o tome", "njegova")
+# oslanja na prethodno, a nema dovoljno svojih reči, bez novog broja predmeta,
+# kandidat je za nastavak. Nastavak se potvrđuje tek ako je vektor pitanja
+# dovoljno blizak blokovima prethodnog konteksta (continues_session); inače
+# ide nova pretraga. ConversationSession pamti kontekst prethodnog odgovora, da
+# bi se za nastavak isti kontekst poslao kao identičan početak prompta (Ollama
+# tada ponovo koristi već izračunat KV keš tog dela).
+
+import re
+import math
+import config
+
+FOLLOW_UP_START = re.compile(
+    r"^\s*(?:a|i|pa|onda|zatim|posle|nakon toga|dalje|još|jos)\b",
+    re.IGNORECASE,
+)
+# Zamenice koje upućuju na nešto već pomenuto; česte kratke reči ("to", "ta", "te", "on")
+# su izostavljene jer se javljaju i u samostalnim pitanjima
+FOLLOW_UP_REFERENCE = re.compile(
+    r"\b(?:toga|tome|taj|tog|tom|tim|ovaj|ovog|ovom|isti|ista|isto|istog|istom|"
+    r"njega|njemu|njoj|njih|njihov\w*|njegov\w*|njen\w*)\b",
+    re.IGNORECASE,
+)
+# Reči koje ne nose temu pitanja (upitne reči, pomoćni glagoli, predlozi, zamenice)
+FUNCTION_WORDS = {
+    "a", "i", "pa", "ali", "ili", "da", "li", "je", "su", "bi", "bio", "bila", "bilo", "biti", "se", "sa", "od", "do",
+    "za", "na", "u", "o", "po", "iz", "kod", "prema", "kao", "što", "sto", "šta", "sta", "ko", "kako", "koji", "koja",
+    "koje", "kada", "kad", "gde", "zašto", "zasto", "koliko", "onda", "zatim", "posle", "nakon", "dalje", "još", "jos",
+    "to", "ta", "te", "tu", "on", "ona", "oni", "ono", "ovo", "ova", "mi", "ti", "vi", "me", "mu", "im", "ga", "ih",
+    "ne", "ni", "nije", "jeste", "ima", "imao", "imala", "može", "moze", "sada", "tada", "tačno", "tacno",
+}
+# Oznaka predmeta, npr. "P. 1234/2019" ili "Kž1 56/20" - novo pitanje o drugom predmetu
+CASE_NUMBER = re.compile(r"\b[A-ZČĆŽŠĐ][\w.]{0,5}\s*\d+/\d{2,4}\b")
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def user_questions(history: list[dict]) -> list[str]:
+    return [message["content"] for message in history if message.get("role") == "user" and message.get("content")]
+
+
+def content_words(question: str) -> list[str]:
+    """Reči pitanja koje nose temu (bez upitnih reči, predloga, zamenica)."""
+    return [word for word in WORD_PATTERN.findall(question.lower())
+            if word not in FUNCTION_WORDS and not FOLLOW_UP_REFERENCE.fullmatch(word)]
+
+
+def is_follow_up(question: str, history: list[dict]) -> bool:
+    """
+    Da li pitanje eksplicitno upućuje na prethodno (bez LLM poziva): počinje veznikom
+    nastavka ili se zamenicom oslanja na prethodno, a nema više od
+    CONVERSATION_FOLLOW_UP_MAX_CONTENT_WORDS svojih reči. Pitanje o novom predmetu nije nastavak.
+    """
+    previous = user_questions(history)
+    if not previous:
+        return False
+    new_case_numbers = set(CASE_NUMBER.findall(question)) - set(CASE_NUMBER.findall(" ".join(previous)))
+    if new_case_numbers:
+        return False
+    if not (FOLLOW_UP_START.search(question) or FOLLOW_UP_REFERENCE.search(question)):
+        return False
+    return len(content_words(question)) <= config.CONVERSATION_FOLLOW_UP_MAX_CONTENT_WORDS
+
+
+def cosine_similarity(left: list, right: list) -> float:
+    dot = sum(a * b for a, b in zip(left, right))
+    norm = math.sqrt(sum(a * a for a in left)) * math.sqrt(sum(b * b for b in right))
+    return dot / norm if norm else 0.0
+
+
+def continues_session(session: "ConversationSession", question: str, history: list[dict], embed_query, embed_documents,
+                      facets: dict | None = None) -> bool:
+    """
+    Nastavak razgovora samo uz eksplicitan signal (is_follow_up), iste filtere faseta i
+    kosinusnu sličnost pitanja sa nekim blokom prethodnog konteksta od bar
+    CONVERSATION_FOLLOW_UP_MIN_SIMILARITY; inače pozivalac radi novu pretragu.
+    embed_query / embed_documents su funkcije embedding modela (vektori blokova se računaju
+    jednom po kontekstu i čuvaju u sesiji).
+    """
+    if not session.context or not session.blocks:
+        return False
+    if session.facets != {key: value for key, value in (facets or {}).items() if value}:
+        return False
+    if not is_follow_up(question, history):
+        return False
+    if session.block_vectors is None:
+        session.block_vectors = embed_documents(
+            [block["text"][:config.CONVERSATION_BLOCK_EMBED_CHARS] for block in session.blocks]
+        )
+    question_vector = embed_query(question)
+    similarity = max(cosine_similarity(question_vector, vector) for vector in session.block_vectors)
+    return similarity >= config.CONVERSATION_FOLLOW_UP_MIN_SIMILARITY
+
+
+def condense_question(question: str, history: list[dict], anchor: str | None = None) -> str:
+    """
+    Samostalan upit za pretragu: pitanje kojim je razgovor o predmetu počeo (anchor),
+    ili prethodno pitanje korisnika, + trenutno pitanje.
+    """
+    previous = user_questions(history)
+    base = anchor or (previous[-1] if previous else "")
+    if not base:
+        return question
+    return f"{base[:config.CONVERSATION_HISTORY_MAX_CHARS]} {question}"
+
+
+def format_history(history: list[dict]) -> str:
+    """Poslednjih nekoliko poruka, skraćenih, za kraj prompta."""
+    lines = []
+    for message in history[-config.CONVERSATION_HISTORY_TURNS:]:
+        role = "Korisnik" if message.get("role") == "user" else "Asistent"
+        content = message.get("content", "").strip()
+        if len(content) > config.CONVERSATION_HISTORY_MAX_CHARS:
+            content = content[:config.CONVERSATION_HISTORY_MAX_CHARS].rstrip() + " ..."
+        if content:
+            lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+class ConversationSession:
+    """Stanje jednog razgovora (Streamlit ga čuva u session_state)."""
+
+    def __init__(self):
+        self.context = ""
+        self.anchor_question = ""  # Pitanje za koje je kontekst pronađen (početak teme)
+        self.blocks = []
+        self.point_ids = set()
+        self.doc_ids = []
+        self.facets = {}  # Filteri faseta sa kojima je kontekst pronađen
+        self.block_vectors = None  # Vektori blokova za proveru nastavka (računaju se po potrebi)
+
+    def remember(self, context: str, blocks: list):
+        self.context = context
+        self.blocks = list(blocks)
+        self.block_vectors = None
+        self.point_ids = {doc.metadata.get("_id") for block in blocks for doc in block["docs"]}
+        self.doc_ids = list(dict.fromkeys(
+            doc.metadata["doc_id"] for block in blocks for doc in block["docs"] if doc.metadata.get("doc_id")
+        ))
+
+    def reset(self):
+        self.__init__()
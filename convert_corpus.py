@@ -1,5 +1,6 @@
  
 import os
+import pathlib
 import subprocess
 import logging
 import argparse
@@ -11,6 +12,56 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+def convert_file(source_file_path: str, target_dir: str, soffice_path: str = "soffice", profile_dir: str | None = None) -> str | None:
+    """
+    Converts a single .doc file to .docx in target_dir. Returns the .docx path, or None on failure.
+    Raises FileNotFoundError if soffice is missing.
+
+    Args:
+        profile_dir (str | None): Separate LibreOffice user profile; required when several
+            soffice processes run in parallel (pipeline.py), since they lock a shared profile.
+    """
+    target_file_path = os.path.join(target_dir, os.path.splitext(os.path.basename(source_file_path))[0] + ".docx")
+    logging.info(f"Attempting to convert: '{source_file_path}'")
+    command = [soffice_path]
+    if profile_dir:
+        # Mora biti ispravan file URI i na Windows-u (file:///C:/...), ne "file://" + putanja
+        command.append(f"-env:UserInstallation={pathlib.Path(profile_dir).absolute().as_uri()}")
+    command += [
+        "--headless",
+        "--convert-to",
+        "docx",
+        "--outdir",
+        target_dir,
+        source_file_path,
+    ]
+
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        check=False,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+    if result.returncode == 0:
+        logging.info(
+            f"SUCCESS: '{source_file_path}' converted to '{target_file_path}'"
+        )
+        if result.stdout:
+            logging.debug(f"STDOUT: {result.stdout.strip()}")
+        return target_file_path
+    logging.error(
+        f"FAILED: '{source_file_path}' - Return Code: {result.returncode}"
+    )
+    if result.stdout:
+        logging.error(f"STDOUT: {result.stdout.strip()}")
+    if result.stderr:
+        logging.error(f"STDERR: {result.stderr.strip()}")
+    return None
+
+
 def convert_doc_to_docx(
     source_dir: str,
     target_dir: str,
@@ -45,42 +96,8 @@ def convert_doc_to_docx(
                     )
                     continue
 
-                logging.info(f"Attempting to convert: '{source_file_path}'")
-                command = [
-                    soffice_path,
-                    "--headless",
-                    "--convert-to",
-                    "docx",
-                    "--outdir",
-                    current_target_dir,
-                    source_file_path,
-                ]
-
                 try:
-                    result = subprocess.run(
-                        command,
-                        capture_output=True,
-                        text=True,
-                        check=False,
-                        encoding="utf-8",
-                        errors="replace",
-                    )
-
-                    if result.returncode == 0:
-                        logging.info(
-                            f"SUCCESS: '{source_file_path}' converted to '{target_file_path}'"
-                        )
-                        if result.stdout:
-                            logging.debug(f"STDOUT: {result.stdout.strip()}")
-                    else:
-                        logging.error(
-                            f"FAILED: '{source_file_path}' - Return Code: {result.returncode}"
-                        )
-                        if result.stdout:
-                            logging.error(f"STDOUT: {result.stdout.strip()}")
-                        if result.stderr:
-                            logging.error(f"STDERR: {result.stderr.strip()}")
-
+                    convert_file(source_file_path, current_target_dir, soffice_path)
                 except FileNotFoundError:
                     logging.error(
                         f"ERROR: soffice not found. Please ensure LibreOffice/OpenOffice is installed and 'soffice' is in your PATH, or provide the full path to 'soffice'."
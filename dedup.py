@@ -0,0 +1,210 @@
+# dedup.py (Detekcija skoro identičnih dokumenata pre indeksiranja)
+#
+# Stoji između extract_and_structure.py i index_corpus.py. Za svaki dokument
+# računa MinHash potpis (5-grami reči), LSH "bandovima" nalazi kandidate,
+# proverava procenjenu Jaccard sličnost i grupiše varijante (nacrti istog
+# podneska, kopije u folderima drugih klijenata) u klastere.
+#
+#   --mode skip : u izlaz ide samo jedan dokument po klasteru, sa listom varijanti
+#   --mode link : u izlaz idu svi, varijante imaju "duplicate_of", pa index_corpus
+#                 indeksira samo njihove chunk-ove kojih nema u ostatku klastera
+#
+# Primer:
+#   python dedup.py data/structured_corpus.jsonl data/deduped_corpus.jsonl --mode link
+
+import re
+import json
+import zlib
+import hashlib
+import argparse
+import logging
+from collections import defaultdict
+import numpy as np
+from tqdm import tqdm
+import config
+from document_store import document_id
+from text_normalization import fold_key
+
+logging.basicConfig(filename='dedup_log.txt', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MERSENNE_PRIME = (1 << 31) - 1
+WHITESPACE_PATTERN = re.compile(r"\s+")
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+SHINGLE_BLOCK = 20000  # Koliko shingle-ova se obrađuje odjednom (ograničava memoriju za ogromne dokumente)
+
+
+def normalize_for_hash(text: str) -> str:
+    """Normalizacija pre heširanja: mala slova i sažete beline."""
+    return WHITESPACE_PATTERN.sub(" ", text.lower()).strip()
+
+
+def chunk_hash(text: str) -> str:
+    """Hash normalizovanog teksta chunk-a (za tačno poređenje chunk-ova)."""
+    return hashlib.sha1(normalize_for_hash(text).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    def __init__(self, num_perm=None, shingle_size=None, seed: int = 42):
+        self.num_perm = num_perm or config.DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or config.DEDUP_SHINGLE_SIZE
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(fold_key(text))
+        size = self.shingle_size
+        if len(words) < size:
+            shingles = {" ".join(words)} if words else set()
+        else:
+            shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """
+        MinHash potpis: za svaku permutaciju (a*x + b) mod p, minimum po shingle-ovima.
+        None za dokument sa manje od DEDUP_MIN_SHINGLES shingle-ova: prazni i vrlo kratki
+        dokumenti imali bi (skoro) isti potpis i svi bi završili u jednom klasteru.
+        """
+        hashes = self.shingle_hashes(text)
+        if len(hashes) < config.DEDUP_MIN_SHINGLES:
+            return None
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), SHINGLE_BLOCK):
+            block = hashes[start:start + SHINGLE_BLOCK][np.newaxis, :]
+            permuted = (self.a * block + self.b) % np.uint64(MERSENNE_PRIME)
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+
+def estimated_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_clusters(signatures: list[np.ndarray | None], bands: int, threshold: float) -> UnionFind:
+    """
+    LSH: dokumenti sa istim bandom potpisa su kandidati; potvrđuju se procenjenom sličnošću.
+    Dokumenti bez potpisa (None, prekratki) ostaju svaki u svom klasteru.
+    """
+    sized = [signature for signature in signatures if signature is not None]
+    rows = len(sized[0]) // bands if sized else 0
+    union_find = UnionFind(len(signatures))
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for index, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(index)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                if union_find.find(first) == union_find.find(other):
+                    continue
+                if estimated_jaccard(signatures[first], signatures[other]) >= threshold:
+                    union_find.union(first, other)
+    return union_find
+
+
+def deduplicate_corpus(input_path: str, output_path: str, mode: str, threshold: float):
+    """Dva prolaza kroz JSONL: potpisi i klasteri, pa upis sa oznakama varijanti."""
+    hasher = MinHasher()
+
+    # --- Prolaz 1: Potpisi ---
+    signatures, doc_ids, sources, lengths = [], [], [], []
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line in tqdm(f, desc="MinHash potpisi"):
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("Greška pri parsiranju JSON reda. Red preskočen.")
+                continue
+            text = doc.get("full_text", "")
+            signatures.append(hasher.signature(text))
+            doc_ids.append(document_id(doc))
+            sources.append(doc.get("source_file", ""))
+            lengths.append(len(text))
+
+    if not signatures:
+        print("Nema dokumenata za deduplikaciju.")
+        return
+
+    union_find = find_clusters(signatures, config.DEDUP_BANDS, threshold)
+    clusters = defaultdict(list)
+    for index in range(len(signatures)):
+        clusters[union_find.find(index)].append(index)
+
+    # Kanonski dokument klastera je najduži (obično najpotpuniji nacrt)
+    canonical_of = {}
+    variants_of = {}
+    for members in clusters.values():
+        canonical = max(members, key=lambda index: (lengths[index], sources[index]))
+        for index in members:
+            canonical_of[index] = canonical
+        if len(members) > 1:
+            variants_of[canonical] = [sources[index] for index in members if index != canonical]
+            logging.info(f"Klaster ({len(members)}): {sources[canonical]} <- {variants_of[canonical]}")
+
+    # --- Prolaz 2: Upis ---
+    written, skipped, skipped_chars = 0, 0, 0
+    with open(input_path, 'r', encoding='utf-8') as f, open(output_path, 'w', encoding='utf-8') as outfile:
+        index = -1
+        for line in tqdm(f, desc="Upis"):
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            index += 1
+            doc["doc_id"] = doc_ids[index]
+            canonical = canonical_of[index]
+            if canonical == index:
+                if index in variants_of:
+                    doc["variants"] = variants_of[index]
+            elif mode == "skip":
+                skipped += 1
+                skipped_chars += lengths[index]
+                continue
+            else:
+                doc["duplicate_of"] = doc_ids[canonical]
+            json.dump(doc, outfile, ensure_ascii=False)
+            outfile.write('\n')
+            written += 1
+
+    duplicate_count = sum(len(members) - 1 for members in clusters.values())
+    short_count = sum(signature is None for signature in signatures)
+    print(f"\nDokumenata: {len(signatures)}, klastera sa varijantama: {len(variants_of)}, varijanti: {duplicate_count}")
+    if short_count:
+        print(f"Prekratkih za poređenje (manje od {config.DEDUP_MIN_SHINGLES} shingle-ova): {short_count}")
+    if mode == "skip":
+        total_chars = sum(lengths) or 1
+        print(f"Preskočeno {skipped} dokumenata ({100 * skipped_chars / total_chars:.1f}% teksta). Upisano: {written}")
+    else:
+        print(f"Upisano {written} dokumenata; varijante su označene sa 'duplicate_of'.")
+    print(f"Izlaz: {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pronalazi skoro identične dokumente (MinHash + LSH) u JSONL korpusu.")
+    parser.add_argument("input_file", type=str, help="Putanja do structured_corpus.jsonl fajla.")
+    parser.add_argument("output_file", type=str, help="Putanja do izlaznog .jsonl fajla.")
+    parser.add_argument("--mode", type=str, choices=['skip', 'link'], default='link', help="Preskoči varijante ili ih poveži sa kanonskim dokumentom.")
+    parser.add_argument("--threshold", type=float, default=config.DEDUP_THRESHOLD, help="Minimalna (procenjena) Jaccard sličnost.")
+    args = parser.parse_args()
+    deduplicate_corpus(args.input_file, args.output_file, args.mode, args.threshold)
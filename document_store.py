@@ -0,0 +1,340 @@
+# document_store.py (Lokalno skladište celih dokumenata za "small-to-big" pretragu)
+#
+# Qdrant čuva male chunk-ove za preciznu pretragu, a ovde (SQLite) stoji pun
+# tekst svakog dokumenta i granice njegovih delova. RAGAgent na osnovu doc_id
+# i char_start/char_end iz payload-a čita samo potreban isečak (substr u SQL-u),
+# bez ponovnog čitanja JSONL fajla. Baza se čita preko mmap-a, pa su "slim"
+# tačke (bez teksta u payload-u) jednako brze za prikaz kao i pune.
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    source_file TEXT,
+    case_id TEXT,
+    metadata TEXT,
+    full_text TEXT
+);
+CREATE TABLE IF NOT EXISTS sections (
+    doc_id TEXT,
+    section_index INTEGER,
+    section_type TEXT,
+    char_start INTEGER,
+    char_end INTEGER,
+    PRIMARY KEY (doc_id, section_index)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_hash TEXT PRIMARY KEY,
+    point_id TEXT,
+    primary_doc_id TEXT,
+    primary_chunk_index INTEGER
+);
+CREATE TABLE IF NOT EXISTS chunk_refs (
+    chunk_hash TEXT,
+    doc_id TEXT,
+    chunk_index INTEGER,
+    section_index INTEGER,
+    section_type TEXT,
+    char_start INTEGER,
+    char_end INTEGER,
+    PRIMARY KEY (chunk_hash, doc_id, chunk_index)
+);
+CREATE INDEX IF NOT EXISTS chunk_refs_doc ON chunk_refs (doc_id);
+CREATE INDEX IF NOT EXISTS chunks_point ON chunks (point_id);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def document_id(doc: dict) -> str:
+    """Stabilan ID dokumenta: postojeći 'doc_id' ili hash putanje izvornog fajla."""
+    if doc.get("doc_id"):
+        return doc["doc_id"]
+    return hashlib.sha1(doc.get("source_file", "").encode("utf-8")).hexdigest()[:16]
+
+
+def versioned_store_path(collection_name: str, default_path: str) -> str:
+    """Skladište verzionisane kolekcije (manage_qdrant.py build) stoji pored podrazumevanog."""
+    return os.path.join(os.path.dirname(default_path), f"document_store_{collection_name}.sqlite")
+
+
+def store_path_for(collection_name: str, default_path: str) -> str:
+    """Skladište koje pripada kolekciji: verzionisano ako postoji, inače podrazumevano."""
+    path = versioned_store_path(collection_name, default_path)
+    return path if os.path.exists(path) else default_path
+
+
+def resolve_collection(client, alias: str | None = None, default_collection: str | None = None) -> tuple[str, str]:
+    """
+    (ime za pretragu, konkretna kolekcija): alias (QDRANT_COLLECTION_ALIAS) ako postoji
+    (manage_qdrant.py switch), inače QDRANT_COLLECTION_NAME. Uz konkretnu kolekciju ide
+    i njeno skladište (store_path_for).
+    """
+    alias = config.QDRANT_COLLECTION_ALIAS if alias is None else alias
+    default_collection = default_collection or config.QDRANT_COLLECTION_NAME
+    if alias:
+        aliases = {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+        if alias in aliases:
+            return alias, aliases[alias]
+    return default_collection, default_collection
+
+
+class DocumentStore:
+    def __init__(self, path: str, readonly: bool = False, mmap_bytes: int = 0):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+        if mmap_bytes:
+            self.conn.execute(f"PRAGMA mmap_size = {int(mmap_bytes)}")
+        # Streamlit poziva agenta iz više niti
+        self._lock = threading.Lock()
+
+    def put_document(self, doc_id: str, doc: dict, sections: list[dict]):
+        """Upisuje (ili zamenjuje) dokument i granice njegovih delova. Commit radi pozivalac."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, source_file, case_id, metadata, full_text) VALUES (?, ?, ?, ?, ?)",
+                (doc_id, doc.get("source_file", ""), doc.get("case_id", ""),
+                 json.dumps(doc.get("metadata", {}), ensure_ascii=False), doc.get("full_text", "")),
+            )
+            self.conn.execute("DELETE FROM sections WHERE doc_id = ?", (doc_id,))
+            self.conn.executemany(
+                "INSERT INTO sections (doc_id, section_index, section_type, char_start, char_end) VALUES (?, ?, ?, ?, ?)",
+                [(doc_id, s["section_index"], s["section_type"], s["char_start"], s["char_end"]) for s in sections],
+            )
+
+    def delete_document(self, doc_id: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM sections WHERE doc_id = ?", (doc_id,))
+
+    # --- Jedinstveni chunk-ovi i reference (jedan Qdrant point za isti tekst u više dokumenata) ---
+
+    def get_chunk(self, chunk_hash: str) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT point_id, primary_doc_id, primary_chunk_index FROM chunks WHERE chunk_hash = ?", (chunk_hash,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"chunk_hash": chunk_hash, "point_id": row[0], "primary_doc_id": row[1], "primary_chunk_index": row[2]}
+
+    def add_chunk(self, chunk_hash: str, point_id: str, doc_id: str, chunk_index: int):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunks (chunk_hash, point_id, primary_doc_id, primary_chunk_index) VALUES (?, ?, ?, ?)",
+                (chunk_hash, point_id, doc_id, chunk_index),
+            )
+
+    def set_chunk_primary(self, chunk_hash: str, doc_id: str, chunk_index: int):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE chunks SET primary_doc_id = ?, primary_chunk_index = ? WHERE chunk_hash = ?",
+                (doc_id, chunk_index, chunk_hash),
+            )
+
+    def delete_chunk(self, chunk_hash: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM chunks WHERE chunk_hash = ?", (chunk_hash,))
+
+    def add_chunk_ref(self, chunk_hash: str, doc_id: str, chunk: dict):
+        """Beleži da dokument doc_id sadrži chunk (sa svojim offset-ima)."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunk_refs (chunk_hash, doc_id, chunk_index, section_index, section_type, char_start, char_end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chunk_hash, doc_id, chunk["chunk_index"], chunk["section_index"], chunk["section_type"],
+                 chunk["char_start"], chunk["char_end"]),
+            )
+
+    def document_chunk_refs(self, doc_id: str) -> dict[tuple[str, int], tuple]:
+        """{(chunk_hash, chunk_index): (section_index, section_type, char_start, char_end)} za reference dokumenta."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT chunk_hash, chunk_index, section_index, section_type, char_start, char_end FROM chunk_refs WHERE doc_id = ?",
+                (doc_id,),
+            ).fetchall()
+        return {(row[0], row[1]): tuple(row[2:]) for row in rows}
+
+    def remove_chunk_refs(self, doc_id: str) -> list[str]:
+        """Briše sve reference dokumenta i vraća hash-eve chunk-ova kojima se promenio broj referenci."""
+        with self._lock:
+            hashes = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT chunk_hash FROM chunk_refs WHERE doc_id = ?", (doc_id,)
+            )]
+            self.conn.execute("DELETE FROM chunk_refs WHERE doc_id = ?", (doc_id,))
+        return hashes
+
+    def chunk_ref_count(self, chunk_hash: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunk_refs WHERE chunk_hash = ?", (chunk_hash,)).fetchone()[0]
+
+    def get_chunk_ref(self, chunk_hash: str, doc_id: str | None = None, chunk_index: int | None = None) -> dict | None:
+        """Vraća određenu referencu, ili prvu preostalu ako doc_id nije zadat."""
+        query = "SELECT doc_id, chunk_index, section_index, section_type, char_start, char_end FROM chunk_refs WHERE chunk_hash = ?"
+        params = [chunk_hash]
+        if doc_id is not None:
+            query += " AND doc_id = ? AND chunk_index = ?"
+            params += [doc_id, chunk_index]
+        with self._lock:
+            row = self.conn.execute(query + " ORDER BY rowid LIMIT 1", params).fetchone()
+        if not row:
+            return None
+        return {"doc_id": row[0], "chunk_index": row[1], "section_index": row[2], "section_type": row[3],
+                "char_start": row[4], "char_end": row[5]}
+
+    def iter_document_points(self, fetch_size: int = 10000):
+        """(doc_id, point_id) za sve chunk-ove svih dokumenata, sortirano po doc_id."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT r.doc_id, c.point_id FROM chunk_refs r JOIN chunks c ON c.chunk_hash = r.chunk_hash ORDER BY r.doc_id"
+            )
+            rows = cursor.fetchmany(fetch_size)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(fetch_size)
+
+    def point_ids_for_documents(self, doc_ids: list[str], limit: int | None = None) -> list[str]:
+        """
+        Tačke koje sadrže chunk-ove datih dokumenata, preko chunk_refs: deljeni chunk ima
+        doc_id samo prvog dokumenta u payload-u, pa filter po metadata.doc_id ne bi bio potpun.
+        Vraća najviše limit + 1 ID, da bi pozivalac mogao da prepozna prekoračenje.
+        """
+        point_ids = set()
+        with self._lock:
+            for start in range(0, len(doc_ids), 900):
+                batch = doc_ids[start:start + 900]
+                rows = self.conn.execute(
+                    "SELECT DISTINCT c.point_id FROM chunk_refs r JOIN chunks c ON c.chunk_hash = r.chunk_hash "
+                    f"WHERE r.doc_id IN ({', '.join('?' * len(batch))})", batch,
+                )
+                point_ids.update(row[0] for row in rows)
+                if limit is not None and len(point_ids) > limit:
+                    break
+        return list(point_ids)
+
+    def point_documents(self, point_ids: list) -> dict[str, list[tuple[str, str]]]:
+        """
+        {point_id: [(doc_id, source_file), ...]}: svi dokumenti koji sadrže chunk tačke, a ne
+        samo onaj čiji je doc_id u payload-u (deljeni chunk-ovi, varijante iz dedup.py).
+        """
+        point_ids = list(dict.fromkeys(str(point_id) for point_id in point_ids))
+        documents = {}
+        with self._lock:
+            for start in range(0, len(point_ids), 900):
+                batch = point_ids[start:start + 900]
+                rows = self.conn.execute(
+                    "SELECT DISTINCT c.point_id, r.doc_id, d.source_file FROM chunks c "
+                    "JOIN chunk_refs r ON r.chunk_hash = c.chunk_hash LEFT JOIN documents d ON d.doc_id = r.doc_id "
+                    f"WHERE c.point_id IN ({', '.join('?' * len(batch))})", batch,
+                )
+                for point_id, doc_id, source_file in rows:
+                    documents.setdefault(point_id, []).append((doc_id, source_file))
+        return documents
+
+    def variant_doc_ids(self) -> set:
+        """Dokumenti označeni kao varijante drugog dokumenta (dedup.py --mode link)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT doc_id FROM documents WHERE json_extract(metadata, '$.duplicate_of') IS NOT NULL"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def bind_collection(self, collection_name: str):
+        """
+        Tabela chunks važi samo za kolekciju u koju su tačke upisane: isto skladište sa drugom
+        kolekcijom bi chunk-ove smatralo već indeksiranim i ne bi ih upisalo. Prvo indeksiranje
+        vezuje skladište za kolekciju, a svaka druga kolekcija dobija grešku.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM store_meta WHERE key = 'collection'").fetchone()
+            if row is None:
+                self.conn.execute("INSERT INTO store_meta (key, value) VALUES ('collection', ?)", (collection_name,))
+                self.conn.commit()
+            elif row[0] != collection_name:
+                raise ValueError(f"Skladište '{self.path}' pripada kolekciji '{row[0]}', a ne '{collection_name}'. "
+                                 f"Koristite posebno skladište (npr. manage_qdrant.py build) ili istu kolekciju.")
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def rollback(self):
+        """Odbacuje neupisane izmene (npr. posle greške usred paketa)."""
+        with self._lock:
+            self.conn.rollback()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def get_text(self, doc_id: str, char_start: int, char_end: int) -> str | None:
+        """Vraća isečak teksta dokumenta bez učitavanja celog full_text-a."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT substr(full_text, ?, ?) FROM documents WHERE doc_id = ?",
+                (char_start + 1, max(0, char_end - char_start), doc_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_section(self, doc_id: str, section_index: int) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT section_type, char_start, char_end FROM sections WHERE doc_id = ? AND section_index = ?",
+                (doc_id, section_index),
+            ).fetchone()
+        if not row:
+            return None
+        return {"section_index": section_index, "section_type": row[0], "char_start": row[1], "char_end": row[2]}
+
+    def get_metadata_many(self, doc_ids: list[str]) -> dict:
+        """Vraća {doc_id: {source_file, case_id, metadata}} za više dokumenata jednim upitom."""
+        doc_ids = list(dict.fromkeys(doc_ids))
+        if not doc_ids:
+            return {}
+        placeholders = ",".join("?" * len(doc_ids))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT doc_id, source_file, case_id, metadata FROM documents WHERE doc_id IN ({placeholders})", doc_ids
+            ).fetchall()
+        return {row[0]: {"source_file": row[1], "case_id": row[2], "metadata": json.loads(row[3])} for row in rows}
+
+    def get_document(self, doc_id: str) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT source_file, case_id, metadata, full_text FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"doc_id": doc_id, "source_file": row[0], "case_id": row[1], "metadata": json.loads(row[2]), "full_text": row[3]}
+
+    def expand_span(self, doc_id: str, section_index: int | None, char_start: int, char_end: int,
+                    mode: str, window_chars: int, max_section_chars: int) -> tuple[int, int] | None:
+        """
+        Računa šire granice oko chunk-a: ceo deo dokumenta ('section'), ili prozor
+        od window_chars oko chunk-a ('window', i za delove duže od max_section_chars).
+        """
+        section = self.get_section(doc_id, section_index) if section_index is not None else None
+        if section is None:
+            return None
+        if mode == "section" and section["char_end"] - section["char_start"] <= max_section_chars:
+            return section["char_start"], section["char_end"]
+        padding = max(0, (window_chars - (char_end - char_start)) // 2)
+        start = max(section["char_start"], char_start - padding)
+        end = min(section["char_end"], char_end + padding)
+        return start, end
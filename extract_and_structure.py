@@ -1,14 +1,25 @@
 # extract_and_structure.py (Verzija 5.0 - sa "Kamenom iz Rozete" mapom)
+#
+# .docx se čita direktno iz ZIP arhive: word/document.xml se parsira inkrementalno
+# (iterparse), paragraf po paragraf, a obrađeni elementi se odmah brišu iz stabla.
+# Dekodiranje (YUSCII, ftfy) i uklanjanje boilerplate-a rade se po paragrafu, pa
+# i dokument od više stotina strana ne pravi celo XML stablo ni više kopija teksta.
+# Tabele se čitaju red po red ("ćelija | ćelija"), što python-docx preko
+# document.paragraphs nije vraćao.
 
 import os
 import re
 import json
+import zipfile
 import argparse
-import docx
+import xml.etree.ElementTree as ET
+from collections import deque
 from tqdm import tqdm
 import logging
 import ftfy
 import config
+from text_normalization import canonical_text
+from facets import FacetStore
 
 logging.basicConfig(
     filename='extraction_log.txt',
@@ -70,34 +81,140 @@ def fix_legacy_text(text: str) -> str:
     # potencijalne greške u kodiranju (poznate kao "mojibake").
     text = ftfy.fix_text(text)
     
+    # Korak 3: Ćirilica i ligature (ǉ, ǌ, ǆ) u latinicu, da se isti tekst uvek indeksira isto.
+    text = canonical_text(text)
+    
     return text
 
-# Ostatak koda je skoro isti, samo poziva novu, jednostavniju funkciju
-def extract_and_clean_document(document: docx.Document) -> tuple[str, dict]:
-    main_text = "\n".join([para.text for para in document.paragraphs if para.text])
-    
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+HEADER_FOOTER_PART = re.compile(r"^word/(header|footer)\d*\.xml$")
+
+def iter_docx_paragraphs(xml_file):
+    """
+    Vraća tekst paragrafa iz WordprocessingML dela (document.xml, header*.xml, ...)
+    redom kojim se pojavljuju. Red tabele se vraća kao lista ćelija: spajaju se tek posle
+    dekodiranja, jer YUSCII mapa '|' pretvara u 'đ'. Od mc:AlternateContent se čita samo
+    mc:Choice: mc:Fallback (npr. VML kopija text box-a) ima isti tekst još jednom.
+    """
+    paragraphs = []  # Stek: paragraf u text box-u je ugnježden u drugi paragraf
+    tables = []  # Stek tabela: (ćelije tekućeg reda, paragrafi tekuće ćelije)
+    depth, root = 0, None
+    fallback = 0  # Dubina unutar mc:Fallback
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = elem
+            if tag == MC_FALLBACK:
+                fallback += 1
+            if fallback:
+                continue
+            if tag == W_NS + "p":
+                paragraphs.append([])
+            elif tag == W_NS + "tbl":
+                tables.append(([], []))
+            continue
+
+        depth -= 1
+        if tag == MC_FALLBACK:
+            fallback -= 1
+            elem.clear()
+            continue
+        if fallback:
+            continue
+        if tag == W_NS + "t" and paragraphs:
+            paragraphs[-1].append(elem.text or "")
+        elif tag == W_NS + "tab" and paragraphs:
+            paragraphs[-1].append("\t")
+        elif tag in (W_NS + "br", W_NS + "cr") and paragraphs:
+            paragraphs[-1].append("\n")
+        elif tag == W_NS + "p":
+            text = "".join(paragraphs.pop())
+            if tables:
+                tables[-1][1].append(text)
+            elif text:
+                yield text
+            elem.clear()
+        elif tag == W_NS + "tc" and tables:
+            row, cell = tables[-1]
+            row.append(" ".join(part.strip() for part in cell if part.strip()))
+            cell.clear()
+        elif tag == W_NS + "tr" and tables:
+            row = tables[-1][0]
+            cells = [cell for cell in row if cell]
+            if cells:
+                yield cells
+            row.clear()
+        elif tag == W_NS + "tbl":
+            tables.pop()
+            elem.clear()
+        # Elementi direktno u <w:body> su obrađeni - brišu se da stablo ne bi raslo
+        if depth == 2 and root is not None:
+            for body in root:
+                body.clear()
+
+def header_footer_phrases(archive: zipfile.ZipFile) -> set:
+    """Tekst zaglavlja i podnožja (word/header*.xml, word/footer*.xml), očišćen kao i glavni tekst."""
+    phrases = set()
+    for name in archive.namelist():
+        if HEADER_FOOTER_PART.match(name):
+            with archive.open(name) as part:
+                for text in clean_paragraphs(iter_docx_paragraphs(part), []):
+                    phrases.add(text.strip())
+    return phrases
+
+def clean_text(text: str, phrases_to_remove: list[str]) -> str:
     # Pozivamo našu finalnu, dvostepenu funkciju za popravku!
-    main_text = fix_legacy_text(main_text)
-    
-    # Deo za čišćenje boilerplate teksta
-    text_to_remove = set()
-    for phrase in config.BOILERPLATE_PHRASES_TO_REMOVE:
-        text_to_remove.add(phrase)
-    if config.REMOVE_HEADERS_FOOTERS:
-        for section in document.sections:
-            for para in section.header.paragraphs:
-                # Važno: I ovde primenite istu funkciju!
-                if para.text: text_to_remove.add(fix_legacy_text(para.text.strip()))
-            for para in section.footer.paragraphs:
-                # I ovde takođe!
-                if para.text: text_to_remove.add(fix_legacy_text(para.text.strip()))
-    for phrase_to_remove in text_to_remove:
-        if phrase_to_remove:
-            main_text = main_text.replace(phrase_to_remove, "")
-    main_text = re.sub(r'\n{2,}', '\n', main_text).strip()
+    text = fix_legacy_text(text)
+    for phrase in phrases_to_remove:
+        if phrase in text:
+            text = text.replace(phrase, "")
+    return text
+
+def clean_paragraphs(paragraphs, phrases_to_remove: list[str]):
+    """
+    Dekodiranje i uklanjanje boilerplate-a paragraf po paragraf; prazni paragrafi se preskaču.
+    Red tabele (lista ćelija) se čisti ćeliju po ćeliju i tek onda spaja sa " | ".
+    """
+    for item in paragraphs:
+        if isinstance(item, list):
+            cells = [cell.strip() for cell in (clean_text(cell, phrases_to_remove) for cell in item) if cell.strip()]
+            text = " | ".join(cells)
+        else:
+            text = clean_text(item, phrases_to_remove)
+        if text.strip():
+            yield text
+
+def extract_and_clean_document(file_path: str) -> tuple[str, dict]:
+    with zipfile.ZipFile(file_path) as archive:
+        # Deo za čišćenje boilerplate teksta
+        text_to_remove = set(config.BOILERPLATE_PHRASES_TO_REMOVE)
+        if config.REMOVE_HEADERS_FOOTERS:
+            text_to_remove |= header_footer_phrases(archive)
+        # Duže fraze prve, da kraća fraza ne "pojede" deo duže
+        phrases = sorted((phrase for phrase in text_to_remove if phrase), key=len, reverse=True)
+
+        lines, head, head_length = [], [], 0
+        tail, tail_length = deque(), 0
+        with archive.open("word/document.xml") as document_xml:
+            for text in clean_paragraphs(iter_docx_paragraphs(document_xml), phrases):
+                lines.append(text)
+                if head_length < config.EXTRACTION_METADATA_WINDOW_CHARS:
+                    head.append(text)
+                    head_length += len(text) + 1
+                tail.append(text)
+                tail_length += len(text) + 1
+                while len(tail) > 1 and tail_length - len(tail[0]) - 1 >= config.EXTRACTION_METADATA_TAIL_CHARS:
+                    tail_length -= len(tail.popleft()) + 1
+    main_text = "\n".join(lines).strip()
     
-    # Ekstrakcija metapodataka iz sada potpuno čistog teksta
-    metadata = extract_metadata_from_text(main_text)
+    # Metapodaci iz zaglavlja presude (početak dokumenta); ono što tamo nema (obično sudija,
+    # koji potpisuje presudu) traži se u završnom delu
+    metadata = extract_metadata_from_text("\n".join(head))
+    for key, value in extract_metadata_from_text("\n".join(tail)).items():
+        metadata.setdefault(key, value)
     
     return main_text, metadata
 
@@ -121,34 +238,52 @@ def extract_metadata_from_text(text: str) -> dict:
                 metadata[key] = extracted_value
     return metadata
 
-def process_docx_files(source_dir: str, output_path: str):
+def extract_file(file_path: str) -> dict:
+    """Ekstrahuje jedan .docx fajl u zapis za JSONL korpus (koristi i pipeline.py)."""
+    cleaned_text, metadata = extract_and_clean_document(file_path)
+    return {
+        "source_file": file_path, "case_id": metadata.get("case_id", "Nepoznato"), "full_text": cleaned_text,
+        "metadata": {
+            "judge": metadata.get("judge", "Nepoznato"), "plaintiff": metadata.get("plaintiff", []),
+            "defendant": metadata.get("defendant", []), "decision_date": metadata.get("decision_date", "Nepoznato"),
+            "court": metadata.get("court", "Nepoznato"), "document_type": metadata.get("document_type", "Nepoznato")
+        }
+    }
+
+def process_docx_files(source_dir: str, output_path: str, facets_path: str | None = config.FACETS_DB_PATH):
+    """
+    Ekstrahuje sve .docx fajlove u JSONL (prepisuje izlaz). Fasete (datum, sud, sudija, tip) se
+    upisuju odmah u facets_path, za brzo grupisanje bez čitanja JSONL-a; None ih preskače.
+    """
     print(f"Započinjanje ekstrakcije iz direktorijuma: {source_dir}")
     all_files = [os.path.join(root, file) for root, _, files in os.walk(source_dir) for file in files if file.lower().endswith('.docx')]
     if not all_files:
         print("Nema .docx fajlova u navedenom direktorijumu.")
         return
+    facet_store = FacetStore(facets_path) if facets_path else None
+    if facet_store is not None:
+        # Korpus se piše ispočetka, pa i tabela faseta (bez redova za fajlove kojih više nema)
+        facet_store.clear()
     with open(output_path, 'w', encoding='utf-8') as outfile:
         for file_path in tqdm(all_files, desc="Procesiranje dokumenata"):
             try:
-                document = docx.Document(file_path)
-                cleaned_text, metadata = extract_and_clean_document(document)
-                structured_data = {
-                    "source_file": file_path, "case_id": metadata.get("case_id", "Nepoznato"), "full_text": cleaned_text,
-                    "metadata": {
-                        "judge": metadata.get("judge", "Nepoznato"), "plaintiff": metadata.get("plaintiff", []),
-                        "defendant": metadata.get("defendant", []), "decision_date": metadata.get("decision_date", "Nepoznato"),
-                        "court": metadata.get("court", "Nepoznato"), "document_type": metadata.get("document_type", "Nepoznato")
-                    }
-                }
+                structured_data = extract_file(file_path)
                 json.dump(structured_data, outfile, ensure_ascii=False)
                 outfile.write('\n')
+                if facet_store is not None:
+                    facet_store.put(structured_data)
             except Exception as e:
                 logging.warning(f"Greška pri obradi fajla {file_path}: {e}")
+    if facet_store is not None:
+        facet_store.commit()
+        facet_store.close()
     print(f"\nEkstrakcija završena. Podaci sačuvani u: {output_path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ekstrahuje, ČISTI i metapodatke iz .docx fajlova.")
     parser.add_argument("source_directory", type=str, help="Putanja do .docx fajlova.")
     parser.add_argument("output_file", type=str, help="Putanja do izlaznog .jsonl fajla.")
+    parser.add_argument("--facets-db", type=str, default=config.FACETS_DB_PATH, help="SQLite tabela faseta.")
+    parser.add_argument("--no-facets", action="store_true", help="Ne upisuj fasete.")
     args = parser.parse_args()
-    process_docx_files(args.source_directory, args.output_file)
\ No newline at end of file
+    process_docx_files(args.source_directory, args.output_file, None if args.no_facets else args.facets_db)
\ No newline at end of file
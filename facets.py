@@ -0,0 +1,226 @@
+# facets.py (Fasete dokumenata: brojanje i grupisanje po datumu, sudu, sudiji i tipu)
+#
+# Pitanja tipa "sve presude sudije X" ili "kako se tumačenje člana menjalo kroz
+# deset godina" traže brojanje i grupisanje po metapodacima, što bi inače
+# značilo skrolovanje svih Qdrant tačaka ili čitanje celog JSONL-a. Ovde se pri
+# ekstrakciji (extract_and_structure.py, pipeline.py) za svaki dokument upisuje
+# jedan red u malu SQLite tabelu: normalizovan datum (ISO), godina, sud, sudija
+# i tip, uz ključeve bez dijakritika za poređenje. Group-by i vremenske serije
+# su tada jedan SQL upit nad indeksiranim kolonama, a dobijeni skup doc_id-jeva
+# RAGAgent preko chunk_refs (document_store.py) prevodi u ID-jeve tačaka za
+# Qdrant filter, da bi se obuhvatili i chunk-ovi deljeni sa drugim dokumentima.
+#
+# Primer (popunjavanje iz već postojećeg korpusa):
+#   python facets.py data/structured_corpus.jsonl
+# Upiti: python manage_qdrant.py facets --group-by judge --date-from 2000 --date-to 2010
+
+import os
+import re
+import json
+import argparse
+import sqlite3
+import logging
+import threading
+from tqdm import tqdm
+import config
+from document_store import document_id
+from text_normalization import canonical_text, fold_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facets (
+    doc_id TEXT PRIMARY KEY,
+    source_file TEXT,
+    case_id TEXT,
+    decision_date TEXT,
+    year INTEGER,
+    court TEXT,
+    court_key TEXT,
+    judge TEXT,
+    judge_key TEXT,
+    document_type TEXT,
+    document_type_key TEXT
+);
+CREATE INDEX IF NOT EXISTS facets_date ON facets (decision_date);
+CREATE INDEX IF NOT EXISTS facets_court ON facets (court_key, decision_date);
+CREATE INDEX IF NOT EXISTS facets_judge ON facets (judge_key, decision_date);
+CREATE INDEX IF NOT EXISTS facets_type ON facets (document_type_key, decision_date);
+"""
+
+FACET_FIELDS = ("court", "judge", "document_type")
+TIMELINE_PERIODS = {"year": 4, "month": 7, "day": 10}  # Dužina prefiksa ISO datuma
+UNKNOWN_VALUES = {"", "nepoznato"}
+DATE_PATTERN = re.compile(r"(\d{1,2})\s*\.\s*(\d{1,2})\s*\.\s*(\d{4})")
+ISO_DATE_PATTERN = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+
+
+def normalize_date(value: str | None) -> str | None:
+    """'12.3.2005.', '12. 03. 2005' ili '2005-03-12' -> '2005-03-12'; neispravan datum -> None."""
+    if not value:
+        return None
+    match = DATE_PATTERN.search(value)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+    else:
+        match = ISO_DATE_PATTERN.search(value)
+        if not match:
+            return None
+        year, month, day = (int(part) for part in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31 and 1800 <= year <= 2100):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def date_bound(value: str | None, upper: bool = False) -> str | None:
+    """Granica za filter: godina ('2005') se širi na ceo godinu, ostalo kao normalize_date."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if YEAR_PATTERN.match(value):
+        return f"{value}-12-31" if upper else f"{value}-01-01"
+    return normalize_date(value)
+
+
+def _known(value) -> str | None:
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value if item)
+    value = canonical_text(str(value or "")).strip()
+    return None if value.lower() in UNKNOWN_VALUES else value
+
+
+def facet_row(record: dict) -> tuple:
+    """Red tabele za jedan zapis korpusa (isti oblik kao u structured_corpus.jsonl)."""
+    metadata = record.get("metadata", {})
+    decision_date = normalize_date(metadata.get("decision_date"))
+    court, judge, document_type = (_known(metadata.get(field)) for field in FACET_FIELDS)
+    return (
+        document_id(record), record.get("source_file", ""), _known(record.get("case_id")),
+        decision_date, int(decision_date[:4]) if decision_date else None,
+        court, fold_key(court) if court else None,
+        judge, fold_key(judge) if judge else None,
+        document_type, fold_key(document_type) if document_type else None,
+    )
+
+
+class FacetStore:
+    def __init__(self, path: str = config.FACETS_DB_PATH, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def put(self, record: dict):
+        """Upisuje (ili zamenjuje) fasete dokumenta. Commit radi pozivalac."""
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO facets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", facet_row(record))
+
+    def delete(self, doc_id: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM facets WHERE doc_id = ?", (doc_id,))
+
+    def clear(self):
+        """Briše sve redove (korpus se piše ispočetka). Commit radi pozivalac."""
+        with self._lock:
+            self.conn.execute("DELETE FROM facets")
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _where(filters: dict | None) -> tuple[str, list]:
+        """
+        Filteri: court, judge (deo naziva/imena, bez obzira na pismo i dijakritike),
+        document_type (tačno), date_from / date_to (godina ili datum).
+        """
+        filters = filters or {}
+        clauses, params = [], []
+        for field in ("court", "judge"):
+            if filters.get(field):
+                clauses.append(f"{field}_key LIKE ?")
+                params.append(f"%{fold_key(filters[field])}%")
+        if filters.get("document_type"):
+            clauses.append("document_type_key = ?")
+            params.append(fold_key(filters["document_type"]))
+        date_from, date_to = date_bound(filters.get("date_from")), date_bound(filters.get("date_to"), upper=True)
+        if date_from:
+            clauses.append("decision_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("decision_date <= ?")
+            params.append(date_to)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def group_by(self, field: str, filters: dict | None = None, limit: int | None = None) -> list[tuple[str, int]]:
+        """Broj dokumenata po vrednosti polja (court, judge, document_type ili year), opadajuće."""
+        if field == "year":
+            key_column, label = "year", "year"
+        elif field in FACET_FIELDS:
+            key_column, label = f"{field}_key", f"MIN({field})"
+        else:
+            raise ValueError(f"Nepoznato polje za grupisanje: {field}")
+        where, params = self._where(filters)
+        sql = (f"SELECT {label}, COUNT(*) AS n FROM facets{where} GROUP BY {key_column} "
+               f"ORDER BY n DESC, {key_column}" + (" LIMIT ?" if limit else ""))
+        with self._lock:
+            return self.conn.execute(sql, params + ([limit] if limit else [])).fetchall()
+
+    def timeline(self, period: str = "year", filters: dict | None = None, by: str | None = None) -> list[tuple]:
+        """Broj dokumenata po periodu (year/month/day), opciono i po polju: (period, [vrednost,] broj)."""
+        length = TIMELINE_PERIODS[period]
+        if by is not None and by not in FACET_FIELDS:
+            raise ValueError(f"Nepoznato polje za grupisanje: {by}")
+        where, params = self._where(filters)
+        where += (" AND " if where else " WHERE ") + "decision_date IS NOT NULL"
+        period_column = f"substr(decision_date, 1, {length})"
+        if by is None:
+            sql = f"SELECT {period_column} AS period, COUNT(*) FROM facets{where} GROUP BY period ORDER BY period"
+        else:
+            sql = (f"SELECT {period_column} AS period, MIN({by}), COUNT(*) FROM facets{where} "
+                   f"GROUP BY period, {by}_key ORDER BY period, COUNT(*) DESC")
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def doc_ids(self, filters: dict | None = None, limit: int | None = None) -> list[str]:
+        """doc_id-jevi dokumenata koji zadovoljavaju filtere, hronološki (za Qdrant filter)."""
+        where, params = self._where(filters)
+        sql = f"SELECT doc_id FROM facets{where} ORDER BY decision_date" + (" LIMIT ?" if limit else "")
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql, params + ([limit] if limit else []))]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM facets").fetchone()[0]
+
+
+def build_facets(jsonl_path: str, facets_path: str = config.FACETS_DB_PATH) -> int:
+    """Popunjava tabelu faseta iz postojećeg JSONL korpusa (za korpus izvučen pre uvođenja faseta)."""
+    store = FacetStore(facets_path)
+    written = 0
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(tqdm(f, desc="Fasete"), start=1):
+            try:
+                store.put(json.loads(line))
+                written += 1
+            except json.JSONDecodeError:
+                logging.warning(f"Greška pri parsiranju reda {line_number}. Red preskočen.")
+    store.commit()
+    store.close()
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pravi tabelu faseta (datum, sud, sudija, tip) iz JSONL korpusa.")
+    parser.add_argument("jsonl_file", type=str, nargs="?", default=config.STRUCTURED_JSONL_PATH, help="Putanja do .jsonl korpusa.")
+    parser.add_argument("--facets-db", type=str, default=config.FACETS_DB_PATH, help="SQLite tabela faseta.")
+    args = parser.parse_args()
+    count = build_facets(args.jsonl_file, args.facets_db)
+    print(f"Upisane fasete za {count} dokumenata: {args.facets_db}")
@@ -0,0 +1,167 @@
+# feedback.py (Ocene odgovora iz aplikacije i "boost" tabela za pretragu)
+#
+# app.py dopisuje svaku ocenu (palac gore/dole) i ispravku u FEEDBACK_LOG_PATH:
+# jedan JSON red sa pitanjem, ID-jevima pronađenih tačaka, dokumentima i
+# odgovorom. Log se nikad ne prepisuje.
+#
+# BoostTable iz loga pravi zbir ocena po tački i po dokumentu i drži ga u
+# memoriji; RAGAgent ga primenjuje pri rerangiranju bez dodatnog upita ka
+# Qdrant-u. Tabela pamti do kog bajta je log pročitan, pa osvežavanje čita
+# samo nove redove. Stanje (zbirovi + offset) se čuva i u FEEDBACK_BOOST_CACHE_PATH,
+# da novi proces ne bi ponovo parsirao ceo log.
+#
+# Primer:
+#   python feedback.py --top 20   # osveži tabelu i prikaži najbolje/najlošije ocenjene dokumente
+
+import os
+import json
+import math
+import time
+import zlib
+import logging
+import argparse
+import threading
+import config
+
+_write_lock = threading.Lock()
+
+
+def record_feedback(question: str, point_ids: list, doc_ids: list, answer: str, rating: int = 0,
+                    correction: str | None = None, model: str | None = None, log_path: str = config.FEEDBACK_LOG_PATH):
+    """Dopisuje jednu ocenu u log (rating: 1 = dobar odgovor, -1 = loš, 0 = samo ispravka)."""
+    record = {
+        "ts": time.time(), "question": question, "point_ids": [str(point_id) for point_id in point_ids],
+        "doc_ids": list(doc_ids), "answer": answer, "rating": rating, "correction": correction or "", "model": model,
+    }
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with _write_lock, open(log_path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def _log_fingerprint(log_path: str, length: int) -> int:
+    """Kontrolna suma već pročitanog početka loga: ako se log zameni drugim fajlom, keš više ne važi."""
+    with open(log_path, 'rb') as f:
+        return zlib.crc32(f.read(min(length, 4096)))
+
+
+class BoostTable:
+    def __init__(self, log_path: str = config.FEEDBACK_LOG_PATH, cache_path: str | None = config.FEEDBACK_BOOST_CACHE_PATH):
+        self.log_path = log_path
+        self.cache_path = cache_path
+        self.point_scores = {}
+        self.doc_scores = {}
+        self.offset = 0
+        self.fingerprint = None
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _reset(self):
+        self.point_scores, self.doc_scores, self.offset, self.fingerprint = {}, {}, 0, None
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self.point_scores, self.doc_scores = cached["points"], cached["docs"]
+            self.offset, self.fingerprint = cached["offset"], cached["fingerprint"]
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Keš ocena '{self.cache_path}' nije upotrebljiv, čita se ceo log: {e}")
+            self._reset()
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"offset": self.offset, "fingerprint": self.fingerprint,
+                       "points": self.point_scores, "docs": self.doc_scores}, f)
+        os.replace(temp_path, self.cache_path)
+
+    def _apply(self, record: dict):
+        rating = record.get("rating") or 0
+        if not rating:
+            return
+        for point_id in record.get("point_ids", []):
+            self.point_scores[point_id] = self.point_scores.get(point_id, 0) + rating
+        for doc_id in record.get("doc_ids", []):
+            self.doc_scores[doc_id] = self.doc_scores.get(doc_id, 0) + rating
+
+    def refresh(self) -> int:
+        """Čita redove dopisane od poslednjeg čitanja; vraća broj novih ocena."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.log_path)
+            except OSError:
+                return 0
+            if size == self.offset:
+                return 0
+            # Log skraćen ili zamenjen: tabela se pravi iz početka
+            if size < self.offset or (self.offset and _log_fingerprint(self.log_path, self.offset) != self.fingerprint):
+                self._reset()
+            added = 0
+            with open(self.log_path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            # Nedovršen poslednji red (upis u toku) ostaje za sledeće osvežavanje
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    self._apply(json.loads(line))
+                    added += 1
+                except ValueError:
+                    logging.warning(f"Neispravan red u logu ocena na offset-u {self.offset}.")
+            self.offset += end
+            self.fingerprint = _log_fingerprint(self.log_path, self.offset)
+            if added:
+                try:
+                    self._save_cache()
+                except OSError as e:
+                    logging.warning(f"Keš ocena nije sačuvan: {e}")
+            return added
+
+    def boost(self, point_id, doc_id: str | None = None) -> float:
+        """Pomeraj (kao udeo dužine liste kandidata); tanh ograničava uticaj mnogo ponovljenih ocena."""
+        point_score = self.point_scores.get(str(point_id), 0)
+        doc_score = self.doc_scores.get(doc_id, 0) if doc_id else 0
+        return (config.FEEDBACK_POINT_WEIGHT * math.tanh(point_score / config.FEEDBACK_SATURATION)
+                + config.FEEDBACK_DOC_WEIGHT * math.tanh(doc_score / config.FEEDBACK_SATURATION))
+
+    def apply(self, scored_docs: list) -> list:
+        """
+        Preuređuje (Document, score) parove prema ocenama. Radi nad pozicijom u listi, a ne
+        nad skorom, jer lista posle prekinutog rerangiranja meša skorove cross-encodera i
+        kosinusne sličnosti; skorovi se vraćaju nepromenjeni.
+        """
+        self.refresh()
+        if not scored_docs or not (self.point_scores or self.doc_scores):
+            return scored_docs
+        count = len(scored_docs)
+        keyed = [
+            ((count - rank) / count + self.boost(doc.metadata.get("_id"), doc.metadata.get("doc_id")), -rank, doc, score)
+            for rank, (doc, score) in enumerate(scored_docs)
+        ]
+        keyed.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [(doc, score) for _, _, doc, score in keyed]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Osvežava tabelu ocena iz loga i prikazuje najbolje/najlošije ocenjene dokumente.")
+    parser.add_argument("--log", type=str, default=config.FEEDBACK_LOG_PATH, help="Log ocena (JSONL).")
+    parser.add_argument("--top", type=int, default=10, help="Broj dokumenata za prikaz.")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    table = BoostTable(args.log)
+    added = table.refresh()
+    print(f"Novih ocena: {added}, tačaka: {len(table.point_scores)}, dokumenata: {len(table.doc_scores)} "
+          f"({time.perf_counter() - start_time:.3f} s)")
+    ranked = sorted(table.doc_scores.items(), key=lambda item: item[1], reverse=True)
+    print("\n--- Najbolje ocenjeni dokumenti ---")
+    for doc_id, score in ranked[:args.top]:
+        print(f"{score:+d}  {doc_id}")
+    print("\n--- Najlošije ocenjeni dokumenti ---")
+    for doc_id, score in ranked[::-1][:args.top]:
+        print(f"{score:+d}  {doc_id}")
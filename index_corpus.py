@@ -1,15 +1,20 @@
 # index_corpus.py (FINALNA I ISPRAVLJENA VERZIJA)
 
 import os
-from config import DEFAULT_EMBEDDING_MODEL, VECTOR_DIMENSION, DISTANCE_METRIC, BATCH_SIZE, DEFAULT_DEVICE
+from config import DEFAULT_EMBEDDING_MODEL, VECTOR_DIMENSION, DISTANCE_METRIC, BATCH_SIZE, DEFAULT_DEVICE, CHUNK_MAX_TOKENS, DOCUMENT_STORE_PATH, SLIM_PAYLOADS, SLIM_PAYLOAD_FIELDS
 import json
 import argparse
 import uuid
 from tqdm import tqdm
 import logging
+from collections import defaultdict
 from qdrant_client import QdrantClient, models
 from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from legal_chunker import LegalChunker
+from document_store import DocumentStore, document_id
+from dedup import chunk_hash
+from text_normalization import canonical_text, canonical_value
+from similar_cases import DocumentVectorPool, upsert_document_vectors, document_collection_name, document_point_id
 
 # --- Konfiguracija ---
 logging.basicConfig(filename='indexing_log.txt', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,6 +22,8 @@ logging.basicConfig(filename='indexing_log.txt', level=logging.INFO, format='%(a
 # VECTOR_DIMENSION = config.VECTOR_DIMENSION
 # DISTANCE_METRIC = models.Distance.COSINE
 #B ATCH_SIZE = config.BATCH_SIZE # Manji batch size za bolju kontrolu memorije
+# ID tačke se izvodi iz hash-a teksta, pa isti chunk uvek završi u istoj tački
+CHUNK_NAMESPACE = uuid.UUID("6f1c8d52-3b7a-4f0e-9a51-2d4e8c7b9a10")
 
 def setup_qdrant_collection(client: QdrantClient, collection_name: str):
     """Proverava i kreira Qdrant kolekciju."""
@@ -29,60 +36,208 @@ def setup_qdrant_collection(client: QdrantClient, collection_name: str):
             collection_name=collection_name,
             vectors_config=models.VectorParams(size=VECTOR_DIMENSION, distance=DISTANCE_METRIC),
         )
+        # Indeks po tipu dela dokumenta omogućava pretragu samo obrazloženja, izreke itd.
+        # doc_id i polja iz SLIM_PAYLOAD_FIELDS se takođe indeksiraju za brzo filtriranje.
+        for field_name in ["section_type", "doc_id", *SLIM_PAYLOAD_FIELDS]:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=f"metadata.{field_name}",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
 
-def index_corpus(jsonl_path: str, qdrant_url: str, collection_name: str):
-    """Glavna funkcija za indeksiranje JSONL korpusa u Qdrant."""
-    
-    # --- Inicijalizacija ---
-    print("Inicijalizacija klijenata i modela...")
-    qdrant_client = QdrantClient(url=qdrant_url)
-    embedding_model = SentenceTransformer(
+def build_payload(doc: dict, doc_id: str, chunk_index: int, chunk: dict, slim: bool) -> dict:
+    """
+    Pravi payload tačke. U "slim" režimu tačka nosi samo doc_id, redni broj chunk-a,
+    offset-e i polja za filtriranje; tekst i pune metapodatke daje document_store.
+    """
+    reference = {
+        "doc_id": doc_id,
+        "chunk_index": chunk_index,
+        "section_type": chunk["section_type"],
+        "section_index": chunk["section_index"],
+        "char_start": chunk["char_start"],
+        "char_end": chunk["char_end"],
+    }
+    if slim:
+        doc_metadata = doc.get("metadata", {})
+        filter_fields = {key: doc_metadata[key] for key in SLIM_PAYLOAD_FIELDS if key in doc_metadata}
+        return {"metadata": {**filter_fields, **reference}}
+    return {
+        "page_content": chunk["text"],
+        # source_file je i u metadata da bi ga LangChain Document video (sastavljanje konteksta, izvori)
+        "metadata": {
+            **doc.get("metadata", {}),
+            "source_file": doc.get("source_file", ""),
+            **reference,
+        },
+        "source_file": doc.get("source_file", "")
+    }
+
+def sync_chunk_refs(client: QdrantClient, collection_name: str, document_store: DocumentStore, chunk_hashes, slim: bool,
+                    moved_refs=frozenset()):
+    """
+    Usklađuje Qdrant sa tabelom referenci: briše tačke bez referenci, ažurira ref_count,
+    a ako je obrisan dokument na koji je tačka pokazivala, preusmerava je na drugi dokument.
+    moved_refs su (hash, doc_id, chunk_index) reference ponovo indeksiranih dokumenata kojima
+    su se promenili offset-i ili deo dokumenta: ako je to primarna referenca tačke, payload se
+    prepisuje, jer slim hydrate i proširenje konteksta seku tekst po tim offset-ima.
+    """
+    points_to_delete = []
+    points_by_count = defaultdict(list)
+    for text_hash in set(chunk_hashes):
+        chunk = document_store.get_chunk(text_hash)
+        if chunk is None:
+            continue
+        ref_count = document_store.chunk_ref_count(text_hash)
+        if ref_count == 0:
+            points_to_delete.append(chunk["point_id"])
+            document_store.delete_chunk(text_hash)
+            continue
+        ref = document_store.get_chunk_ref(text_hash, chunk["primary_doc_id"], chunk["primary_chunk_index"])
+        if ref is None or (text_hash, chunk["primary_doc_id"], chunk["primary_chunk_index"]) in moved_refs:
+            ref = ref or document_store.get_chunk_ref(text_hash)
+            doc = document_store.get_document(ref["doc_id"])
+            ref["text"] = doc["full_text"][ref["char_start"]:ref["char_end"]]
+            payload = build_payload(doc, ref["doc_id"], ref["chunk_index"], ref, slim)
+            payload["metadata"]["ref_count"] = ref_count
+            client.set_payload(collection_name=collection_name, payload=payload, points=[chunk["point_id"]])
+            document_store.set_chunk_primary(text_hash, ref["doc_id"], ref["chunk_index"])
+        else:
+            points_by_count[ref_count].append(chunk["point_id"])
+
+    if points_to_delete:
+        client.delete(collection_name=collection_name, points_selector=models.PointIdsList(points=points_to_delete))
+    for ref_count, point_ids in points_by_count.items():
+        client.set_payload(collection_name=collection_name, payload={"ref_count": ref_count}, points=point_ids, key="metadata")
+    document_store.commit()
+    return len(points_to_delete)
+
+def remove_documents(client: QdrantClient, collection_name: str, document_store: DocumentStore, doc_ids, slim: bool):
+    """
+    Uklanja dokumente iz indeksa: reference, tačke koje više niko ne referencira, vektor dokumenta
+    i sam dokument iz skladišta. Vraća (dotaknuti hash-evi, broj obrisanih tačaka).
+    """
+    touched = []
+    for doc_id in doc_ids:
+        touched.extend(document_store.remove_chunk_refs(doc_id))
+    deleted = sync_chunk_refs(client, collection_name, document_store, touched, slim)
+    if client.collection_exists(document_collection_name(collection_name)):
+        client.delete(collection_name=document_collection_name(collection_name),
+                      points_selector=models.PointIdsList(points=[document_point_id(doc_id) for doc_id in doc_ids]))
+    for doc_id in doc_ids:
+        document_store.delete_document(doc_id)
+    document_store.commit()
+    return touched, deleted
+
+def load_embedding_model(embedding_model=None):
+    """SentenceTransformer model za chunk-ove (ili prosleđen model, npr. stub u benchmark.py)."""
+    embedding_model = embedding_model or SentenceTransformer(
         DEFAULT_EMBEDDING_MODEL,
         device=DEFAULT_DEVICE
         )
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    setup_qdrant_collection(qdrant_client, collection_name)
-    
-    # --- FAZA 1: Priprema Svih Tačaka (Points) ---
-    print(f"Čitanje fajla '{jsonl_path}' i priprema podataka...")
-    
-    all_points = []
+    embedding_model.max_seq_length = max(embedding_model.max_seq_length, CHUNK_MAX_TOKENS + 2)
+    return embedding_model
+
+def make_chunker(embedding_model) -> LegalChunker:
+    # Limit tokena merimo tokenizatorom samog embedding modela, da se chunk ne bi odsekao pri embedovanju
+    tokenizer = embedding_model.tokenizer
+    return LegalChunker(length_function=lambda text: len(tokenizer.encode(text, add_special_tokens=False)))
+
+def read_jsonl(jsonl_path: str):
     with open(jsonl_path, 'r', encoding='utf-8') as f:
-        for line in tqdm(f, desc="Priprema dokumenata"):
+        for line in f:
             try:
-                doc = json.loads(line)
-                if not doc.get('full_text', '').strip():
-                    continue
-                
-                chunks = text_splitter.split_text(doc['full_text'])
-                for chunk_text in chunks:
-                    point_id = str(uuid.uuid4())
-                    payload = {
-                        "page_content": chunk_text,
-                        "metadata": doc.get("metadata", {}),
-                        "source_file": doc.get("source_file", "")
-                    }
-                    # Dodajemo tačku bez vektora za sada
-                    all_points.append(models.PointStruct(id=point_id, payload=payload, vector=[]))
+                yield json.loads(line)
             except json.JSONDecodeError:
                 logging.warning(f"Greška pri parsiranju JSON reda. Red preskočen.")
 
-    print(f"Priprema završena. Ukupno kreirano {len(all_points)} chunk-ova (tačaka) za unos.")
+def index_documents(docs, qdrant_client: QdrantClient, collection_name: str, document_store: DocumentStore,
+                    embedding_model, text_splitter: LegalChunker, slim_payload: bool = SLIM_PAYLOADS,
+                    verbose: bool = True) -> dict:
+    """
+    Indeksira niz dokumenata (dict-ova iz JSONL-a): chunk-ovi u Qdrant, celi dokumenti u document_store,
+    reference deljenih chunk-ova i vektori dokumenata. Koriste je index_corpus (ceo fajl) i pipeline.py (mali paketi).
+    """
+    document_store.bind_collection(collection_name)
+    # --- FAZA 1: Priprema Svih Tačaka (Points) ---
+    all_points = []
+    all_texts = []  # Tekstovi za embedovanje (u slim režimu nisu u payload-u)
+    all_chunks = []  # (hash, point_id, doc_id, chunk_index) - u tabelu chunks tek kad je tačka u Qdrant-u
+    # Isti chunk (standardne klauzule, zaglavlja, potpisi) se čuva jednom; ostala pojavljivanja su reference
+    pending_hashes = set()
+    touched_hashes = []
+    moved_refs = set()  # Reference sa promenjenim offset-ima (payload tačke se prepisuje ako je primarna)
+    # Vektor dokumenta (za slične predmete) je prosek vektora njegovih chunk-ova
+    document_pool = DocumentVectorPool()
+    variant_doc_ids = set()
+    duplicate_chunks = 0
+    document_count = 0
+    for doc in tqdm(docs, desc="Priprema dokumenata", disable=not verbose):
+        if not doc.get('full_text', '').strip():
+            continue
+        
+        document_count += 1
+        doc_id = document_id(doc)
+        # Korpus izvučen pre uvođenja kanonskog pisma: chunk-ovi na ćirilici bi dobili druge vektore i ID-jeve
+        doc['full_text'] = canonical_text(doc['full_text'])
+        doc['case_id'] = canonical_value(doc.get('case_id'))
+        doc['metadata'] = {key: canonical_value(value) for key, value in doc.get('metadata', {}).items()}
+        if doc.get("duplicate_of") or doc.get("variants"):
+            doc["metadata"] = {**doc.get("metadata", {}), "duplicate_of": doc.get("duplicate_of"),
+                               "variants": doc.get("variants", [])}
+        if doc.get("duplicate_of"):
+            variant_doc_ids.add(doc_id)
+        # Ponovno indeksiranje istog dokumenta: stare reference se brišu, pa se ponovo dodaju
+        old_refs = document_store.document_chunk_refs(doc_id)
+        touched_hashes.extend(document_store.remove_chunk_refs(doc_id))
+        chunks, sections = text_splitter.split_with_sections(doc['full_text'])
+        # Pun tekst ide u lokalno skladište; Qdrant dobija samo male chunk-ove sa referencom
+        document_store.put_document(doc_id, doc, sections)
+        for chunk_index, chunk in enumerate(chunks):
+            # Varijante iz dedup.py --mode link ovde prirodno dele chunk-ove sa kanonskim dokumentom
+            text_hash = chunk_hash(chunk["text"])
+            point_id = str(uuid.uuid5(CHUNK_NAMESPACE, text_hash))
+            document_store.add_chunk_ref(text_hash, doc_id, {**chunk, "chunk_index": chunk_index})
+            if text_hash in pending_hashes or document_store.get_chunk(text_hash) is not None:
+                duplicate_chunks += 1
+                touched_hashes.append(text_hash)
+                old_ref = old_refs.get((text_hash, chunk_index))
+                if old_ref is not None and old_ref != (chunk["section_index"], chunk["section_type"],
+                                                       chunk["char_start"], chunk["char_end"]):
+                    moved_refs.add((text_hash, doc_id, chunk_index))
+                document_pool.expect(doc_id, point_id, is_new=text_hash in pending_hashes)
+                continue
+            pending_hashes.add(text_hash)
+            document_pool.expect(doc_id, point_id, is_new=True)
+            all_chunks.append((text_hash, point_id, doc_id, chunk_index))
+            payload = build_payload(doc, doc_id, chunk_index, chunk, slim_payload)
+            payload["metadata"]["ref_count"] = 1
+            # Dodajemo tačku bez vektora za sada
+            all_points.append(models.PointStruct(id=point_id, payload=payload, vector=[]))
+            all_texts.append(chunk["text"])
+
+    document_store.commit()
+    stats = {"documents": document_count, "points": len(all_points), "duplicate_chunks": duplicate_chunks,
+             "deleted_points": 0, "document_vectors": 0}
+    if verbose:
+        print(f"Priprema završena. Ukupno kreirano {len(all_points)} chunk-ova (tačaka) za unos.")
+        if duplicate_chunks:
+            print(f"{duplicate_chunks} chunk-ova već postoji u drugim dokumentima; dodate su samo reference.")
 
-    if not all_points:
-        print("Nema podataka za indeksiranje. Izlazim.")
-        return
+    if not all_points and not touched_hashes:
+        return stats
 
     # --- FAZA 2: Unos u Bazu u Serijama (Batches) ---
-    print("Započinjanje unosa podataka u Qdrant u serijama...")
+    if verbose:
+        print("Započinjanje unosa podataka u Qdrant u serijama...")
     
     # tqdm će nam sada pokazati napredak unosa serija
-    for i in tqdm(range(0, len(all_points), BATCH_SIZE), desc="Unos u Qdrant"):
+    for i in tqdm(range(0, len(all_points), BATCH_SIZE), desc="Unos u Qdrant", disable=not verbose):
         # Uzimamo isečak (slice) liste za trenutnu seriju
         batch_points = all_points[i : i + BATCH_SIZE]
         
         # Ekstrahujemo tekstove iz serije za embedovanje
-        texts_to_embed = [point.payload["page_content"] for point in batch_points]
+        texts_to_embed = all_texts[i : i + BATCH_SIZE]
         
         # Generišemo embedinge (OVO JE SPORI DEO)
         vectors = embedding_model.encode(texts_to_embed)
@@ -90,6 +245,7 @@ def index_corpus(jsonl_path: str, qdrant_url: str, collection_name: str):
         # Dodajemo vektore u naše tačke
         for j, point in enumerate(batch_points):
             point.vector = vectors[j].tolist()
+            document_pool.add(point.id, vectors[j])
             
         # Unosimo celu seriju u Qdrant
         qdrant_client.upsert(
@@ -97,8 +253,48 @@ def index_corpus(jsonl_path: str, qdrant_url: str, collection_name: str):
             points=batch_points,
             wait=True
         )
+        # Chunk se beleži kao indeksiran tek posle uspešnog upisa: ako embedovanje ili upis
+        # pukne, ponovno pokretanje ga ne vidi kao duplikat i upisuje ga ponovo
+        for text_hash, point_id, doc_id, chunk_index in all_chunks[i : i + BATCH_SIZE]:
+            document_store.add_chunk(text_hash, point_id, doc_id, chunk_index)
+        document_store.commit()
+
+    # Broj referenci (i tačke bez referenci posle ponovnog indeksiranja) usklađujemo tek kad su tačke u bazi
+    stats["deleted_points"] = sync_chunk_refs(qdrant_client, collection_name, document_store, touched_hashes, slim_payload,
+                                              moved_refs)
+    stats["document_vectors"] = upsert_document_vectors(qdrant_client, collection_name, document_pool, document_store,
+                                                        variant_doc_ids)
+    return stats
+
+def index_corpus(jsonl_path: str, qdrant_url: str, collection_name: str, document_store_path: str = DOCUMENT_STORE_PATH,
+                 slim_payload: bool = SLIM_PAYLOADS, qdrant_client: QdrantClient | None = None, embedding_model=None):
+    """
+    Glavna funkcija za indeksiranje JSONL korpusa u Qdrant (i celih dokumenata u document_store).
+    qdrant_client i embedding_model se mogu proslediti spolja (npr. lokalni Qdrant i stub model u benchmark.py).
+    """
+    
+    # --- Inicijalizacija ---
+    print("Inicijalizacija klijenata i modela...")
+    qdrant_client = qdrant_client or QdrantClient(url=qdrant_url)
+    embedding_model = load_embedding_model(embedding_model)
+    text_splitter = make_chunker(embedding_model)
+    setup_qdrant_collection(qdrant_client, collection_name)
+    document_store = DocumentStore(document_store_path)
+    
+    print(f"Čitanje fajla '{jsonl_path}' i priprema podataka...")
+    stats = index_documents(read_jsonl(jsonl_path), qdrant_client, collection_name, document_store,
+                            embedding_model, text_splitter, slim_payload)
+    document_store.close()
+    print(f"Celi dokumenti sačuvani u: {document_store_path}")
+
+    if not stats["points"] and not stats["duplicate_chunks"]:
+        print("Nema podataka za indeksiranje. Izlazim.")
+        return
+    if stats["deleted_points"]:
+        print(f"Obrisano {stats['deleted_points']} tačaka koje više nijedan dokument ne sadrži.")
+    print(f"Upisano {stats['document_vectors']} vektora dokumenata (slični predmeti: python similar_cases.py {collection_name}).")
 
-    print(f"\nIndeksiranje uspešno završeno! Ukupno uneto {len(all_points)} tačaka.")
+    print(f"\nIndeksiranje uspešno završeno! Ukupno uneto {stats['points']} tačaka.")
     # Provera finalnog broja
     count_result = qdrant_client.count(collection_name=collection_name, exact=True)
     print(f"Finalni broj tačaka u kolekciji '{collection_name}': {count_result.count}")
@@ -109,5 +305,7 @@ if __name__ == '__main__':
     parser.add_argument("jsonl_path", type=str, help="Putanja do structured_corpus.jsonl fajla.")
     parser.add_argument("--qdrant-url", type=str, default="http://localhost:6333", help="URL Qdrant instance.")
     parser.add_argument("--collection-name", type=str, default="drveni_advokat", help="Ime Qdrant kolekcije.")
+    parser.add_argument("--document-store", type=str, default=DOCUMENT_STORE_PATH, help="Putanja do SQLite skladišta celih dokumenata.")
+    parser.add_argument("--slim-payload", action="store_true", default=SLIM_PAYLOADS, help="Tačke nose samo doc_id, offset-e i polja za filtere.")
     args = parser.parse_args()
-    index_corpus(args.jsonl_path, args.qdrant_url, args.collection_name)
\ No newline at end of file
+    index_corpus(args.jsonl_path, args.qdrant_url, args.collection_name, args.document_store, args.slim_payload)
\ No newline at end of file
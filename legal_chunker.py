@@ -0,0 +1,121 @@
+# legal_chunker.py (Podela dokumenata po pravnoj strukturi)
+#
+# Umesto fiksnih 1000/200 karaktera, tekst se prvo deli na delove presude/
+# podneska (zaglavlje sa strankama, izreka, obrazloženje, članovi, pouka),
+# pa se unutar svakog dela pasusi pakuju do limita tokena. Chunk-ovi su uvek
+# neprekidni isečci full_text-a, pa char_start/char_end tačno pokazuju gde su.
+
+import re
+import config
+from context_assembler import estimate_tokens
+
+# Naslovi se u presudama često pišu razmaknuto ("O b r a z l o ž e n j e")
+def _spaced(word: str) -> str:
+    return r"\s*".join(re.escape(letter) for letter in word)
+
+SECTION_PATTERNS = [
+    ("izreka", re.compile(rf"^\s*(?:{_spaced('PRESUDU')}|{_spaced('PRESUDA')}|{_spaced('REŠENJE')}|{_spaced('RESENJE')})\s*$", re.IGNORECASE)),
+    ("obrazlozenje", re.compile(rf"^\s*(?:{_spaced('Obrazloženje')}|{_spaced('Obrazlozenje')})\s*:?\s*$", re.IGNORECASE)),
+    ("pouka", re.compile(r"^\s*POUKA\s+O\s+PRAVNOM\s+LEKU", re.IGNORECASE)),
+    ("clan", re.compile(r"^\s*(?:Član|Clan)\s+\d+[a-z]?\.?\s*$", re.IGNORECASE)),
+]
+SENTENCE_PATTERN = re.compile(r"[^.!?;]+(?:[.!?;]+|$)")
+LINE_PATTERN = re.compile(r"[^\n]+")
+
+
+def _detect_section(line: str) -> str | None:
+    for section_type, pattern in SECTION_PATTERNS:
+        if pattern.search(line):
+            return section_type
+    return None
+
+
+class LegalChunker:
+    def __init__(self, max_tokens=None, overlap_tokens=None, length_function=None):
+        self.max_tokens = max_tokens or config.CHUNK_MAX_TOKENS
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else config.CHUNK_OVERLAP_TOKENS
+        self.length_function = length_function or estimate_tokens
+
+    def split_sections(self, text: str) -> list[dict]:
+        """Deli tekst na pravne delove. Sve pre prve izreke je 'zaglavlje' (stranke, sud, broj predmeta)."""
+        sections = []
+        has_decision = any(_detect_section(m.group(0)) == "izreka" for m in LINE_PATTERN.finditer(text))
+        current = {"section_type": "zaglavlje" if has_decision else "telo", "lines": []}
+        for match in LINE_PATTERN.finditer(text):
+            section_type = _detect_section(match.group(0))
+            if section_type and current["lines"]:
+                sections.append(current)
+                current = {"section_type": section_type, "lines": []}
+            elif section_type:
+                current["section_type"] = section_type
+            current["lines"].append((match.start(), match.end()))
+        if current["lines"]:
+            sections.append(current)
+        return sections
+
+    def _units(self, text: str, start: int, end: int) -> list[tuple]:
+        """Vraća (start, end, tokeni) jedinice: ceo pasus, ili rečenice ako je pasus predugačak."""
+        tokens = self.length_function(text[start:end])
+        if tokens <= self.max_tokens:
+            return [(start, end, tokens)]
+        units = []
+        for match in SENTENCE_PATTERN.finditer(text, start, end):
+            s_start, s_end = match.start(), match.end()
+            if not text[s_start:s_end].strip():
+                continue
+            s_tokens = self.length_function(text[s_start:s_end])
+            if s_tokens <= self.max_tokens:
+                units.append((s_start, s_end, s_tokens))
+                continue
+            # Rečenica duža od limita (tabele, nabrajanja) - sečemo na prozore
+            window = max(1, int(len(text[s_start:s_end]) * self.max_tokens / s_tokens))
+            for w_start in range(s_start, s_end, window):
+                w_end = min(w_start + window, s_end)
+                units.append((w_start, w_end, self.length_function(text[w_start:w_end])))
+        return units
+
+    def split(self, text: str) -> list[dict]:
+        """Vraća listu chunk-ova: text, section_type, section_index, char_start, char_end."""
+        return self.split_with_sections(text)[0]
+
+    def split_with_sections(self, text: str) -> tuple[list[dict], list[dict]]:
+        """Kao split(), ali vraća i granice delova (za document_store i proširenje konteksta)."""
+        chunks = []
+        section_spans = []
+        for section_index, section in enumerate(self.split_sections(text)):
+            section_spans.append({
+                "section_index": section_index,
+                "section_type": section["section_type"],
+                "char_start": section["lines"][0][0],
+                "char_end": section["lines"][-1][1],
+            })
+            units = []
+            for line_start, line_end in section["lines"]:
+                units.extend(self._units(text, line_start, line_end))
+
+            current = []
+            current_tokens = 0
+            for unit in units:
+                if current and current_tokens + unit[2] > self.max_tokens:
+                    chunks.append(self._make_chunk(text, current, section, section_index))
+                    # Minimalno preklapanje: samo poslednja jedinica, ako je dovoljno kratka
+                    last = current[-1]
+                    if self.overlap_tokens and last[2] <= self.overlap_tokens and last[2] + unit[2] <= self.max_tokens:
+                        current, current_tokens = [last], last[2]
+                    else:
+                        current, current_tokens = [], 0
+                current.append(unit)
+                current_tokens += unit[2]
+            if current:
+                chunks.append(self._make_chunk(text, current, section, section_index))
+        return chunks, section_spans
+
+    def _make_chunk(self, text: str, units: list, section: dict, section_index: int) -> dict:
+        char_start, char_end = units[0][0], units[-1][1]
+        return {
+            "text": text[char_start:char_end],
+            "section_type": section["section_type"],
+            "section_index": section_index,
+            "char_start": char_start,
+            "char_end": char_end,
+        }
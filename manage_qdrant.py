@@ -1,6 +1,26 @@
 # manage_qdrant.py (Ažurirana verzija sa 'info' komandom)
+#
+# Ponovno indeksiranje bez zastoja (blue-green):
+#   python manage_qdrant.py build drveni_advokat --jsonl data/structured_corpus.jsonl --switch
+#   python manage_qdrant.py switch drveni_advokat_v20250101_120000   # povratak na staru verziju
+# Prenos indeksa na drugi računar bez ponovnog embedovanja:
+#   python manage_qdrant.py export drveni_advokat_v20250101_120000 --file indeks.qpts
+#   python manage_qdrant.py import drveni_advokat_v20250101_120000 --file indeks.qpts
+# Fasete (facets.py) - grupisanje i vremenske serije bez skrolovanja kolekcije:
+#   python manage_qdrant.py facets --group-by judge --court "Novom Sadu"
+#   python manage_qdrant.py facets drveni_advokat --timeline year --judge "Petrović" --date-from 2000
+import os
+import json
+import zlib
+import struct
+import datetime
 import argparse
-from qdrant_client import QdrantClient
+import numpy as np
+from qdrant_client import QdrantClient, models
+import config
+from document_store import store_path_for, versioned_store_path, resolve_collection
+
+EXPORT_MAGIC = b"DAQP1\n"
 
 def get_collection_info(qdrant_url: str, collection_name: str):
     """Prikazuje informacije o navedenoj kolekciji."""
@@ -32,15 +52,314 @@ def delete_collection(qdrant_url: str, collection_name: str):
     except Exception as e:
         print(f"Došlo je do greške: {e}")
 
+def delete_document(qdrant_url: str, collection_name: str, doc_id: str, document_store_path: str):
+    """
+    Uklanja jedan dokument iz indeksa: briše njegove reference na chunk-ove, a tačke
+    koje više niko ne referencira briše iz kolekcije (ostalima smanjuje ref_count).
+    """
+    from document_store import DocumentStore
+    from index_corpus import remove_documents
+    try:
+        client = QdrantClient(url=qdrant_url)
+        store = DocumentStore(document_store_path)
+        # Da li kolekcija koristi slim payload vidimo po jednoj postojećoj tački
+        sample, _ = client.scroll(collection_name=collection_name, limit=1, with_payload=True)
+        slim = bool(sample) and "page_content" not in sample[0].payload
+        touched, deleted = remove_documents(client, collection_name, store, [doc_id], slim)
+        if not touched:
+            print(f"Dokument '{doc_id}' nema indeksiranih chunk-ova.")
+        store.close()
+        if os.path.exists(config.FACETS_DB_PATH):
+            from facets import FacetStore
+            facet_store = FacetStore(config.FACETS_DB_PATH)
+            facet_store.delete(doc_id)
+            facet_store.commit()
+            facet_store.close()
+        print(f"Dokument '{doc_id}' uklonjen. Obrisano tačaka: {deleted}, ažurirano: {len(set(touched)) - deleted}.")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def current_aliases(client: QdrantClient) -> dict:
+    return {alias.alias_name: alias.collection_name for alias in client.get_aliases().aliases}
+
+def collection_store_path(client: QdrantClient, collection_name: str) -> tuple[str, str]:
+    """(konkretna kolekcija, njeno skladište): alias (npr. drveni_advokat_live) se prvo razrešava."""
+    _, target = resolve_collection(client, alias=collection_name, default_collection=collection_name)
+    return target, store_path_for(target, config.DOCUMENT_STORE_PATH)
+
+def switch_alias(qdrant_url: str, collection_name: str, alias: str = config.QDRANT_COLLECTION_ALIAS):
+    """
+    Atomski prebacuje alias (i "<alias>_documents" za slične predmete) na datu kolekciju.
+    Korisnici tokom zamene pretražuju ili staru ili novu kolekciju, nikad praznu.
+    """
+    from similar_cases import document_collection_name
+    try:
+        client = QdrantClient(url=qdrant_url)
+        if not client.collection_exists(collection_name):
+            print(f"Kolekcija '{collection_name}' ne postoji.")
+            return
+        aliases = current_aliases(client)
+        operations = []
+        pairs = [(alias, collection_name), (document_collection_name(alias), document_collection_name(collection_name))]
+        for alias_name, target in pairs:
+            if not client.collection_exists(target):
+                continue
+            if alias_name in aliases:
+                operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias_name)))
+            operations.append(models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=target, alias_name=alias_name)
+            ))
+        client.update_collection_aliases(change_aliases_operations=operations)
+        previous = aliases.get(alias)
+        print(f"Alias '{alias}' sada pokazuje na '{collection_name}'" + (f" (ranije: '{previous}')." if previous else "."))
+        if previous and previous != collection_name:
+            print(f"Stara kolekcija se može obrisati kad više nije potrebna: python manage_qdrant.py delete {previous}")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def list_aliases(qdrant_url: str):
+    try:
+        client = QdrantClient(url=qdrant_url)
+        aliases = current_aliases(client)
+        if not aliases:
+            print("Nema definisanih alias-a.")
+        for alias_name, collection_name in sorted(aliases.items()):
+            print(f"{alias_name} -> {collection_name}")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def build_collection(qdrant_url: str, base_name: str, jsonl_path: str, switch: bool, alias: str = config.QDRANT_COLLECTION_ALIAS,
+                     slim_payload: bool = config.SLIM_PAYLOADS):
+    """
+    Indeksira korpus u novu verzionisanu kolekciju (sa sopstvenim document_store-om,
+    jer su chunk reference vezane za kolekciju). Aktivna kolekcija se ne dira dok se ne uradi switch.
+    """
+    from index_corpus import index_corpus
+    collection_name = f"{base_name}_v{datetime.datetime.now():%Y%m%d_%H%M%S}"
+    document_store_path = versioned_store_path(collection_name, config.DOCUMENT_STORE_PATH)
+    print(f"Nova kolekcija: '{collection_name}', skladište dokumenata: '{document_store_path}'")
+    index_corpus(jsonl_path, qdrant_url, collection_name, document_store_path, slim_payload)
+    print(f"Slični predmeti za novu kolekciju: python similar_cases.py {collection_name} --document-store {document_store_path}")
+    if switch:
+        switch_alias(qdrant_url, collection_name, alias)
+    else:
+        print(f"Za prebacivanje: python manage_qdrant.py switch {collection_name}")
+
+def create_snapshot(qdrant_url: str, collection_name: str):
+    try:
+        client = QdrantClient(url=qdrant_url)
+        snapshot = client.create_snapshot(collection_name=collection_name, wait=True)
+        print(f"Snapshot napravljen: {snapshot.name} ({snapshot.size / 1024 / 1024:.1f} MB)")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def list_snapshots(qdrant_url: str, collection_name: str):
+    try:
+        client = QdrantClient(url=qdrant_url)
+        for snapshot in client.list_snapshots(collection_name=collection_name):
+            print(f"{snapshot.name}  {snapshot.creation_time}  {snapshot.size / 1024 / 1024:.1f} MB")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def restore_snapshot(qdrant_url: str, collection_name: str, location: str):
+    """Vraća kolekciju iz snapshot-a (URL ili file:// putanja dostupna Qdrant serveru)."""
+    try:
+        client = QdrantClient(url=qdrant_url)
+        client.recover_snapshot(collection_name=collection_name, location=location, wait=True)
+        print(f"Kolekcija '{collection_name}' vraćena iz: {location}")
+    except Exception as e:
+        print(f"Došlo je do greške: {e}")
+
+def _write_block(outfile, data: bytes):
+    outfile.write(struct.pack("<I", len(data)))
+    outfile.write(data)
+
+def _read_block(infile) -> bytes | None:
+    header = infile.read(4)
+    if len(header) < 4:
+        return None
+    (length,) = struct.unpack("<I", header)
+    return infile.read(length)
+
+def export_points(qdrant_url: str, collection_name: str, file_path: str, batch_size: int = config.QDRANT_EXPORT_BATCH_SIZE):
+    """
+    Izvozi tačke (vektori + payload) u binarni fajl, paket po paket (scroll), bez držanja
+    cele kolekcije u memoriji. Po paketu: float32 matrica vektora i zlib-kompresovan JSON payload-a.
+    """
+    client = QdrantClient(url=qdrant_url)
+    info = client.get_collection(collection_name=collection_name)
+    vectors_config = info.config.params.vectors
+    header = {
+        "collection": collection_name,
+        "vector_size": vectors_config.size,
+        "distance": str(vectors_config.distance.value if hasattr(vectors_config.distance, "value") else vectors_config.distance),
+        "payload_schema": {field: str(schema.data_type.value if hasattr(schema.data_type, "value") else schema.data_type)
+                           for field, schema in (info.payload_schema or {}).items()},
+        "points_count": info.points_count,
+    }
+    exported = 0
+    offset = None
+    with open(file_path, 'wb') as outfile:
+        outfile.write(EXPORT_MAGIC)
+        _write_block(outfile, json.dumps(header, ensure_ascii=False).encode("utf-8"))
+        while True:
+            points, offset = client.scroll(collection_name=collection_name, limit=batch_size, offset=offset,
+                                           with_vectors=True, with_payload=True)
+            if points:
+                vectors = np.asarray([point.vector for point in points], dtype="<f4")
+                records = [[point.id, point.payload] for point in points]
+                outfile.write(struct.pack("<I", len(points)))
+                outfile.write(vectors.tobytes())
+                _write_block(outfile, zlib.compress(json.dumps(records, ensure_ascii=False).encode("utf-8")))
+                exported += len(points)
+                print(f"\rIzvezeno {exported}/{header['points_count']} tačaka", end="")
+            if offset is None:
+                break
+        outfile.write(struct.pack("<I", 0))
+    print(f"\nIzvoz završen: {file_path} ({os.path.getsize(file_path) / 1024 / 1024:.1f} MB)")
+    print(f"Napomena: za slim payload kopirajte i skladište dokumenata ({collection_store_path(client, collection_name)[1]}).")
+
+def import_points(qdrant_url: str, collection_name: str, file_path: str):
+    """Uvozi tačke iz fajla napravljenog sa 'export' (kolekcija se pravi ako ne postoji)."""
+    client = QdrantClient(url=qdrant_url)
+    with open(file_path, 'rb') as infile:
+        if infile.read(len(EXPORT_MAGIC)) != EXPORT_MAGIC:
+            print(f"'{file_path}' nije fajl napravljen sa 'manage_qdrant.py export'.")
+            return
+        header = json.loads(_read_block(infile).decode("utf-8"))
+        if not client.collection_exists(collection_name):
+            print(f"Kreiranje kolekcije '{collection_name}' (dimenzija {header['vector_size']}, {header['distance']})")
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=models.VectorParams(size=header["vector_size"], distance=header["distance"]),
+            )
+            for field_name, field_schema in header["payload_schema"].items():
+                client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=field_schema)
+        imported = 0
+        while True:
+            (count,) = struct.unpack("<I", infile.read(4))
+            if count == 0:
+                break
+            vectors = np.frombuffer(infile.read(count * header["vector_size"] * 4), dtype="<f4").reshape(count, -1)
+            records = json.loads(zlib.decompress(_read_block(infile)).decode("utf-8"))
+            client.upsert(collection_name=collection_name, wait=True, points=[
+                models.PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+                for (point_id, payload), vector in zip(records, vectors)
+            ])
+            imported += count
+            print(f"\rUvezeno {imported}/{header['points_count']} tačaka", end="")
+    print(f"\nUvoz završen u kolekciju '{collection_name}'.")
+
+def show_facets(qdrant_url: str, collection_name: str | None, facets_path: str, filters: dict,
+                group_by: str | None, timeline: str | None, limit: int | None):
+    """
+    Grupisanje/vremenska serija iz tabele faseta. Ako je zadata kolekcija, dobijeni skup
+    dokumenata se preko chunk_refs skladišta kolekcije prevodi u tačke (i deljene chunk-ove)
+    i prikazuje se broj tačaka.
+    """
+    from facets import FacetStore
+    if not os.path.exists(facets_path):
+        print(f"Tabela faseta '{facets_path}' ne postoji. Napravite je sa: python facets.py {config.STRUCTURED_JSONL_PATH}")
+        return
+    store = FacetStore(facets_path, readonly=True)
+    active = {key: value for key, value in filters.items() if value}
+    print(f"Dokumenata u tabeli faseta: {store.count()}" + (f", filteri: {active}" if active else ""))
+    if timeline:
+        print(f"\n--- Vremenska serija ({timeline}{', po ' + group_by if group_by and group_by != 'year' else ''}) ---")
+        by = group_by if group_by in ("court", "judge", "document_type") else None
+        for row in store.timeline(timeline, active, by):
+            print("  ".join(str(value if value is not None else 'Nepoznato') for value in row))
+    elif group_by:
+        print(f"\n--- Broj dokumenata po: {group_by} ---")
+        for value, count in store.group_by(group_by, active, limit):
+            print(f"{count:6d}  {value if value is not None else 'Nepoznato'}")
+    doc_ids = store.doc_ids(active)
+    store.close()
+    print(f"\nDokumenata koji zadovoljavaju filtere: {len(doc_ids)}")
+    if collection_name and doc_ids:
+        from document_store import DocumentStore
+        try:
+            client = QdrantClient(url=qdrant_url)
+            collection_name, document_store_path = collection_store_path(client, collection_name)
+            if os.path.exists(document_store_path):
+                document_store = DocumentStore(document_store_path, readonly=True)
+                point_ids = document_store.point_ids_for_documents(doc_ids)
+                document_store.close()
+                condition = models.HasIdCondition(has_id=point_ids)
+            else:
+                condition = models.FieldCondition(key="metadata.doc_id", match=models.MatchAny(any=doc_ids))
+            count = client.count(collection_name=collection_name, exact=True, count_filter=models.Filter(must=[condition]))
+            print(f"Tačaka (chunk-ova) u kolekciji '{collection_name}' za te dokumente: {count.count}")
+        except Exception as e:
+            print(f"Došlo je do greške: {e}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Pomoćni alat za upravljanje Qdrant kolekcijama.")
-    parser.add_argument("action", type=str, choices=['delete', 'info'], help="Akcija koju treba izvršiti.")
-    parser.add_argument("collection_name", type=str, help="Ime kolekcije.")
+    parser.add_argument("action", type=str,
+                        choices=['delete', 'info', 'delete-doc', 'build', 'switch', 'aliases',
+                                 'snapshot', 'snapshots', 'restore', 'export', 'import', 'facets'],
+                        help="Akcija koju treba izvršiti.")
+    parser.add_argument("collection_name", type=str, nargs="?", help="Ime kolekcije (za 'build' osnovno ime verzije).")
     parser.add_argument("--qdrant-url", type=str, default="http://localhost:6333", help="URL Qdrant instance.")
+    parser.add_argument("--doc-id", type=str, help="ID dokumenta (za 'delete-doc').")
+    parser.add_argument("--document-store", type=str, default=None, help="SQLite skladište dokumenata (podrazumevano ono koje pripada kolekciji).")
+    parser.add_argument("--jsonl", type=str, default=config.STRUCTURED_JSONL_PATH, help="Korpus za 'build'.")
+    parser.add_argument("--switch", action="store_true", help="Posle 'build' odmah prebaci alias na novu kolekciju.")
+    parser.add_argument("--alias", type=str, default=config.QDRANT_COLLECTION_ALIAS, help="Alias aktivne kolekcije.")
+    parser.add_argument("--slim-payload", action="store_true", default=config.SLIM_PAYLOADS, help="Slim payload tačke (za 'build').")
+    parser.add_argument("--snapshot", type=str, help="Lokacija snapshot-a za 'restore' (URL ili file:// putanja).")
+    parser.add_argument("--file", type=str, help="Fajl za 'export'/'import'.")
+    parser.add_argument("--force", action="store_true", help="Dozvoli brisanje kolekcije na koju pokazuje alias.")
+    parser.add_argument("--facets-db", type=str, default=config.FACETS_DB_PATH, help="SQLite tabela faseta (za 'facets').")
+    parser.add_argument("--group-by", type=str, choices=['court', 'judge', 'document_type', 'year'], help="Grupisanje za 'facets'.")
+    parser.add_argument("--timeline", type=str, choices=['year', 'month', 'day'], help="Vremenska serija za 'facets'.")
+    parser.add_argument("--court", type=str, help="Filter: deo naziva suda.")
+    parser.add_argument("--judge", type=str, help="Filter: deo imena sudije.")
+    parser.add_argument("--document-type", type=str, help="Filter: tip dokumenta (npr. PRESUDA).")
+    parser.add_argument("--date-from", type=str, help="Filter: od godine ili datuma.")
+    parser.add_argument("--date-to", type=str, help="Filter: do godine ili datuma.")
+    parser.add_argument("--limit", type=int, help="Najviše redova za --group-by.")
     
     args = parser.parse_args()
+    if args.action not in ('aliases', 'facets') and not args.collection_name:
+        parser.error(f"'{args.action}' zahteva ime kolekcije")
     
     if args.action == 'delete':
+        aliased = [alias for alias, target in current_aliases(QdrantClient(url=args.qdrant_url)).items()
+                   if target == args.collection_name]
+        if aliased and not args.force:
+            parser.error(f"na kolekciju pokazuje alias {aliased}; prvo uradite 'switch' ili dodajte --force")
         delete_collection(args.qdrant_url, args.collection_name)
     elif args.action == 'info':
-        get_collection_info(args.qdrant_url, args.collection_name)
\ No newline at end of file
+        get_collection_info(args.qdrant_url, args.collection_name)
+    elif args.action == 'delete-doc':
+        if not args.doc_id:
+            parser.error("'delete-doc' zahteva --doc-id")
+        # Alias se razrešava: tačke i skladište moraju biti iz iste (aktivne) kolekcije
+        collection_name, document_store = collection_store_path(QdrantClient(url=args.qdrant_url), args.collection_name)
+        delete_document(args.qdrant_url, collection_name, args.doc_id, args.document_store or document_store)
+    elif args.action == 'build':
+        build_collection(args.qdrant_url, args.collection_name, args.jsonl, args.switch, args.alias, args.slim_payload)
+    elif args.action == 'switch':
+        switch_alias(args.qdrant_url, args.collection_name, args.alias)
+    elif args.action == 'aliases':
+        list_aliases(args.qdrant_url)
+    elif args.action == 'snapshot':
+        create_snapshot(args.qdrant_url, args.collection_name)
+    elif args.action == 'snapshots':
+        list_snapshots(args.qdrant_url, args.collection_name)
+    elif args.action == 'restore':
+        if not args.snapshot:
+            parser.error("'restore' zahteva --snapshot")
+        restore_snapshot(args.qdrant_url, args.collection_name, args.snapshot)
+    elif args.action == 'facets':
+        filters = {"court": args.court, "judge": args.judge, "document_type": args.document_type,
+                   "date_from": args.date_from, "date_to": args.date_to}
+        show_facets(args.qdrant_url, args.collection_name, args.facets_db, filters, args.group_by, args.timeline, args.limit)
+    elif args.action in ('export', 'import'):
+        if not args.file:
+            parser.error(f"'{args.action}' zahteva --file")
+        if args.action == 'export':
+            export_points(args.qdrant_url, args.collection_name, args.file)
+        else:
+            import_points(args.qdrant_url, args.collection_name, args.file)
@@ -0,0 +1,79 @@
+# ollama_runtime.py (Parametri Ollama modela i održavanje modela "toplim")
+#
+# Bez keep_alive Ollama posle 5 minuta neaktivnosti izbacuje model iz memorije,
+# pa sledeći korisnik čeka nekoliko sekundi na ponovno učitavanje 7B modela.
+# KeepWarm u pozadinskoj niti periodično šalje zahtev sa praznim promptom: Ollama
+# tada samo učita model i produži keep_alive, bez računanja ičega. Ping sa pravim
+# tekstom bi zauzeo slot i prepisao KV keš prefiksa (uputstvo + kontekst) aktivnog
+# razgovora, pa bi sledeće pitanje ponovo računalo ceo prompt. Ping šalje iste opcije
+# (num_ctx, num_thread) kao pravi upiti: Ollama ponovo učitava model čim se opcije
+# runner-a razlikuju, pa bi ping sa podrazumevanim opcijama izazivao hladan start.
+
+import time
+import logging
+import threading
+import config
+from telemetry import log_event
+
+
+def ollama_options(num_ctx: int | None = None, num_thread: int | None = None, num_predict: int | None = None) -> dict:
+    """Opcije za Ollama generate; 0 znači "podrazumevano na serveru" i ne šalje se."""
+    values = {
+        "num_ctx": config.OLLAMA_NUM_CTX if num_ctx is None else num_ctx,
+        "num_thread": config.OLLAMA_NUM_THREAD if num_thread is None else num_thread,
+        "num_predict": config.OLLAMA_NUM_PREDICT if num_predict is None else num_predict,
+    }
+    return {key: value for key, value in values.items() if value}
+
+
+def parse_keep_alive(value):
+    """Trajanje ("30m", "1h") ostaje tekst; broj (-1 = zauvek, 0 = odmah izbaci) se šalje kao broj sekundi."""
+    text = str(value).strip()
+    if text.lstrip("-").isdigit():
+        return int(text)
+    return text or config.OLLAMA_KEEP_ALIVE
+
+
+def ping(client, model: str, options: dict, keep_alive) -> float:
+    """
+    Zahtev sa praznim promptom (učitava model, produžava keep_alive); vraća trajanje u sekundama.
+    options moraju biti iste kao za prave upite, inače Ollama ponovo učitava model.
+    """
+    start_time = time.perf_counter()
+    client.generate(model=model, prompt="", options=options, keep_alive=keep_alive)
+    return time.perf_counter() - start_time
+
+
+def unload(client, model: str):
+    """Izbacuje model iz memorije Ollama servera (za merenje "hladnog" starta)."""
+    client.generate(model=model, prompt="", keep_alive=0)
+
+
+class KeepWarm:
+    def __init__(self, client, model: str, options: dict, keep_alive, interval_s: float | None = None):
+        self.client = client
+        self.model = model
+        self.options = options
+        self.keep_alive = keep_alive
+        self.interval_s = config.OLLAMA_KEEP_WARM_INTERVAL_S if interval_s is None else interval_s
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.interval_s or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ollama-keep-warm", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Prvi ping odmah: model se učitava dok korisnik još kuca pitanje
+        while not self._stop.is_set():
+            try:
+                duration = ping(self.client, self.model, self.options, self.keep_alive)
+                log_event("keep_warm", logging.DEBUG, model=self.model, duration_ms=round(duration * 1000, 1))
+            except Exception as e:
+                log_event("keep_warm_error", logging.WARNING, model=self.model, error=str(e))
+            self._stop.wait(self.interval_s)
@@ -0,0 +1,405 @@
+# pipeline.py (Protočna obrada: konverzija -> ekstrakcija -> indeksiranje, dokument po dokument)
+#
+# Umesto da se čeka da convert_corpus.py završi celu arhivu, pa extract_and_structure.py,
+# pa index_corpus.py, ovde svaki fajl prolazi kroz sve faze čim se pojavi. Stanje je u
+# SQLite tabeli poslova (jedan red po izvornom fajlu, sa fazom i statusom), pa prekid i
+# ponovno pokretanje nastavljaju tamo gde je stalo. Svaka faza ima svoje radnike:
+#   convert - niti koje pokreću soffice (svaka sa svojim LibreOffice profilom)
+#   extract - niti koje ekstrakciju rade u posebnim procesima (parsiranje XML-a je CPU posao)
+#   index   - jedna nit sa embedding modelom; dokumente uzima u malim paketima
+# Ekstrahovani zapisi se i dopisuju u JSONL korpus, da bi puno ponovno indeksiranje
+# (ili dedup.py nad celim korpusom) i dalje bilo moguće, a fasete idu u facets.py tabelu.
+#
+# Primer:
+#   python pipeline.py watch I:\docs I:\converted_docs data/structured_corpus.jsonl
+#   python pipeline.py watch I:\docs I:\converted_docs data/structured_corpus.jsonl --once
+#   python pipeline.py status
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import config
+from facets import FacetStore
+
+logging.basicConfig(filename='pipeline_log.txt', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    source_path TEXT PRIMARY KEY,
+    stage TEXT,
+    status TEXT,
+    docx_path TEXT,
+    record TEXT,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    created REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (stage, status, created);
+"""
+# Faze posla: convert -> extract -> index -> done; 'failed' posle PIPELINE_MAX_ATTEMPTS neuspeha
+
+
+class JobQueue:
+    """SQLite tabela poslova; sve metode su bezbedne za pozivanje iz više niti."""
+
+    def __init__(self, path: str, max_attempts: int = config.PIPELINE_MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Poslovi prekinuti usred obrade (pad, Ctrl+C) se vraćaju u red
+        with self._lock:
+            self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+            self.conn.commit()
+
+    def known_paths(self) -> set:
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT source_path FROM jobs")}
+
+    def add(self, source_path: str, stage: str, docx_path: str | None = None) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (source_path, stage, status, docx_path, created, updated) VALUES (?, ?, 'pending', ?, ?, ?)",
+                (source_path, stage, docx_path, now, now),
+            )
+            self.conn.commit()
+        return cursor.rowcount > 0
+
+    def claim(self, stage: str, limit: int = 1) -> list[dict]:
+        """Uzima najstarije poslove date faze i označava ih kao 'running'."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT source_path, docx_path, record, attempts FROM jobs WHERE stage = ? AND status = 'pending' "
+                "ORDER BY created LIMIT ?", (stage, limit),
+            ).fetchall()
+            if rows:
+                self.conn.executemany("UPDATE jobs SET status = 'running', updated = ? WHERE source_path = ?",
+                                      [(time.time(), row[0]) for row in rows])
+                self.conn.commit()
+        return [{"source_path": row[0], "docx_path": row[1], "record": row[2], "attempts": row[3]} for row in rows]
+
+    def pending_count(self, stage: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE stage = ? AND status = 'pending'", (stage,)).fetchone()[0]
+
+    def advance(self, source_path: str, stage: str, docx_path: str | None = None, record: str | None = None):
+        """Prebacuje posao u sledeću fazu (zapis ekstrakcije se čuva samo dok ne bude indeksiran)."""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, status = 'pending', docx_path = COALESCE(?, docx_path), record = ?, "
+                "attempts = 0, error = NULL, updated = ? WHERE source_path = ?",
+                (stage, docx_path, record, time.time(), source_path),
+            )
+            self.conn.commit()
+
+    def fail(self, source_path: str, error: str):
+        """Vraća posao u red, ili ga posle max_attempts pokušaja označava kao 'failed'."""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, status = 'pending', updated = ?, "
+                "stage = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE stage END WHERE source_path = ?",
+                (error[:1000], time.time(), self.max_attempts, source_path),
+            )
+            self.conn.commit()
+        logging.warning(f"Greška za '{source_path}': {error}")
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self.conn.execute("SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status").fetchall()
+        return {f"{stage}/{status}" if stage not in ("done", "failed") else stage: count for stage, status, count in rows}
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE stage NOT IN ('done', 'failed')").fetchone()[0] == 0
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class Watcher:
+    """Periodično skenira izvorni direktorijum; fajl ulazi u red tek kad mu se veličina ustali."""
+
+    def __init__(self, queue: JobQueue, source_dir: str, settle_s: float = config.PIPELINE_SETTLE_S,
+                 exclude_dir: str | None = None):
+        self.queue = queue
+        self.source_dir = source_dir
+        # Konvertovani .docx fajlovi ne smeju ponovo ući u red ako je izlazni direktorijum unutar izvornog
+        self.exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+        self.settle_s = settle_s
+        self.known = queue.known_paths()
+        self._last_seen = {}  # putanja -> (veličina, mtime) iz prethodnog skeniranja
+
+    @property
+    def settling(self) -> int:
+        """Broj fajlova koji čekaju da im se veličina ustali."""
+        return len(self._last_seen)
+
+    def scan(self) -> int:
+        added = 0
+        now = time.time()
+        for root, dirs, files in os.walk(self.source_dir):
+            if self.exclude_dir:
+                dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != self.exclude_dir]
+            for file in files:
+                lower = file.lower()
+                if file.startswith("~$") or not lower.endswith((".doc", ".docx")):
+                    continue
+                path = os.path.join(root, file)
+                if path in self.known:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                # Fajl koji se još kopira u arhivu menja veličinu; čekamo da se ustali
+                if self._last_seen.get(path) != signature or now - stat.st_mtime < self.settle_s:
+                    self._last_seen[path] = signature
+                    continue
+                self._last_seen.pop(path, None)
+                if lower.endswith(".docx"):
+                    self.queue.add(path, "extract", docx_path=path)
+                else:
+                    self.queue.add(path, "convert")
+                self.known.add(path)
+                added += 1
+        return added
+
+
+def convert_worker(queue: JobQueue, source_dir: str, docx_dir: str, soffice_path: str, worker_index: int,
+                   stop: threading.Event):
+    from convert_corpus import convert_file
+
+    # Paralelni soffice procesi ne smeju deliti korisnički profil (zaključavanje)
+    profile_dir = os.path.join(tempfile.gettempdir(), f"drveni_advokat_soffice_{worker_index}")
+    while not stop.is_set():
+        jobs = queue.claim("convert")
+        if not jobs:
+            stop.wait(config.PIPELINE_POLL_INTERVAL_S)
+            continue
+        source_path = jobs[0]["source_path"]
+        target_dir = os.path.join(docx_dir, os.path.relpath(os.path.dirname(source_path), source_dir))
+        target_path = os.path.join(target_dir, os.path.splitext(os.path.basename(source_path))[0] + ".docx")
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            if not os.path.exists(target_path):
+                target_path = convert_file(source_path, target_dir, soffice_path, profile_dir)
+            if target_path and os.path.exists(target_path):
+                queue.advance(source_path, "extract", docx_path=target_path)
+            else:
+                queue.fail(source_path, "soffice nije napravio .docx")
+        except Exception as e:
+            queue.fail(source_path, str(e))
+
+
+def extract_worker(queue: JobQueue, process_pool: ProcessPoolExecutor, output_path: str, output_lock: threading.Lock,
+                   facet_store, stop: threading.Event):
+    from extract_and_structure import extract_file
+
+    while not stop.is_set():
+        jobs = queue.claim("extract")
+        if not jobs:
+            stop.wait(config.PIPELINE_POLL_INTERVAL_S)
+            continue
+        job = jobs[0]
+        try:
+            record = process_pool.submit(extract_file, job["docx_path"]).result()
+            line = json.dumps(record, ensure_ascii=False)
+            with output_lock, open(output_path, 'a', encoding='utf-8') as outfile:
+                outfile.write(line + '\n')
+                facet_store.put(record)
+                facet_store.commit()
+            queue.advance(job["source_path"], "index", record=line)
+        except Exception as e:
+            queue.fail(job["source_path"], str(e))
+
+
+def index_worker(queue: JobQueue, qdrant_url: str, collection_name: str | None, document_store_path: str | None,
+                 slim_payload: bool, stop: threading.Event, ready: threading.Event):
+    """
+    Bez zadate kolekcije upisuje se u kolekciju na koju pokazuje alias (i u njeno verzionisano
+    skladište), uz proveru na svakih QDRANT_ALIAS_REFRESH_S: posle "manage_qdrant.py switch" novi
+    dokumenti idu u novu kolekciju, a ne u staru koja više nije aktivna.
+    """
+    from qdrant_client import QdrantClient
+    from document_store import DocumentStore, document_id, resolve_collection, store_path_for
+    from index_corpus import load_embedding_model, make_chunker, setup_qdrant_collection, index_documents, remove_documents
+
+    embedding_model = load_embedding_model()
+    text_splitter = make_chunker(embedding_model)
+    client = QdrantClient(url=qdrant_url)
+    follow_alias = collection_name is None
+
+    def open_target():
+        target = resolve_collection(client)[1] if follow_alias else collection_name
+        setup_qdrant_collection(client, target)
+        store = DocumentStore(document_store_path or store_path_for(target, config.DOCUMENT_STORE_PATH))
+        logging.info(f"Indeksiranje u kolekciju '{target}' (skladište: {store.path}).")
+        return target, store
+
+    collection_name, document_store = open_target()
+    checked_at = time.monotonic()
+
+    def index_jobs(batch):
+        stats = index_documents([json.loads(job["record"]) for job in batch], client, collection_name,
+                                document_store, embedding_model, text_splitter, slim_payload, verbose=False)
+        for job in batch:
+            queue.advance(job["source_path"], "done")
+        logging.info(f"Indeksirano {stats['documents']} dokumenata, {stats['points']} novih tačaka.")
+
+    def discard_jobs(batch):
+        # index_documents usput potvrđuje delove posla (dokument, reference, upisane serije), pa rollback
+        # nije dovoljan: dokumenti iz paketa se uklanjaju iz indeksa, da ponovni pokušaj krene od čistog stanja
+        document_store.rollback()
+        try:
+            remove_documents(client, collection_name, document_store,
+                             [document_id(json.loads(job["record"])) for job in batch], slim_payload)
+        except Exception as e:
+            document_store.rollback()
+            logging.error(f"Delimično indeksirani dokumenti nisu uklonjeni: {e}")
+
+    ready.set()
+    waiting_since = None
+    try:
+        while not stop.is_set():
+            pending = queue.pending_count("index")
+            if not pending:
+                waiting_since = None
+                stop.wait(config.PIPELINE_POLL_INTERVAL_S)
+                continue
+            # Mali paketi bolje koriste embedding model, ali dokument ne čeka duže od PIPELINE_INDEX_MAX_WAIT_S
+            waiting_since = waiting_since or time.monotonic()
+            if pending < config.PIPELINE_INDEX_BATCH and time.monotonic() - waiting_since < config.PIPELINE_INDEX_MAX_WAIT_S:
+                stop.wait(config.PIPELINE_POLL_INTERVAL_S)
+                continue
+            waiting_since = None
+            if follow_alias and time.monotonic() - checked_at >= config.QDRANT_ALIAS_REFRESH_S:
+                checked_at = time.monotonic()
+                if resolve_collection(client)[1] != collection_name:
+                    document_store.close()
+                    collection_name, document_store = open_target()
+            jobs = queue.claim("index", config.PIPELINE_INDEX_BATCH)
+            try:
+                index_jobs(jobs)
+            except Exception as e:
+                discard_jobs(jobs)
+                if len(jobs) == 1:
+                    queue.fail(jobs[0]["source_path"], str(e))
+                    continue
+                # Jedan loš zapis ne sme da obori ceo paket: ponovo jedan po jedan, pa pokušaj troši samo onaj koji pada
+                logging.warning(f"Paket od {len(jobs)} dokumenata nije indeksiran ({e}); pokušaj dokument po dokument.")
+                for job in jobs:
+                    try:
+                        index_jobs([job])
+                    except Exception as job_error:
+                        discard_jobs([job])
+                        queue.fail(job["source_path"], str(job_error))
+    finally:
+        document_store.close()
+
+
+def run_pipeline(source_dir: str, docx_dir: str, output_path: str, db_path: str = config.PIPELINE_DB_PATH,
+                 qdrant_url: str = config.QDRANT_URL, collection_name: str | None = None,
+                 document_store_path: str | None = None, slim_payload: bool = config.SLIM_PAYLOADS,
+                 convert_workers: int = config.PIPELINE_CONVERT_WORKERS, extract_workers: int = config.PIPELINE_EXTRACT_WORKERS,
+                 soffice_path: str = "soffice", once: bool = False):
+    queue = JobQueue(db_path)
+    watcher = Watcher(queue, source_dir, settle_s=0 if once else config.PIPELINE_SETTLE_S, exclude_dir=docx_dir)
+    stop = threading.Event()
+    index_ready = threading.Event()
+    output_lock = threading.Lock()
+    facet_store = FacetStore(config.FACETS_DB_PATH)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    process_pool = ProcessPoolExecutor(max_workers=max(1, extract_workers))
+
+    threads = [threading.Thread(target=index_worker, name="index",
+                                args=(queue, qdrant_url, collection_name, document_store_path, slim_payload, stop, index_ready))]
+    threads += [threading.Thread(target=convert_worker, name=f"convert-{i}",
+                                 args=(queue, source_dir, docx_dir, soffice_path, i, stop)) for i in range(convert_workers)]
+    threads += [threading.Thread(target=extract_worker, name=f"extract-{i}",
+                                 args=(queue, process_pool, output_path, output_lock, facet_store, stop)) for i in range(extract_workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    print(f"Praćenje direktorijuma '{source_dir}' (Ctrl+C za prekid)...")
+    last_status = None
+    try:
+        while True:
+            added = watcher.scan()
+            if added:
+                logging.info(f"Novih fajlova u redu: {added}")
+            status = queue.counts()
+            if status != last_status:
+                print(" | ".join(f"{key}: {value}" for key, value in sorted(status.items())))
+                last_status = status
+            if once and index_ready.is_set() and not watcher.settling and queue.is_idle():
+                break
+            if not threads[0].is_alive():
+                print("Indeksiranje je prekinuto greškom (pogledajte pipeline_log.txt).")
+                break
+            time.sleep(config.PIPELINE_POLL_INTERVAL_S)
+    except KeyboardInterrupt:
+        print("\nZaustavljanje... Započeti poslovi nastavljaju se pri sledećem pokretanju.")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        process_pool.shutdown(wait=False, cancel_futures=True)
+        print(" | ".join(f"{key}: {value}" for key, value in sorted(queue.counts().items())))
+        queue.close()
+        facet_store.close()
+
+
+def print_status(db_path: str):
+    queue = JobQueue(db_path)
+    for key, value in sorted(queue.counts().items()):
+        print(f"{key:20} {value}")
+    with queue._lock:
+        failed = queue.conn.execute("SELECT source_path, error FROM jobs WHERE stage = 'failed' LIMIT 20").fetchall()
+    for source_path, error in failed:
+        print(f"  NEUSPEŠNO: {source_path}: {error}")
+    queue.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Protočna obrada arhive: dokumenti postaju pretraživi odmah po konverziji.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    watch_parser = subparsers.add_parser("watch", help="Prati izvorni direktorijum i obrađuje nove fajlove kroz sve faze.")
+    watch_parser.add_argument("source_directory", type=str, help="Direktorijum sa .doc (i .docx) fajlovima.")
+    watch_parser.add_argument("docx_directory", type=str, help="Direktorijum za konvertovane .docx fajlove.")
+    watch_parser.add_argument("output_file", type=str, help="JSONL korpus u koji se dopisuju ekstrahovani dokumenti.")
+    watch_parser.add_argument("--db", type=str, default=config.PIPELINE_DB_PATH, help="SQLite tabela poslova.")
+    watch_parser.add_argument("--qdrant-url", type=str, default=config.QDRANT_URL, help="URL Qdrant instance.")
+    watch_parser.add_argument("--collection-name", type=str, default=None,
+                              help="Ime Qdrant kolekcije (podrazumevano: kolekcija na koju pokazuje alias, inače QDRANT_COLLECTION_NAME).")
+    watch_parser.add_argument("--document-store", type=str, default=None,
+                              help="SQLite skladište dokumenata (podrazumevano: skladište izabrane kolekcije).")
+    watch_parser.add_argument("--slim-payload", action="store_true", default=config.SLIM_PAYLOADS, help="Slim payload tačke.")
+    watch_parser.add_argument("--convert-workers", type=int, default=config.PIPELINE_CONVERT_WORKERS, help="Broj paralelnih soffice konverzija.")
+    watch_parser.add_argument("--extract-workers", type=int, default=config.PIPELINE_EXTRACT_WORKERS, help="Broj procesa za ekstrakciju.")
+    watch_parser.add_argument("--soffice-path", type=str, default="soffice", help="Putanja do soffice izvršnog fajla.")
+    watch_parser.add_argument("--once", action="store_true", help="Obradi postojeće fajlove i završi (bez daljeg praćenja).")
+
+    status_parser = subparsers.add_parser("status", help="Broj poslova po fazama i poslednje greške.")
+    status_parser.add_argument("--db", type=str, default=config.PIPELINE_DB_PATH, help="SQLite tabela poslova.")
+
+    args = parser.parse_args()
+    if args.action == 'watch':
+        run_pipeline(args.source_directory, args.docx_directory, args.output_file, args.db, args.qdrant_url,
+                     args.collection_name, args.document_store, args.slim_payload, args.convert_workers,
+                     args.extract_workers, args.soffice_path, args.once)
+    elif args.action == 'status':
+        print_status(args.db)
@@ -1,156 +1,526 @@
-# rag_agent.py (Verzija sa alatkama za debugovanje)
+# rag_agent.py (Verzija sa strukturisanim logovima i metrikama)
 
+import os
+import time
+import logging
+import ollama
 import config
+from context_assembler import assemble_context, estimate_tokens, get_token_budget
+from reranker import CrossEncoderReranker
+from document_store import DocumentStore, document_id, store_path_for, resolve_collection
+from similar_cases import get_similar_cases
+from conversation import ConversationSession, continues_session, condense_question, format_history
+from ollama_runtime import KeepWarm, ollama_options
+from feedback import BoostTable
+from text_normalization import canonical_text
+from facets import FacetStore
+from telemetry import (configure_logging, start_metrics_server, new_request, span, log_event, logger,
+                       TIME_TO_FIRST_TOKEN, GENERATION_SECONDS, PROMPT_TOKENS, COMPLETION_TOKENS, STAGE_SECONDS, ERRORS)
 from langchain_qdrant import QdrantVectorStore
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient, models
+
+# Uputstvo je uvek na samom početku prompta i ne menja se: posle prvog zahteva Ollama ima
+# njegov KV keš i obrađuje samo kontekst i pitanje (keep-warm ping ne šalje tekst, pa ga ne prepisuje)
+SYSTEM_PREFIX = """
+Vi ste 'Drveni advokat', AI asistent specijalizovan za pravna pitanja u Srbiji. 
+Vaš zadatak je da odgovorite na pitanje korisnika isključivo na osnovu sledećeg konteksta iz pravnih dokumenata.
+Budite precizni i držite se informacija iz priloženog teksta.
+Ako odgovor nije u datom kontekstu, recite tačno: 'Na osnovu dostupnih informacija, nemam odgovor na vaše pitanje.'
+Nakon svakog dela odgovora, obavezno navedite izvor u formatu [Izvor: source_file].
+"""
 
 def format_docs(docs):
-    """Pomoćna funkcija za formatiranje konteksta i njegovo ispisivanje radi debugovanja."""
-    print("\n=== DEBUG: KONTEKST PROSLEDJEN MODELU ===")
-    print(f"DEBUG: Broj pronađenih dokumenata: {len(docs)}")
-    
+    """Pomoćna funkcija za formatiranje konteksta; detalji chunk-ova idu u debug log."""
     if not docs:
-        print("!!! NIJE PRONAĐEN NIJEDAN RELEVANTAN DOKUMENT !!!")
+        log_event("no_documents_found", logging.WARNING)
         return ""
     
-    for i, doc in enumerate(docs):
-        source_file = doc.metadata.get('source_file', 'Nepoznat')
-        print(f"--- CHUNK {i+1} [Izvor: {source_file}] ---")
-        print(f"DEBUG: Metadata: {doc.metadata}")
-        print(f"DEBUG: Content length: {len(doc.page_content)} characters")
-        print(f"Content preview: {doc.page_content[:200]}...")
-        print("-" * 50)
-    
-    print("=== KRAJ KONTEKSTA ===\n")
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, doc in enumerate(docs):
+            log_event("chunk", logging.DEBUG, rank=i + 1, source_file=doc.metadata.get('source_file', 'Nepoznat'),
+                      length=len(doc.page_content), metadata=doc.metadata, preview=doc.page_content[:200])
     return "\n\n".join(doc.page_content for doc in docs)
 
 class RAGAgent:
-    def __init__(self, llm_model=None, embedding_model=None, device=None):
-        print("Inicijalizacija RAG Agenta...")
+    def __init__(self, llm_model=None, embedding_model=None, device=None, rerank=None, debug=None,
+                 options: dict | None = None, keep_alive=None, keep_warm: bool = True):
+        configure_logging(debug)
+        start_metrics_server()
         
         # Use provided parameters or fall back to config defaults
         self.llm_model = llm_model or config.DEFAULT_LLM_MODEL
         self.embedding_model_name = embedding_model or config.DEFAULT_EMBEDDING_MODEL
         self.device = device or config.DEFAULT_DEVICE
+        log_event("agent_init", llm_model=self.llm_model, embedding_model=self.embedding_model_name, device=self.device)
         
         self.embedding_model = HuggingFaceEmbeddings(
             model_name=self.embedding_model_name,
             model_kwargs={'device': self.device}
         )
         qdrant_client = QdrantClient(url=config.QDRANT_URL)
+        # Pretraga ide preko alias-a, pa zamena kolekcije (blue-green) ne zahteva restart;
+        # refresh_collection prati promenu alias-a i otvara skladište nove kolekcije
+        self.collection_name, self.active_collection = resolve_collection(qdrant_client)
+        self.collection_checked_at = time.monotonic()
         self.vector_store = QdrantVectorStore(
             client=qdrant_client,
-            collection_name=config.QDRANT_COLLECTION_NAME,
+            collection_name=self.collection_name,
             embedding=self.embedding_model,
         )
-        self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
-        self.llm = OllamaLLM(model=self.llm_model)
-        template = """
-Vi ste 'Drveni advokat', AI asistent specijalizovan za pravna pitanja u Srbiji. 
-Vaš zadatak je da odgovorite na pitanje korisnika isključivo na osnovu sledećeg konteksta iz pravnih dokumenata.
-Budite precizni i držite se informacija iz priloženog teksta.
-Ako odgovor nije u datom kontekstu, recite tačno: 'Na osnovu dostupnih informacija, nemam odgovor na vaše pitanje.'
-Nakon svakog dela odgovora, obavezno navedite izvor u formatu [Izvor: source_file].
-
+        self.retrieval_k = config.RETRIEVAL_K
+        self.token_budget = get_token_budget(self.llm_model)
+        self.retriever = self.vector_store.as_retriever(search_kwargs={"k": self.retrieval_k})
+        use_rerank = config.RERANK_ENABLED if rerank is None else rerank
+        self.reranker = CrossEncoderReranker() if use_rerank else None
+        # Ocene iz aplikacije (feedback log) pomeraju redosled pogodaka
+        self.feedback = BoostTable()
+        # Skladište celih dokumenata (pravi ga index_corpus.py) za proširenje konteksta
+        self.document_store = self.open_document_store(self.active_collection)
+        # Fasete (datum, sud, sudija, tip) za grupisanje i sužavanje pretrage na skup dokumenata
+        self.facets = FacetStore(config.FACETS_DB_PATH, readonly=True) if os.path.exists(config.FACETS_DB_PATH) else None
+        self.last_stats = {}
+        # Parametri Ollama modela (num_ctx, num_thread, num_predict) i koliko dugo model ostaje učitan
+        self.ollama_options = ollama_options() if options is None else options
+        self.keep_alive = config.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive
+        # Streaming ide direktno kroz ollama klijent, da bismo dobili prompt_eval/eval statistiku
+        self.ollama_client = ollama.Client()
+        template = SYSTEM_PREFIX + """
 Kontekst:
 {context}
 
-Pitanje:
+{history}Pitanje:
 {question}
 
 Konačan odgovor na srpskom jeziku:
 """
-        self.prompt = PromptTemplate.from_template(template)
-        
-        # RAG lanac sada uključuje našu funkciju za ispis konteksta
-        self.rag_chain = (
-            {"context": self.retriever | format_docs, "question": RunnablePassthrough()}
-            | self.prompt
-            | self.llm
-            | StrOutputParser()
+        # Promenljivi delovi (istorija, pitanje) su na kraju: za nastavak razgovora početak
+        # prompta (uputstvo + kontekst) ostaje isti, pa Ollama ne računa ponovo njegov KV keš
+        self.prompt = PromptTemplate.from_template(template).partial(history="")
+        self.keep_warm = None
+        if keep_warm:
+            self.keep_warm = KeepWarm(self.ollama_client, self.llm_model, self.ollama_options, self.keep_alive)
+            self.keep_warm.start()
+        log_event("agent_ready", collection=self.collection_name, active_collection=self.active_collection,
+                  document_store=self.document_store is not None, rerank=self.reranker is not None,
+                  options=self.ollama_options, keep_alive=self.keep_alive)
+
+    @staticmethod
+    def open_document_store(collection_name: str) -> DocumentStore | None:
+        """Skladište koje pripada kolekciji (verzionisano posle manage_qdrant.py build) ili None."""
+        document_store_path = store_path_for(collection_name, config.DOCUMENT_STORE_PATH)
+        if not os.path.exists(document_store_path):
+            return None
+        return DocumentStore(document_store_path, readonly=True, mmap_bytes=config.DOCUMENT_STORE_MMAP_BYTES)
+
+    def refresh_collection(self, force: bool = False) -> bool:
+        """
+        Proverava (najviše jednom u QDRANT_ALIAS_REFRESH_S) na koju kolekciju alias pokazuje.
+        Posle "manage_qdrant.py switch" pretraga preko alias-a već ide u novu kolekciju, pa se
+        ovde menja samo skladište dokumenata; vraća True ako je kolekcija promenjena.
+        """
+        now = time.monotonic()
+        if not force and now - self.collection_checked_at < config.QDRANT_ALIAS_REFRESH_S:
+            return False
+        self.collection_checked_at = now
+        try:
+            collection_name, active_collection = resolve_collection(self.vector_store.client)
+        except Exception as e:
+            log_event("alias_refresh_failed", logging.WARNING, error=str(e))
+            return False
+        if (collection_name, active_collection) == (self.collection_name, self.active_collection):
+            return False
+        if collection_name != self.collection_name:
+            # Alias je napravljen ili obrisan: menja se i ime za pretragu
+            self.vector_store = QdrantVectorStore(client=self.vector_store.client, collection_name=collection_name,
+                                                  embedding=self.embedding_model)
+            self.retriever = self.vector_store.as_retriever(search_kwargs={"k": self.retrieval_k})
+        # Staro skladište se ne zatvara eksplicitno: zahtev koji je u toku ga još čita,
+        # a konekcija se zatvara kad se oslobodi poslednja referenca
+        self.document_store = self.open_document_store(active_collection)
+        log_event("collection_switched", previous=self.active_collection, active_collection=active_collection,
+                  collection=collection_name, document_store=self.document_store is not None)
+        self.collection_name, self.active_collection = collection_name, active_collection
+        return True
+
+    def close(self):
+        """Zaustavlja keep-warm nit (npr. kad se u aplikaciji inicijalizuje novi agent)."""
+        if self.keep_warm is not None:
+            self.keep_warm.stop()
+
+    @staticmethod
+    def section_filter(section_types: list | None, doc_ids: list | None = None, point_ids: list | None = None):
+        """
+        Qdrant filter za pretragu samo određenih delova dokumenata (npr. ['obrazlozenje']) i/ili
+        dokumenata. point_ids (tačke dokumenata iz chunk_refs) ima prednost nad doc_ids.
+        """
+        conditions = []
+        if section_types:
+            conditions.append(models.FieldCondition(key="metadata.section_type", match=models.MatchAny(any=list(section_types))))
+        if point_ids:
+            conditions.append(models.HasIdCondition(has_id=list(point_ids)))
+        elif doc_ids:
+            conditions.append(models.FieldCondition(key="metadata.doc_id", match=models.MatchAny(any=list(doc_ids))))
+        return models.Filter(must=conditions) if conditions else None
+
+    def document_points(self, doc_ids: list) -> list | None:
+        """
+        Tačke zadatih dokumenata, uključujući deljene chunk-ove i varijante iz dedup.py (chunk_refs).
+        None: nema document_store, filtrira se po metadata.doc_id. Preširok skup je greška, da se
+        filter koji je korisnik zadao ne bi tiho izgubio.
+        """
+        limit = config.FACETS_MAX_FILTER_POINTS
+        if self.document_store is None:
+            if len(doc_ids) > limit:
+                raise ValueError(f"Filter obuhvata {len(doc_ids)} dokumenata (najviše {limit}); suzite filter.")
+            return None
+        point_ids = self.document_store.point_ids_for_documents(list(doc_ids), limit)
+        if len(point_ids) > limit:
+            raise ValueError(f"Filter obuhvata {len(doc_ids)} dokumenata sa više od {limit} chunk-ova; suzite filter "
+                             f"(npr. kraći period ili sud/sudija).")
+        return point_ids
+
+    def hydrate(self, scored_docs: list) -> list:
+        """Dopunjuje "slim" tačke (bez teksta u payload-u) tekstom i metapodacima iz document_store."""
+        slim = [doc for doc, _ in scored_docs if not doc.page_content and doc.metadata.get("doc_id")]
+        if not slim or self.document_store is None:
+            return scored_docs
+        stored = self.document_store.get_metadata_many([doc.metadata["doc_id"] for doc in slim])
+        hydrated = []
+        for doc, score in scored_docs:
+            meta = doc.metadata
+            if doc.page_content or meta.get("doc_id") not in stored:
+                hydrated.append((doc, score))
+                continue
+            parent = stored[meta["doc_id"]]
+            text = self.document_store.get_text(meta["doc_id"], meta["char_start"], meta["char_end"]) or ""
+            new_meta = {**parent["metadata"], "source_file": parent["source_file"], "case_id": parent["case_id"], **meta}
+            hydrated.append((Document(page_content=text, metadata=new_meta), score))
+        return hydrated
+
+    @staticmethod
+    def points_to_docs(points) -> list:
+        """Qdrant tačke -> (Document, score) parovi, u istom obliku kao iz QdrantVectorStore."""
+        scored_docs = []
+        for point in points:
+            meta = dict(point.payload.get("metadata", {}))
+            meta["_id"] = point.id
+            scored_docs.append((Document(page_content=point.payload.get("page_content", ""), metadata=meta), point.score))
+        return scored_docs
+
+    def retrieve_batch(self, questions: list[str], section_types: list | None = None) -> list[list]:
+        """
+        Pretraga za više pitanja odjednom: jedan poziv embedding modela i jedan
+        query_batch_points zahtev ka Qdrant-u. section_types je lista (po pitanju) ili None.
+        """
+        if not questions:
+            return []
+        section_types = section_types or [None] * len(questions)
+        questions = [canonical_text(question) for question in questions]
+        limit = config.RERANK_FETCH_K if self.reranker is not None else self.retrieval_k
+        # Kod HuggingFaceEmbeddings embed_query je isto što i embed_documents([q]) bez posebnih query kwargs
+        with span("embed_query", batch=len(questions)):
+            vectors = self.embedding_model.embed_documents(questions)
+        requests = [
+            models.QueryRequest(query=vector, limit=limit, filter=self.section_filter(types), with_payload=True)
+            for vector, types in zip(vectors, section_types)
+        ]
+        with span("vector_search", k=limit, batch=len(questions)):
+            batch_responses = self.vector_store.client.query_batch_points(
+                collection_name=self.vector_store.collection_name, requests=requests
+            )
+        results = []
+        for question, points in zip(questions, (response.points for response in batch_responses)):
+            with span("hydrate"):
+                scored_docs = self.hydrate(self.points_to_docs(points))
+            if self.reranker is not None:
+                with span("rerank") as attributes:
+                    scored_docs, rerank_stats = self.reranker.rerank(question, scored_docs, len(scored_docs))
+                    attributes.update(rerank_stats)
+            results.append(self.apply_feedback(scored_docs)[:self.retrieval_k])
+        return results
+
+    def search_by_vector(self, query_vector: list, k: int, search_filter=None) -> list:
+        """Pretraga Qdrant-a za već izračunat vektor upita (sa dopunom slim tačaka)."""
+        with span("vector_search", k=k, filtered=search_filter is not None) as attributes:
+            results = self.vector_store.similarity_search_with_score_by_vector(query_vector, k=k, filter=search_filter)
+            attributes["hits"] = len(results)
+        with span("hydrate"):
+            return self.hydrate(results)
+
+    def retrieve(self, question: str, section_types: list | None = None, doc_ids: list | None = None) -> list:
+        """Vraća listu (Document, score) parova sortiranih po relevantnosti."""
+        if doc_ids is not None and not doc_ids:
+            return []  # Prazan skup dokumenata (npr. iz faseta): filter bez uslova bi pretražio sve
+        point_ids = self.document_points(doc_ids) if doc_ids else None
+        if point_ids is not None and not point_ids:
+            return []
+        search_filter = self.section_filter(section_types, doc_ids, point_ids)
+        # Indeks je u latinici; upit na ćirilici se prevodi pre embedovanja i rerangiranja
+        question = canonical_text(question)
+        with span("embed_query", chars=len(question)):
+            query_vector = self.embedding_model.embed_query(question)
+        if self.reranker is None:
+            return self.apply_feedback(self.search_by_vector(query_vector, self.retrieval_k, search_filter))
+        candidates = self.search_by_vector(query_vector, config.RERANK_FETCH_K, search_filter)
+        with span("rerank") as attributes:
+            # Svi kandidati ostaju u igri, da bi dobro ocenjen chunk mogao da uđe u top k
+            reranked, rerank_stats = self.reranker.rerank(question, candidates, len(candidates))
+            attributes.update(rerank_stats)
+        self.last_stats["rerank"] = rerank_stats
+        return self.apply_feedback(reranked)[:self.retrieval_k]
+
+    def apply_feedback(self, scored_docs: list) -> list:
+        """Preuređuje pogotke prema ocenama korisnika (tabela u memoriji, bez upita ka Qdrant-u)."""
+        with span("feedback_boost") as attributes:
+            boosted = self.feedback.apply(scored_docs)
+            attributes["rated_points"] = len(self.feedback.point_scores)
+        return boosted
+
+    def expand_to_parent(self, scored_docs: list, mode: str) -> list:
+        """Proširuje pogotke na ceo deo dokumenta ili prozor oko chunk-a (iz document_store)."""
+        if self.document_store is None or not mode:
+            return scored_docs
+        expanded = []
+        for doc, score in scored_docs:
+            meta = doc.metadata
+            if meta.get("doc_id") is None or meta.get("char_start") is None:
+                expanded.append((doc, score))
+                continue
+            bounds = self.document_store.expand_span(
+                meta["doc_id"], meta.get("section_index"), meta["char_start"], meta["char_end"],
+                mode, config.PARENT_WINDOW_CHARS, config.PARENT_MAX_SECTION_CHARS,
+            )
+            text = self.document_store.get_text(meta["doc_id"], *bounds) if bounds else None
+            if not text:
+                expanded.append((doc, score))
+                continue
+            new_meta = {**meta, "char_start": bounds[0], "char_end": bounds[1], "expanded": mode}
+            expanded.append((Document(page_content=text, metadata=new_meta), score))
+        return expanded
+
+    def build_context(self, question: str, section_types: list | None = None, expand: str | None = None,
+                      doc_ids: list | None = None) -> tuple[str, list, dict]:
+        """Pretražuje bazu i sastavlja kontekst (spajanje, deduplikacija, budžet tokena)."""
+        self.last_stats = {}
+        scored_docs = self.retrieve(question, section_types, doc_ids)
+        return self.assemble(scored_docs, expand)
+
+    def facet_counts(self, field: str, filters: dict | None = None, limit: int | None = None) -> list[tuple[str, int]]:
+        """Broj dokumenata po sudu, sudiji, tipu ili godini (facets.py), uz filtere faseta."""
+        if self.facets is None:
+            return []
+        with span("facets", field=field):
+            return self.facets.group_by(field, filters, limit)
+
+    def facet_timeline(self, period: str = "year", filters: dict | None = None, by: str | None = None) -> list[tuple]:
+        """Broj dokumenata po godini/mesecu (npr. odluke sudije X kroz vreme)."""
+        if self.facets is None:
+            return []
+        with span("facets", period=period, by=by):
+            return self.facets.timeline(period, filters, by)
+
+    def facet_doc_ids(self, filters: dict | None) -> list | None:
+        """
+        doc_id-jevi za filtere faseta, za Qdrant filter u retrieve. None znači "bez filtera";
+        zadat filter bez tabele faseta je greška, jer bi pretraga tiho išla po celoj arhivi.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value}
+        if not filters:
+            return None
+        if self.facets is None:
+            raise ValueError(f"Tabela faseta '{config.FACETS_DB_PATH}' ne postoji (python facets.py); filter {filters} nije primenjen.")
+        with span("facets", filters=filters) as attributes:
+            doc_ids = self.facets.doc_ids(filters)
+            attributes["documents"] = len(doc_ids)
+        return doc_ids
+
+    def assemble(self, scored_docs: list, expand: str | None = None) -> tuple[str, list, dict]:
+        """Proširenje pogodaka i sastavljanje konteksta za već pronađene (Document, score) parove."""
+        mode = config.PARENT_EXPANSION if expand is None else expand
+        with span("expand", mode=mode):
+            scored_docs = self.expand_to_parent(scored_docs, mode)
+        with span("context_assembly") as attributes:
+            format_docs([doc for doc, _ in scored_docs])
+            context, blocks, stats = assemble_context(scored_docs, self.token_budget)
+            attributes.update(stats)
+        self.last_stats.update(stats)
+        return context, blocks, stats
+
+    def similar_cases(self, doc_id: str | None = None, source_file: str | None = None, limit: int | None = None) -> list[dict]:
+        """Slični predmeti (precomputed u similar_cases.py) za dokument zadat sa doc_id ili putanjom izvora."""
+        doc_id = doc_id or document_id({"source_file": source_file or ""})
+        with span("similar_cases") as attributes:
+            similar = get_similar_cases(self.vector_store.client, self.vector_store.collection_name, doc_id, limit)
+            attributes["results"] = len(similar)
+        return similar
+
+    def generate(self, prompt_text: str):
+        """
+        Strimuje odgovor iz Ollama. Meri vreme do prvog tokena, prompt eval i generisanje,
+        a broj tokena prompta/odgovora uzima iz poslednjeg (done) odgovora servera.
+        """
+        self.last_stats["prompt_tokens"] = estimate_tokens(prompt_text)
+        start_time = time.perf_counter()
+        first_token_time = None
+        for chunk in self.ollama_client.generate(model=self.llm_model, prompt=prompt_text, stream=True,
+                                                 options=self.ollama_options, keep_alive=self.keep_alive):
+            text = chunk.get('response', '')
+            if text and first_token_time is None:
+                first_token_time = time.perf_counter()
+                self.last_stats["time_to_first_token_s"] = first_token_time - start_time
+                TIME_TO_FIRST_TOKEN.observe(first_token_time - start_time, model=self.llm_model)
+            if chunk.get('done'):
+                self._record_generation(chunk, self.last_stats)
+            if text:
+                yield text
+        total = time.perf_counter() - start_time
+        self.last_stats["total_generation_s"] = total
+        GENERATION_SECONDS.observe(total, model=self.llm_model)
+        log_event("generation", model=self.llm_model, **{k: v for k, v in self.last_stats.items() if k != "rerank"})
+
+    def _record_generation(self, final_chunk, stats: dict):
+        prompt_tokens = final_chunk.get('prompt_eval_count')
+        completion_tokens = final_chunk.get('eval_count')
+        if prompt_tokens:
+            stats["prompt_tokens"] = prompt_tokens
+            PROMPT_TOKENS.observe(prompt_tokens, model=self.llm_model)
+        if completion_tokens:
+            stats["completion_tokens"] = completion_tokens
+            COMPLETION_TOKENS.observe(completion_tokens, model=self.llm_model)
+        if final_chunk.get('prompt_eval_duration'):
+            stats["prompt_eval_s"] = final_chunk['prompt_eval_duration'] / 1e9
+            STAGE_SECONDS.observe(stats["prompt_eval_s"], stage="prompt_eval")
+        if final_chunk.get('eval_duration'):
+            stats["eval_s"] = final_chunk['eval_duration'] / 1e9
+            STAGE_SECONDS.observe(stats["eval_s"], stage="eval")
+
+    def complete(self, prompt_text: str) -> tuple[str, dict]:
+        """Generisanje bez strimovanja; ne dira last_stats, pa se može zvati iz više niti (batch_ask.py)."""
+        stats = {}
+        start_time = time.perf_counter()
+        response = self.ollama_client.generate(model=self.llm_model, prompt=prompt_text,
+                                               options=self.ollama_options, keep_alive=self.keep_alive)
+        self._record_generation(response, stats)
+        stats["total_generation_s"] = time.perf_counter() - start_time
+        GENERATION_SECONDS.observe(stats["total_generation_s"], model=self.llm_model)
+        return response.get('response', ''), stats
+
+    def extend_context(self, session: ConversationSession, query: str, section_types: list | None = None,
+                       expand: str | None = None) -> tuple[str, list]:
+        """
+        Nastavak razgovora o istom predmetu: prethodni kontekst se zadržava doslovno (isti
+        početak prompta), a ako ima mesta u budžetu, dodaju se novi chunk-ovi iz istih dokumenata.
+        """
+        context, blocks = session.context, session.blocks
+        remaining = self.token_budget - estimate_tokens(context)
+        with span("follow_up", reused_blocks=len(blocks), remaining_tokens=remaining) as attributes:
+            if remaining >= config.CONTEXT_MIN_BLOCK_TOKENS and session.doc_ids:
+                scored_docs = self.retrieve(query, section_types, doc_ids=session.doc_ids)
+                scored_docs = [(doc, score) for doc, score in scored_docs if doc.metadata.get("_id") not in session.point_ids]
+                mode = config.PARENT_EXPANSION if expand is None else expand
+                scored_docs = [(doc, score) for doc, score in self.expand_to_parent(scored_docs, mode)
+                               if not self._covered(doc, blocks)]
+                if scored_docs:
+                    extra_context, extra_blocks, _ = assemble_context(scored_docs, remaining)
+                    if extra_blocks:
+                        context = f"{context}\n\n{extra_context}"
+                        blocks = blocks + extra_blocks
+            attributes["new_blocks"] = len(blocks) - len(session.blocks)
+        self.last_stats.update({"follow_up": True, "reused_blocks": len(session.blocks),
+                                "new_blocks": len(blocks) - len(session.blocks)})
+        session.remember(context, blocks)
+        return context, blocks
+
+    @staticmethod
+    def _covered(doc, blocks: list) -> bool:
+        """Da li je isečak već u nekom bloku prethodnog konteksta (isti izvor, obuhvatajući offset-i)."""
+        start, end = doc.metadata.get("char_start"), doc.metadata.get("char_end")
+        if start is None:
+            return False
+        source = doc.metadata.get("source_file", "Nepoznat")
+        return any(block["source"] == source and block["start"] is not None
+                   and block["start"] <= start and end <= block["end"] for block in blocks)
+
+    def prepare(self, question: str, section_types: list | None = None, expand: str | None = None,
+                history: list | None = None, session: ConversationSession | None = None,
+                facets: dict | None = None) -> tuple[str, list]:
+        """
+        Pretraga i prompt za pitanje (uz istoriju razgovora). facets (npr. {"judge": "...",
+        "date_from": "2000"}) sužava pretragu na dokumente iz tabele faseta. Vraća (prompt, izvori).
+        """
+        history = history or []
+        self.refresh_collection()
+        follow_up = False
+        if session is not None and session.context:
+            with span("follow_up_check"):
+                follow_up = continues_session(session, canonical_text(question), history, self.embedding_model.embed_query,
+                                              self.embedding_model.embed_documents, facets)
+        if follow_up:
+            self.last_stats = {}
+            query = condense_question(question, history, session.anchor_question)
+            context, blocks = self.extend_context(session, query, section_types, expand)
+        else:
+            context, blocks, _ = self.build_context(question, section_types, expand, self.facet_doc_ids(facets))
+            if session is not None:
+                session.remember(context, blocks)
+                session.anchor_question = question
+                session.facets = {key: value for key, value in (facets or {}).items() if value}
+        history_text = format_history(history)
+        prompt_text = self.prompt.format(
+            context=context,
+            history=f"Dosadašnji razgovor:\n{history_text}\n\n" if history_text else "",
+            question=question,
         )
-        print("RAG Agent je spreman.")
+        # Izvori za prikaz (u redosledu relevantnosti)
+        source_files = list(dict.fromkeys(block["source"] for block in blocks))
+        return prompt_text, source_files
 
-    def ask(self, question: str):
-        print(f"\n=== DEBUG: ASK POZVAN ===")
-        print(f"DEBUG: Pitanje: {question}")
-        print(f"DEBUG: LLM model: {self.llm_model}")
+    def ask(self, question: str, section_types: list | None = None, expand: str | None = None,
+            history: list | None = None, session: ConversationSession | None = None, facets: dict | None = None):
+        new_request("ask")
+        log_event("ask", question=question, llm_model=self.llm_model)
         
         try:
-            # Test retriever directly first
-            print("DEBUG: Testiram retriever direktno...")
-            docs = self.retriever.invoke(question)
-            print(f"DEBUG: Retriever vratio {len(docs)} dokumenata")
-            
-            if docs:
-                for i, doc in enumerate(docs):
-                    print(f"DEBUG: Doc {i+1} - Source: {doc.metadata.get('source_file', 'N/A')}")
-                    print(f"DEBUG: Doc {i+1} - Content preview: {doc.page_content[:100]}...")
-            
-            print("DEBUG: Pozivam RAG chain...")
-            result = self.rag_chain.invoke(question)
-            print(f"DEBUG: RAG chain vratio odgovor dužine: {len(result)} karaktera")
-            return result
+            prompt_text, _ = self.prepare(question, section_types, expand, history, session, facets)
+            return "".join(self.generate(prompt_text))
             
         except Exception as e:
-            print(f"DEBUG: Greška u ask metodi: {e}")
-            import traceback
-            traceback.print_exc()
+            ERRORS.inc(stage="ask")
+            logger.exception("ask_error", extra={"fields": {"error": str(e)}})
             return f"Greška pri obradi pitanja: {e}"
     
-    def stream_ask(self, question: str):
-        """Stream response and return source documents for Streamlit app."""
-        print(f"\n=== DEBUG: STREAM_ASK POZVAN ===")
-        print(f"DEBUG: Pitanje: {question}")
-        print(f"DEBUG: LLM model: {self.llm_model}")
-        print(f"DEBUG: Embedding model: {self.embedding_model_name}")
-        print(f"DEBUG: Device: {self.device}")
+    def stream_ask(self, question: str, section_types: list | None = None, expand: str | None = None,
+                   history: list | None = None, session: ConversationSession | None = None, facets: dict | None = None):
+        """
+        Stream response and return source documents for Streamlit app.
+        history su prethodne poruke razgovora, a session čuva kontekst za nastavak istog predmeta.
+        """
+        new_request("stream_ask")
+        log_event("stream_ask", question=question, llm_model=self.llm_model,
+                  embedding_model=self.embedding_model_name, device=self.device, history=len(history or []))
         
         try:
-            # Get relevant documents
-            print("DEBUG: Pozivam retriever...")
-            docs = self.retriever.invoke(question)
-            print(f"DEBUG: Retriever vratio {len(docs)} dokumenata")
-            
-            # Extract source files for display
-            source_files = list(set([doc.metadata.get('source_file', 'Nepoznat') for doc in docs]))
-            print(f"DEBUG: Source files: {source_files}")
-            
-            # Format context
-            print("DEBUG: Formatiram kontekst...")
-            context = format_docs(docs)
-            print(f"DEBUG: Formatiran kontekst dužine: {len(context)} karaktera")
-            
-            # Create prompt
-            prompt_text = self.prompt.format(context=context, question=question)
-            print(f"DEBUG: Kreiran prompt dužine: {len(prompt_text)} karaktera")
-            print(f"DEBUG: Prompt preview: {prompt_text[:300]}...")
+            # Get relevant documents (ili prethodni kontekst) and build the prompt
+            prompt_text, source_files = self.prepare(question, section_types, expand, history, session, facets)
+            log_event("prompt", logging.DEBUG, chars=len(prompt_text), sources=source_files, preview=prompt_text[:300])
             
             # Stream the response
             def response_generator():
                 try:
-                    print("DEBUG: Počinje streaming odgovora...")
-                    # For OllamaLLM, we need to use the stream method
-                    for chunk in self.llm.stream(prompt_text):
-                        print(f"DEBUG: Chunk received: {chunk[:50]}...")
-                        yield chunk
-                    print("DEBUG: Streaming završen")
+                    yield from self.generate(prompt_text)
                 except Exception as e:
-                    error_msg = f"Greška pri generisanju odgovora: {e}"
-                    print(f"DEBUG: {error_msg}")
-                    yield error_msg
+                    ERRORS.inc(stage="generation")
+                    log_event("generation_error", logging.ERROR, error=str(e))
+                    yield f"Greška pri generisanju odgovora: {e}"
             
             return response_generator(), source_files
             
         except Exception as e:
-            print(f"DEBUG: Greška u stream_ask: {e}")
-            import traceback
-            traceback.print_exc()
+            ERRORS.inc(stage="stream_ask")
+            logger.exception("stream_ask_error", extra={"fields": {"error": str(e)}})
             
             def error_generator():
                 yield f"Greška pri obradi pitanja: {e}"
@@ -0,0 +1,105 @@
+# reranker.py (Cross-encoder rerangiranje kandidata iz Qdrant-a)
+#
+# Qdrant vraća širi skup kandidata (npr. 50), a mali višejezični cross-encoder
+# na CPU-u ih ponovo boduje u serijama. Ako rerangiranje probije vremenski
+# budžet ili je previše istovremenih zahteva, vraća se redosled iz bi-encodera.
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import config
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name=None, device=None, batch_size=None, cache_size=None,
+                 time_budget_ms=None, max_concurrent=None):
+        self.model_name = model_name or config.RERANK_MODEL
+        self.device = device or config.RERANK_DEVICE
+        self.batch_size = batch_size or config.RERANK_BATCH_SIZE
+        self.cache_size = cache_size or config.RERANK_CACHE_SIZE
+        self.time_budget_ms = time_budget_ms if time_budget_ms is not None else config.RERANK_TIME_BUDGET_MS
+        self.max_concurrent = max_concurrent or config.RERANK_MAX_CONCURRENT
+        self._model = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def model(self):
+        """Model se učitava tek pri prvom rerangiranju."""
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def _cache_key(self, question: str, doc) -> str:
+        doc_key = doc.metadata.get("_id") or doc.page_content
+        return hashlib.sha1(f"{question}\x00{doc_key}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _cache_put(self, key: str, score: float):
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, question: str, scored_docs: list, top_n: int) -> tuple[list, dict]:
+        """
+        Rerangira listu (Document, score) parova i vraća top_n najboljih.
+        Vraća (rerangirani parovi, statistika).
+        """
+        start_time = time.perf_counter()
+        stats = {"candidates": len(scored_docs), "scored": 0, "cache_hits": 0, "skipped": False, "truncated": False}
+
+        with self._lock:
+            overloaded = self._in_flight >= self.max_concurrent
+            if not overloaded:
+                self._in_flight += 1
+        if overloaded:
+            stats["skipped"] = True
+            stats["elapsed_ms"] = (time.perf_counter() - start_time) * 1000
+            return scored_docs[:top_n], stats
+
+        try:
+            scores = [None] * len(scored_docs)
+            pending = []
+            for i, (doc, _) in enumerate(scored_docs):
+                cached = self._cache_get(self._cache_key(question, doc))
+                if cached is not None:
+                    scores[i] = cached
+                    stats["cache_hits"] += 1
+                else:
+                    pending.append(i)
+
+            for batch_start in range(0, len(pending), self.batch_size):
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                if self.time_budget_ms and elapsed_ms > self.time_budget_ms:
+                    stats["truncated"] = True
+                    break
+                batch = pending[batch_start:batch_start + self.batch_size]
+                pairs = [(question, scored_docs[i][0].page_content) for i in batch]
+                for i, score in zip(batch, self.model.predict(pairs, batch_size=self.batch_size)):
+                    scores[i] = float(score)
+                    self._cache_put(self._cache_key(question, scored_docs[i][0]), scores[i])
+                stats["scored"] += len(batch)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        # Ocenjeni kandidati idu napred po oceni cross-encodera, ostali zadržavaju redosled iz Qdrant-a
+        reranked = sorted(
+            ((scored_docs[i][0], scores[i]) for i in range(len(scored_docs)) if scores[i] is not None),
+            key=lambda pair: pair[1],
+            reverse=True,
+        )
+        reranked += [scored_docs[i] for i in range(len(scored_docs)) if scores[i] is None]
+        stats["elapsed_ms"] = (time.perf_counter() - start_time) * 1000
+        return reranked[:top_n], stats
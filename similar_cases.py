@@ -0,0 +1,225 @@
+# similar_cases.py (Indeks "sličnih predmeta" na nivou dokumenta)
+#
+# Svaki dokument dobija jedan vektor: normalizovan prosek vektora svojih
+# chunk-ova, izračunat dok index_corpus.py embeduje (bez ponovnog embedovanja).
+# Vektori dokumenata stoje u posebnoj kolekciji "<kolekcija>_documents".
+# Offline posao zatim za svaki dokument, u paketima (query_batch_points preko HNSW
+# indeksa, a ne N² poređenja), upisuje top-N sličnih dokumenata u njegov
+# payload, pa UI dobija slične predmete jednim čitanjem tačke.
+#
+# Primer:
+#   python similar_cases.py drveni_advokat --top-n 10
+#   python similar_cases.py drveni_advokat --rebuild-vectors   # vektori iz postojećeg indeksa
+
+import uuid
+import argparse
+import logging
+from collections import defaultdict
+import numpy as np
+from tqdm import tqdm
+from qdrant_client import QdrantClient, models
+import config
+from document_store import DocumentStore
+
+logging.basicConfig(filename='similar_cases_log.txt', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DOCUMENT_NAMESPACE = uuid.UUID("b3a4e1f0-6d2c-4c87-8f3e-5a9d0c2b7e41")
+
+
+def document_collection_name(collection_name: str) -> str:
+    return f"{collection_name}_documents"
+
+
+def document_point_id(doc_id: str) -> str:
+    return str(uuid.uuid5(DOCUMENT_NAMESPACE, doc_id))
+
+
+def setup_document_collection(client: QdrantClient, collection_name: str):
+    """Kreira kolekciju vektora dokumenata (ako ne postoji) sa indeksom po doc_id."""
+    name = document_collection_name(collection_name)
+    if client.collection_exists(name):
+        return name
+    print(f"Kreiranje kolekcije dokumenata: '{name}'")
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=config.VECTOR_DIMENSION, distance=config.DISTANCE_METRIC),
+    )
+    client.create_payload_index(collection_name=name, field_name="doc_id", field_schema=models.PayloadSchemaType.KEYWORD)
+    return name
+
+
+class DocumentVectorPool:
+    """
+    Sabira vektore chunk-ova po dokumentu tokom indeksiranja. Čuva samo zbir po
+    dokumentu; vektori chunk-ova koji su već bili u kolekciji (deljeni sa ranije
+    indeksiranim dokumentima) se na kraju čitaju iz Qdrant-a.
+    """
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = defaultdict(int)
+        self.point_docs = defaultdict(list)  # Nova tačka -> dokumenti koji je sadrže
+        self.existing_points = defaultdict(list)  # Dokument -> već postojeće tačke
+
+    def expect(self, doc_id: str, point_id: str, is_new: bool):
+        if is_new:
+            self.point_docs[point_id].append(doc_id)
+        else:
+            self.existing_points[doc_id].append(point_id)
+
+    def _accumulate(self, doc_id: str, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        if doc_id in self.sums:
+            self.sums[doc_id] += vector
+        else:
+            self.sums[doc_id] = vector.copy()
+        self.counts[doc_id] += 1
+
+    def add(self, point_id: str, vector):
+        for doc_id in self.point_docs.pop(point_id, ()):
+            self._accumulate(doc_id, vector)
+
+    def fill_existing(self, client: QdrantClient, collection_name: str, batch_size: int = config.BATCH_SIZE):
+        point_docs = defaultdict(list)
+        for doc_id, point_ids in self.existing_points.items():
+            for point_id in point_ids:
+                point_docs[point_id].append(doc_id)
+        point_ids = list(point_docs)
+        for start in range(0, len(point_ids), batch_size):
+            points = client.retrieve(collection_name=collection_name, ids=point_ids[start:start + batch_size],
+                                     with_vectors=True, with_payload=False)
+            for point in points:
+                for doc_id in point_docs[str(point.id)]:
+                    self._accumulate(doc_id, point.vector)
+        self.existing_points.clear()
+
+    def pooled(self):
+        """(doc_id, normalizovan prosečan vektor) za svaki dokument."""
+        for doc_id, vector_sum in self.sums.items():
+            norm = np.linalg.norm(vector_sum)
+            if norm:
+                yield doc_id, (vector_sum / norm).tolist()
+
+
+def document_payload(document_store: DocumentStore, doc_ids: list[str]) -> dict:
+    """Payload tačke dokumenta: doc_id, izvor i polja za filtriranje (sud, datum, tip)."""
+    stored = document_store.get_metadata_many(doc_ids)
+    payloads = {}
+    for doc_id in doc_ids:
+        parent = stored.get(doc_id, {"source_file": "", "case_id": "", "metadata": {}})
+        payloads[doc_id] = {
+            "doc_id": doc_id,
+            "source_file": parent["source_file"],
+            "case_id": parent["case_id"],
+            **{key: parent["metadata"][key] for key in config.SLIM_PAYLOAD_FIELDS if key in parent["metadata"]},
+        }
+    return payloads
+
+
+def upsert_document_vectors(client: QdrantClient, collection_name: str, pool: DocumentVectorPool,
+                            document_store: DocumentStore, skip_doc_ids: set = frozenset()) -> int:
+    """Upisuje vektore dokumenata. Varijante (duplicate_of) se preskaču da ne bi bile jedna drugoj "najsličnije"."""
+    pool.fill_existing(client, collection_name)
+    name = setup_document_collection(client, collection_name)
+    written = 0
+    pooled = [(doc_id, vector) for doc_id, vector in pool.pooled() if doc_id not in skip_doc_ids]
+    for start in range(0, len(pooled), config.BATCH_SIZE):
+        batch = pooled[start:start + config.BATCH_SIZE]
+        payloads = document_payload(document_store, [doc_id for doc_id, _ in batch])
+        client.upsert(collection_name=name, points=[
+            models.PointStruct(id=document_point_id(doc_id), vector=vector, payload=payloads[doc_id])
+            for doc_id, vector in batch
+        ], wait=True)
+        written += len(batch)
+    return written
+
+
+def rebuild_document_vectors(client: QdrantClient, collection_name: str, document_store: DocumentStore) -> int:
+    """
+    Pravi vektore dokumenata iz već indeksiranih chunk-ova (za korpus indeksiran pre
+    ove funkcije). Dokumenti se obrađuju u paketima, pa memorija ne raste sa korpusom.
+    """
+    skip = document_store.variant_doc_ids()
+    pool, current, docs_in_pool, written = DocumentVectorPool(), None, 0, 0
+    for doc_id, point_id in tqdm(document_store.iter_document_points(), desc="Vektori dokumenata"):
+        if doc_id != current:
+            if docs_in_pool >= config.SIMILAR_CASES_BATCH_SIZE:
+                written += upsert_document_vectors(client, collection_name, pool, document_store, skip)
+                pool, docs_in_pool = DocumentVectorPool(), 0
+            current = doc_id
+            docs_in_pool += 1
+        pool.expect(doc_id, point_id, is_new=False)
+    written += upsert_document_vectors(client, collection_name, pool, document_store, skip)
+    return written
+
+
+def precompute_neighbours(client: QdrantClient, collection_name: str, top_n: int = config.SIMILAR_CASES_TOP_N,
+                          batch_size: int = config.SIMILAR_CASES_BATCH_SIZE):
+    """Za svaki dokument upisuje top_n najsličnijih u payload polje 'similar'."""
+    name = document_collection_name(collection_name)
+    total = client.count(collection_name=name, exact=True).count
+    offset = None
+    with tqdm(total=total, desc="Slični predmeti") as progress:
+        while True:
+            points, offset = client.scroll(collection_name=name, limit=batch_size, offset=offset,
+                                           with_vectors=True, with_payload=["doc_id"])
+            if not points:
+                break
+            requests = [
+                models.QueryRequest(
+                    query=point.vector, limit=top_n, with_payload=["doc_id", "source_file"],
+                    filter=models.Filter(must_not=[models.HasIdCondition(has_id=[point.id])]),
+                )
+                for point in points
+            ]
+            results = client.query_batch_points(collection_name=name, requests=requests)
+            operations = []
+            for point, hits in zip(points, (response.points for response in results)):
+                similar = [{"doc_id": hit.payload["doc_id"], "source_file": hit.payload.get("source_file", ""),
+                            "score": round(hit.score, 4)} for hit in hits]
+                operations.append(models.SetPayloadOperation(
+                    set_payload=models.SetPayload(payload={"similar": similar}, points=[point.id])
+                ))
+            client.batch_update_points(collection_name=name, update_operations=operations)
+            progress.update(len(points))
+            if offset is None:
+                break
+    print(f"Slični predmeti izračunati za {total} dokumenata (top {top_n}).")
+
+
+def get_similar_cases(client: QdrantClient, collection_name: str, doc_id: str, limit: int | None = None) -> list[dict]:
+    """Slični predmeti iz payload-a; ako još nisu izračunati, radi se jedna pretraga po vektoru dokumenta."""
+    name = document_collection_name(collection_name)
+    if not client.collection_exists(name):
+        return []
+    points = client.retrieve(collection_name=name, ids=[document_point_id(doc_id)], with_payload=["similar"],
+                             with_vectors=True)
+    if not points:
+        return []
+    similar = points[0].payload.get("similar")
+    if similar is None:
+        hits = client.query_points(collection_name=name, query=points[0].vector, limit=limit or config.SIMILAR_CASES_TOP_N,
+                                   query_filter=models.Filter(must_not=[models.HasIdCondition(has_id=[points[0].id])]),
+                                   with_payload=["doc_id", "source_file"]).points
+        similar = [{"doc_id": hit.payload["doc_id"], "source_file": hit.payload.get("source_file", ""),
+                    "score": round(hit.score, 4)} for hit in hits]
+    return similar[:limit] if limit else similar
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Računa slične predmete (vektori dokumenata i top-N susedi).")
+    parser.add_argument("collection_name", type=str, help="Ime kolekcije chunk-ova (npr. drveni_advokat).")
+    parser.add_argument("--qdrant-url", type=str, default=config.QDRANT_URL, help="URL Qdrant instance.")
+    parser.add_argument("--document-store", type=str, default=config.DOCUMENT_STORE_PATH, help="SQLite skladište dokumenata.")
+    parser.add_argument("--top-n", type=int, default=config.SIMILAR_CASES_TOP_N, help="Broj sličnih predmeta po dokumentu.")
+    parser.add_argument("--batch-size", type=int, default=config.SIMILAR_CASES_BATCH_SIZE, help="Dokumenata po query_batch_points zahtevu.")
+    parser.add_argument("--rebuild-vectors", action="store_true", help="Ponovo izračunaj vektore dokumenata iz postojećih chunk-ova.")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url)
+    if args.rebuild_vectors:
+        store = DocumentStore(args.document_store, readonly=True)
+        written = rebuild_document_vectors(client, args.collection_name, store)
+        store.close()
+        print(f"Upisano {written} vektora dokumenata.")
+    precompute_neighbours(client, args.collection_name, args.top_n, args.batch_size)
@@ -0,0 +1,193 @@
+# telemetry.py (Strukturisani logovi, span-ovi i Prometheus metrike za RAGAgent)
+#
+# Umesto print("DEBUG: ...") poziva, svaki korak zahteva (embed upita, pretraga,
+# sastavljanje konteksta, prompt eval, generisanje) je "span": meri se trajanje,
+# upisuje se kao JSON red u log i ulazi u histogram. Metrike se čitaju na
+# http://localhost:<METRICS_PORT>/metrics u Prometheus tekstualnom formatu.
+
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+logger = logging.getLogger("drveni_advokat")
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+# Granice histograma (sekunde za latenciju, broj za tokene)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        request_id = _request_id.get()
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(debug: bool | None = None):
+    """Podešava JSON log u fajl; sa debug=True loguju se i detalji (pregled chunk-ova itd.)."""
+    debug = config.DEBUG_LOGGING if debug is None else debug
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    if not logger.handlers:
+        handler = logging.FileHandler(config.TELEMETRY_LOG_PATH, encoding="utf-8")
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+
+def log_event(message: str, level: int = logging.INFO, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": fields})
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_labels(key, le=bound)} {count}")
+                lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_labels(key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+def _labels(key: tuple, **extra) -> str:
+    items = list(key) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Trajanje koraka RAG zahteva.", LATENCY_BUCKETS)
+TIME_TO_FIRST_TOKEN = Histogram("rag_time_to_first_token_seconds", "Vreme do prvog tokena odgovora.", LATENCY_BUCKETS)
+GENERATION_SECONDS = Histogram("rag_generation_seconds", "Ukupno trajanje generisanja odgovora.", LATENCY_BUCKETS)
+PROMPT_TOKENS = Histogram("rag_prompt_tokens", "Broj tokena prompta.", TOKEN_BUCKETS)
+COMPLETION_TOKENS = Histogram("rag_completion_tokens", "Broj generisanih tokena.", TOKEN_BUCKETS)
+REQUESTS = Counter("rag_requests_total", "Broj RAG zahteva.")
+ERRORS = Counter("rag_errors_total", "Broj grešaka po koraku.")
+METRICS = [STAGE_SECONDS, TIME_TO_FIRST_TOKEN, GENERATION_SECONDS, PROMPT_TOKENS, COMPLETION_TOKENS, REQUESTS, ERRORS]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def new_request(kind: str) -> str:
+    """Otvara novi zahtev: dodeljuje request_id koji se pojavljuje u svim log redovima."""
+    request_id = uuid.uuid4().hex[:12]
+    _request_id.set(request_id)
+    REQUESTS.inc(kind=kind)
+    return request_id
+
+
+@contextmanager
+def span(name: str, **fields):
+    """Meri trajanje koraka; u bloku se mogu dodati polja: `with span("x") as s: s["chunks"] = 5`."""
+    attributes = dict(fields)
+    start_time = time.perf_counter()
+    try:
+        yield attributes
+    except Exception as e:
+        ERRORS.inc(stage=name)
+        log_event("span_error", logging.ERROR, span=name, error=str(e), **attributes)
+        raise
+    finally:
+        duration = time.perf_counter() - start_time
+        STAGE_SECONDS.observe(duration, stage=name)
+        log_event("span", span=name, duration_ms=round(duration * 1000, 2), **attributes)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int | None = None):
+    """Pokreće /metrics endpoint u pozadinskoj niti (samo jednom po procesu, i kad Streamlit ponovo pokrene skriptu)."""
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                log_event("metrics_server_error", logging.WARNING, port=port, error=str(e))
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            log_event("metrics_server_started", port=port)
+    return _server
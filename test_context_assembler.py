@@ -0,0 +1,51 @@
+# test_context_assembler.py (Spajanje, deduplikacija i budžet konteksta)
+#
+# Pokretanje: python -m pytest -q
+
+import config
+from context_assembler import assemble_context, estimate_tokens
+
+
+class FakeDocument:
+    def __init__(self, text: str, **metadata):
+        self.page_content = text
+        self.metadata = metadata
+
+
+TEXT = "Sud je usvojio tužbeni zahtev. Tuženi je dužan da plati naknadu štete. Troškove snosi tuženi."
+
+
+def test_adjacent_chunks_are_merged_by_offsets():
+    left = FakeDocument(TEXT[:50], source_file="a.docx", char_start=0, char_end=50)
+    right = FakeDocument(TEXT[40:], source_file="a.docx", char_start=40, char_end=len(TEXT))
+    context, blocks, stats = assemble_context([(left, 0.9), (right, 0.8)], 1000)
+    assert len(blocks) == 1
+    assert context == f"[Izvor: a.docx]\n{TEXT}"
+    assert stats["input_chunks"] == 2 and stats["output_blocks"] == 1
+
+
+def test_overlapping_chunks_without_offsets_are_merged_by_text():
+    left = FakeDocument(TEXT[:80], source_file="a.docx")
+    right = FakeDocument(TEXT[30:], source_file="a.docx")
+    _, blocks, _ = assemble_context([(left, 0.9), (right, 0.8)], 1000)
+    assert [block["text"] for block in blocks] == [TEXT]
+
+
+def test_near_duplicate_from_other_source_is_dropped():
+    original = FakeDocument(TEXT, source_file="a.docx")
+    # Ista presuda u drugom fajlu, na drugom pismu
+    copy = FakeDocument("Суд је усвојио тужбени захтев. Тужени је дужан да плати накнаду штете. Трошкове сноси тужени.",
+                        source_file="kopija.docx")
+    _, blocks, stats = assemble_context([(original, 0.9), (copy, 0.8)], 1000)
+    assert [block["source"] for block in blocks] == ["a.docx"]
+    assert stats["deduplicated_blocks"] == 1
+
+
+def test_context_respects_token_budget():
+    texts = [" ".join(f"Predmet {i}, rečenica {j} o činjenicama slučaja." for j in range(30)) for i in range(5)]
+    docs = [(FakeDocument(text, source_file=f"{i}.docx"), 1.0 - i / 10) for i, text in enumerate(texts)]
+    budget = 2 * estimate_tokens(texts[0]) + config.CONTEXT_MIN_BLOCK_TOKENS
+    context, blocks, stats = assemble_context(docs, budget)
+    assert stats["output_tokens"] <= budget + len(blocks)
+    assert [block["source"] for block in blocks][:2] == ["0.docx", "1.docx"]
+    assert len(blocks) < len(docs)
@@ -0,0 +1,77 @@
+# test_conversation.py (Prepoznavanje nastavka razgovora)
+#
+# Pokretanje: python -m pytest -q
+
+from conversation import ConversationSession, is_follow_up, continues_session, condense_question
+
+HISTORY = [
+    {"role": "user", "content": "Kakva je presuda u predmetu P. 1234/2019 za naknadu štete?"},
+    {"role": "assistant", "content": "Tužbeni zahtev je usvojen ..."},
+]
+CONTEXT_VECTOR = [1.0, 0.0, 0.0]
+
+
+class FakeDocument:
+    def __init__(self, doc_id: str):
+        self.metadata = {"_id": f"point-{doc_id}", "doc_id": doc_id}
+
+
+def session_with_context() -> ConversationSession:
+    session = ConversationSession()
+    session.remember("Tužbeni zahtev za naknadu štete je usvojen.", [
+        {"text": "Tužbeni zahtev za naknadu štete je usvojen.", "source": "a.docx", "start": 0, "end": 40,
+         "docs": [FakeDocument("doc-a")]},
+    ])
+    session.anchor_question = HISTORY[0]["content"]
+    return session
+
+
+def embed_documents(texts: list[str]) -> list[list[float]]:
+    return [CONTEXT_VECTOR for _ in texts]
+
+
+def test_explicit_follow_up_signals():
+    assert is_follow_up("A šta je sud odlučio o tome?", HISTORY)
+    assert is_follow_up("Ko je bio njegov advokat?", HISTORY)
+    assert is_follow_up("Pa kolika je naknada?", HISTORY)
+
+
+def test_standalone_questions_are_not_follow_ups():
+    # Kratko pitanje bez signala, i duže pitanje sa čestom zamenicom "to"
+    assert not is_follow_up("Zastarelost potraživanja?", HISTORY)
+    assert not is_follow_up("Koja je kazna za krađu i kako se to primenjuje u praksi sudova?", HISTORY)
+    # Novi broj predmeta je nova tema, i bez istorije nema nastavka
+    assert not is_follow_up("A u predmetu K. 56/2020?", HISTORY)
+    assert not is_follow_up("A šta je sud odlučio o tome?", [])
+
+
+def test_follow_up_confirmed_by_similarity_to_session_blocks():
+    session = session_with_context()
+    related = continues_session(session, "A šta je sud odlučio o tome?", HISTORY,
+                                lambda text: [0.9, 0.1, 0.0], embed_documents)
+    assert related
+    assert session.block_vectors == [CONTEXT_VECTOR]
+    assert condense_question("A šta je sud odlučio o tome?", HISTORY, session.anchor_question).startswith("Kakva je presuda")
+
+
+def test_unrelated_follow_up_starts_fresh_search():
+    session = session_with_context()
+    assert not continues_session(session, "A šta je sud odlučio o tome?", HISTORY,
+                                 lambda text: [0.0, 0.0, 1.0], embed_documents)
+
+
+def test_changed_facets_start_fresh_search():
+    session = session_with_context()
+    session.facets = {"judge": "Petrović"}
+    assert not continues_session(session, "A šta je sud odlučio o tome?", HISTORY,
+                                 lambda text: CONTEXT_VECTOR, embed_documents, facets={"judge": "Jovanović"})
+    assert continues_session(session, "A šta je sud odlučio o tome?", HISTORY,
+                             lambda text: CONTEXT_VECTOR, embed_documents, facets={"judge": "Petrović", "court": ""})
+
+
+def test_remember_resets_cached_block_vectors():
+    session = session_with_context()
+    continues_session(session, "A šta je sud odlučio o tome?", HISTORY, lambda text: CONTEXT_VECTOR, embed_documents)
+    session.remember("Novi kontekst.", [])
+    assert session.block_vectors is None
+    assert session.doc_ids == []
@@ -0,0 +1,45 @@
+# test_dedup.py (MinHash potpisi, LSH klasteri i union-find)
+#
+# Pokretanje: python -m pytest -q
+
+import config
+from dedup import MinHasher, UnionFind, chunk_hash, estimated_jaccard, find_clusters
+
+BASE = " ".join(f"Sud je utvrdio činjenicu broj {i} na osnovu iskaza svedoka i veštaka." for i in range(20))
+
+
+def test_near_duplicates_cluster_and_different_documents_do_not():
+    hasher = MinHasher()
+    other = " ".join(f"Tužilac je podneo žalbu na rešenje o troškovima postupka, stav {i}." for i in range(20))
+    signatures = [hasher.signature(BASE), hasher.signature(BASE + " Dodata rečenica."), hasher.signature(other)]
+    assert estimated_jaccard(signatures[0], signatures[1]) >= config.DEDUP_THRESHOLD
+    union_find = find_clusters(signatures, config.DEDUP_BANDS, config.DEDUP_THRESHOLD)
+    assert union_find.find(0) == union_find.find(1)
+    assert union_find.find(2) == 2
+
+
+def test_signature_ignores_script_and_diacritics():
+    hasher = MinHasher()
+    latin = BASE.replace("činjenicu", "cinjenicu")
+    assert estimated_jaccard(hasher.signature(BASE), hasher.signature(latin)) == 1.0
+
+
+def test_short_documents_get_no_signature_and_stay_alone():
+    hasher = MinHasher()
+    signatures = [hasher.signature(""), hasher.signature("PRESUDA"), hasher.signature("Rešenje"), hasher.signature(BASE)]
+    assert signatures[:3] == [None, None, None]
+    union_find = find_clusters(signatures, config.DEDUP_BANDS, config.DEDUP_THRESHOLD)
+    assert [union_find.find(index) for index in range(4)] == [0, 1, 2, 3]
+
+
+def test_union_find_keeps_smallest_index_as_root():
+    union_find = UnionFind(4)
+    union_find.union(3, 2)
+    union_find.union(2, 1)
+    assert {union_find.find(index) for index in (1, 2, 3)} == {1}
+    assert union_find.find(0) == 0
+
+
+def test_chunk_hash_ignores_case_and_whitespace():
+    assert chunk_hash("Član 5.\n  Stav 1") == chunk_hash("član 5. stav 1")
+    assert chunk_hash("Član 5.") != chunk_hash("Član 6.")
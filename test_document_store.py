@@ -0,0 +1,65 @@
+# test_document_store.py (Skladište dokumenata: chunk_refs i vezivanje za kolekciju)
+#
+# Pokretanje: python -m pytest -q
+
+import pytest
+from document_store import DocumentStore
+
+
+def chunk(index: int) -> dict:
+    return {"chunk_index": index, "section_index": 0, "section_type": "obrazlozenje", "char_start": 0, "char_end": 10}
+
+
+def test_point_ids_for_documents_includes_shared_chunks(tmp_path):
+    store = DocumentStore(str(tmp_path / "store.sqlite"))
+    store.add_chunk("h1", "p1", "doc-a", 0)
+    store.add_chunk("h2", "p2", "doc-b", 0)
+    # Chunk h1 je deljen: tačka p1 ima doc_id prvog dokumenta, ali pripada i doc-b
+    store.add_chunk_ref("h1", "doc-a", chunk(0))
+    store.add_chunk_ref("h1", "doc-b", chunk(0))
+    store.add_chunk_ref("h2", "doc-b", chunk(1))
+    store.commit()
+    assert sorted(store.point_ids_for_documents(["doc-b"])) == ["p1", "p2"]
+    assert store.point_ids_for_documents(["doc-a"]) == ["p1"]
+    assert store.point_ids_for_documents(["nepostojeci"]) == []
+    assert len(store.point_ids_for_documents(["doc-a", "doc-b"], limit=1)) == 2
+    store.close()
+
+
+def test_bind_collection_rejects_other_collection(tmp_path):
+    store = DocumentStore(str(tmp_path / "store.sqlite"))
+    store.bind_collection("presude_v1")
+    store.bind_collection("presude_v1")
+    with pytest.raises(ValueError):
+        store.bind_collection("presude_v2")
+    store.close()
+
+
+def test_point_documents_lists_every_referencing_document(tmp_path):
+    store = DocumentStore(str(tmp_path / "store.sqlite"))
+    store.put_document("doc-a", {"source_file": "a.docx"}, [])
+    store.put_document("doc-b", {"source_file": "b.docx"}, [])
+    store.add_chunk("h1", "p1", "doc-a", 0)
+    store.add_chunk_ref("h1", "doc-a", chunk(0))
+    store.add_chunk_ref("h1", "doc-b", chunk(3))
+    store.commit()
+    assert sorted(store.point_documents(["p1"])["p1"]) == [("doc-a", "a.docx"), ("doc-b", "b.docx")]
+    assert store.point_documents(["p2"]) == {}
+    store.close()
+
+
+def test_resolve_collection_follows_alias_to_versioned_store(tmp_path):
+    from qdrant_client import QdrantClient, models
+    from document_store import resolve_collection, store_path_for, versioned_store_path
+
+    client = QdrantClient(":memory:")
+    client.create_collection("presude_v2", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name="presude_v2", alias_name="presude_live"))
+    ])
+    default_path = str(tmp_path / "document_store.sqlite")
+    DocumentStore(versioned_store_path("presude_v2", default_path)).close()
+    assert resolve_collection(client, alias="presude_live", default_collection="presude_live") == ("presude_live", "presude_v2")
+    assert resolve_collection(client, alias="presude_v2", default_collection="presude_v2") == ("presude_v2", "presude_v2")
+    _, target = resolve_collection(client, alias="presude_live", default_collection="presude_live")
+    assert store_path_for(target, default_path) == versioned_store_path("presude_v2", default_path)
@@ -0,0 +1,105 @@
+# test_extract_and_structure.py (Streaming ekstrakcija .docx fajlova)
+#
+# Pokretanje: python -m pytest -q
+
+import io
+import zipfile
+import config
+from extract_and_structure import iter_docx_paragraphs, extract_and_clean_document
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def table(rows: list[list[str]]) -> str:
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(f"<w:tc>{paragraph(cell)}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    ) + "</w:tbl>"
+
+
+def write_docx(path, body: str, header: str | None = None) -> str:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W}><w:body>{body}<w:sectPr/></w:body></w:document>")
+        if header is not None:
+            archive.writestr("word/header1.xml", f"<w:hdr {W}>{paragraph(header)}</w:hdr>")
+    return str(path)
+
+
+def test_iter_docx_paragraphs_keeps_order_tabs_breaks_and_table_cells():
+    xml = (f"<w:document {W}><w:body>"
+           '<w:p><w:r><w:t>A</w:t><w:tab/><w:t>B</w:t><w:br/><w:t>C</w:t></w:r></w:p>'
+           "<w:p/>"
+           + table([["x1", "y"], ["1", "2"]]) +
+           '<w:p><w:r><w:delText>obrisano</w:delText><w:t>kraj</w:t></w:r></w:p>'
+           "</w:body></w:document>")
+    items = list(iter_docx_paragraphs(io.BytesIO(xml.encode("utf-8"))))
+    assert items == ["A\tB\nC", ["x1", "y"], ["1", "2"], "kraj"]
+
+
+def test_text_box_is_read_once_from_alternate_content():
+    mc = ('xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+          'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" xmlns:v="urn:schemas-microsoft-com:vml"')
+    text_box = f"<w:txbxContent>{paragraph('TEKST U OKVIRU')}</w:txbxContent>"
+    xml = (f"<w:document {W} {mc}><w:body>"
+           f"<w:p><w:r><w:t>Pre okvira</w:t></w:r><w:r><mc:AlternateContent>"
+           f"<mc:Choice Requires=\"wps\"><w:drawing><wps:txbx>{text_box}</wps:txbx></w:drawing></mc:Choice>"
+           f"<mc:Fallback><w:pict><v:textbox>{text_box}</v:textbox></w:pict></mc:Fallback>"
+           f"</mc:AlternateContent></w:r></w:p>"
+           + paragraph("Posle okvira") +
+           "</w:body></w:document>")
+    items = list(iter_docx_paragraphs(io.BytesIO(xml.encode("utf-8"))))
+    assert items == ["TEKST U OKVIRU", "Pre okvira", "Posle okvira"]
+
+
+def test_table_separator_survives_yuscii_decoding(tmp_path):
+    path = write_docx(tmp_path / "plata.docx", paragraph("Tabela plata") + table([["Plata", "1000"], ["Ne}emo", "5"]]))
+    text, _ = extract_and_clean_document(path)
+    assert "Plata | 1000" in text.splitlines()
+    assert "Nećemo | 5" in text.splitlines()
+
+
+def test_header_text_and_boilerplate_are_removed(tmp_path):
+    path = write_docx(tmp_path / "zaglavlje.docx",
+                      paragraph("Advokatska kancelarija") + paragraph("Tekst presude") + paragraph("Sva prava zadržana."),
+                      header="Advokatska kancelarija")
+    text, _ = extract_and_clean_document(path)
+    assert text == "Tekst presude"
+
+
+def test_judge_is_found_in_tail_of_long_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EXTRACTION_METADATA_WINDOW_CHARS", 200)
+    monkeypatch.setattr(config, "EXTRACTION_METADATA_TAIL_CHARS", 200)
+    body = (paragraph("PRESUDA") + paragraph("Datum presude: 12.3.2005.")
+            + "".join(paragraph(f"Obrazloženje, stav {i}.") for i in range(200))
+            + paragraph("Sudija: Petar Petrović"))
+    path = write_docx(tmp_path / "duga.docx", body)
+    _, metadata = extract_and_clean_document(path)
+    assert metadata["judge"] == "Petar Petrović"
+    assert metadata["decision_date"] == "12.3.2005."
+    assert metadata["document_type"] == "PRESUDA"
+
+
+def test_full_extraction_replaces_facet_rows(tmp_path):
+    from facets import FacetStore
+    from extract_and_structure import process_docx_files
+
+    docx_dir = tmp_path / "docx"
+    docx_dir.mkdir()
+    write_docx(docx_dir / "a.docx", paragraph("PRESUDA") + paragraph("Sudija: Petar Petrović"))
+    facets_path = str(tmp_path / "facets.sqlite")
+    stale = FacetStore(facets_path)
+    stale.put({"source_file": "obrisan.docx", "metadata": {}})
+    stale.commit()
+    stale.close()
+
+    process_docx_files(str(docx_dir), str(tmp_path / "corpus.jsonl"), facets_path)
+    store = FacetStore(facets_path, readonly=True)
+    assert store.group_by("judge") == [("Petar Petrović", 1)]
+    store.close()
+
+    # Bez tabele faseta (facets_path=None) se ništa ne upisuje
+    process_docx_files(str(docx_dir), str(tmp_path / "corpus.jsonl"), None)
+    assert (tmp_path / "corpus.jsonl").read_text(encoding="utf-8").count("\n") == 1
@@ -0,0 +1,57 @@
+# test_facets.py (Tabela faseta: normalizacija datuma, filteri, grupisanje)
+#
+# Pokretanje: python -m pytest -q
+
+from facets import FacetStore, date_bound, normalize_date
+
+
+def record(source_file: str, date: str, court: str, judge: str, document_type: str = "PRESUDA") -> dict:
+    return {"source_file": source_file, "case_id": source_file.split(".")[0],
+            "metadata": {"decision_date": date, "court": court, "judge": judge, "document_type": document_type}}
+
+
+def make_store(tmp_path) -> FacetStore:
+    store = FacetStore(str(tmp_path / "facets.sqlite"))
+    store.put(record("a.docx", "12.3.2005.", "Osnovni sud u Novom Sadu", "Petar Petrović"))
+    store.put(record("b.docx", "1. 7. 2005", "Основни суд у Новом Саду", "Петар Петровић", "REŠENJE"))
+    store.put(record("c.docx", "2011-01-20", "Viši sud u Beogradu", "Jovan Jovanović"))
+    store.put(record("d.docx", "nepoznato", "Viši sud u Beogradu", "Nepoznato"))
+    store.commit()
+    return store
+
+
+def test_normalize_date_and_bounds():
+    assert normalize_date("12.3.2005.") == "2005-03-12"
+    assert normalize_date("12. 03. 2005") == "2005-03-12"
+    assert normalize_date("2005-3-12") == "2005-03-12"
+    assert normalize_date("31.13.2005") is None
+    assert date_bound("2005") == "2005-01-01"
+    assert date_bound("2005", upper=True) == "2005-12-31"
+
+
+def test_group_by_merges_scripts_and_skips_unknown(tmp_path):
+    store = make_store(tmp_path)
+    assert dict(store.group_by("judge")) == {"Petar Petrović": 2, "Jovan Jovanović": 1, None: 1}
+    assert dict(store.group_by("year")) == {2005: 2, 2011: 1, None: 1}
+    store.close()
+
+
+def test_filters_and_timeline(tmp_path):
+    store = make_store(tmp_path)
+    assert len(store.doc_ids({"judge": "petrovic", "date_from": "2005", "date_to": "2005"})) == 2
+    assert len(store.doc_ids({"court": "beograd", "document_type": "presuda"})) == 2
+    assert store.doc_ids({"date_from": "2006"}) == store.doc_ids({"court": "Viši sud", "date_to": "2020"})
+    assert store.timeline("year") == [("2005", 2), ("2011", 1)]
+    assert store.timeline("month", {"court": "novom sadu"}) == [("2005-03", 1), ("2005-07", 1)]
+    store.close()
+
+
+def test_put_replaces_and_delete_removes(tmp_path):
+    store = make_store(tmp_path)
+    doc_id = store.doc_ids({"judge": "jovanovic"})[0]
+    store.put(record("c.docx", "2012-01-20", "Viši sud u Beogradu", "Jovan Jovanović"))
+    assert store.count() == 4
+    assert store.timeline("year", {"judge": "jovanovic"}) == [("2012", 1)]
+    store.delete(doc_id)
+    assert store.count() == 3
+    store.close()
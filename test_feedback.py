@@ -0,0 +1,61 @@
+# test_feedback.py (Log ocena i BoostTable)
+#
+# Pokretanje: python -m pytest -q
+
+import json
+from feedback import BoostTable, record_feedback
+
+
+def test_refresh_reads_only_new_lines(tmp_path):
+    log_path = str(tmp_path / "feedback.jsonl")
+    record_feedback("p1", ["1", "2"], ["doc-a"], "odgovor", rating=1, log_path=log_path)
+    table = BoostTable(log_path, cache_path=None)
+    assert table.refresh() == 1
+    offset = table.offset
+    assert table.refresh() == 0 and table.offset == offset
+    record_feedback("p2", ["2"], ["doc-a"], "odgovor", rating=-1, log_path=log_path)
+    record_feedback("p3", [], [], "odgovor", correction="ispravka", log_path=log_path)
+    assert table.refresh() == 2
+    assert table.point_scores == {"1": 1, "2": 0}
+    assert table.doc_scores == {"doc-a": 0}
+
+
+def test_unfinished_last_line_waits_for_next_refresh(tmp_path):
+    log_path = tmp_path / "feedback.jsonl"
+    line = json.dumps({"point_ids": ["7"], "doc_ids": [], "rating": 1})
+    log_path.write_text(line[:10], encoding="utf-8")
+    table = BoostTable(str(log_path), cache_path=None)
+    assert table.refresh() == 0 and table.offset == 0
+    log_path.write_text(line + "\n", encoding="utf-8")
+    assert table.refresh() == 1
+    assert table.point_scores == {"7": 1}
+
+
+def test_replaced_log_is_read_from_start(tmp_path):
+    log_path = tmp_path / "feedback.jsonl"
+    cache_path = str(tmp_path / "boosts.json")
+    record_feedback("p1", ["1"], [], "odgovor", rating=1, log_path=str(log_path))
+    BoostTable(str(log_path), cache_path).refresh()
+    # Novi proces nastavlja od keširanog offset-a; log iste dužine, ali drugog sadržaja, se čita ispočetka
+    log_path.write_text(log_path.read_text(encoding="utf-8").replace('"1"', '"9"'), encoding="utf-8")
+    record_feedback("p2", ["2"], [], "odgovor", rating=1, log_path=str(log_path))
+    table = BoostTable(str(log_path), cache_path)
+    assert table.offset > 0
+    table.refresh()
+    assert table.point_scores == {"9": 1, "2": 1}
+
+
+def test_apply_moves_rated_point_up(tmp_path):
+    class FakeDocument:
+        def __init__(self, point_id):
+            self.metadata = {"_id": point_id, "doc_id": f"doc-{point_id}"}
+
+    log_path = str(tmp_path / "feedback.jsonl")
+    for _ in range(3):
+        record_feedback("p", ["c"], [], "odgovor", rating=1, log_path=log_path)
+    table = BoostTable(log_path, cache_path=None)
+    scored = [(FakeDocument(point_id), 1.0 - rank / 10) for rank, point_id in enumerate("abcdefghij")]
+    reordered = table.apply(scored)
+    assert [doc.metadata["_id"] for doc, _ in reordered][:4] == ["c", "a", "b", "d"]
+    # Skorovi se ne menjaju, samo redosled
+    assert dict((doc.metadata["_id"], score) for doc, score in reordered)["c"] == 0.8
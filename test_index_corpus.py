@@ -0,0 +1,65 @@
+# test_index_corpus.py (Deljeni chunk-ovi i payload posle ponovnog indeksiranja)
+#
+# Pokretanje: python -m pytest -q (preskače se bez sentence-transformers)
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from qdrant_client import QdrantClient
+from benchmark import StubEmbeddingModel
+from document_store import DocumentStore, document_id
+from index_corpus import index_documents, remove_documents, setup_qdrant_collection
+from legal_chunker import LegalChunker
+
+PARAGRAPHS = [f"Paragraf {i} opisuje činjenice slučaja i iskaz svedoka broj {i} pred sudom." for i in range(1, 4)]
+
+
+def document(header: str) -> dict:
+    return {"source_file": "a.docx", "full_text": "\n".join([header, *PARAGRAPHS]), "metadata": {}}
+
+
+def test_reindexed_document_with_shifted_text_refreshes_payload_offsets(tmp_path):
+    client = QdrantClient(":memory:")
+    setup_qdrant_collection(client, "presude")
+    store = DocumentStore(str(tmp_path / "store.sqlite"))
+    embedding_model = StubEmbeddingModel()
+    chunker = LegalChunker(max_tokens=15, overlap_tokens=0, length_function=lambda text: len(text.split()))
+
+    index_documents([document("Zaglavlje presude osnovnog suda")], client, "presude", store, embedding_model, chunker, slim_payload=True, verbose=False)
+    # Isti chunk-ovi na istim rednim brojevima, ali pomereni duljim zaglavljem
+    shifted = document("Zaglavlje presude osnovnog suda koje je sada mnogo duže, jer ima slucaja.")
+    index_documents([shifted], client, "presude", store, embedding_model, chunker, slim_payload=True, verbose=False)
+
+    points, _ = client.scroll("presude", limit=100, with_payload=True)
+    texts = {shifted["full_text"][p.payload["metadata"]["char_start"]:p.payload["metadata"]["char_end"]] for p in points}
+    assert set(PARAGRAPHS) <= texts
+    store.close()
+
+
+class FailingEmbeddingModel(StubEmbeddingModel):
+    def encode(self, texts, **kwargs):
+        raise RuntimeError("embedding pao")
+
+
+def test_failed_indexing_is_cleaned_up_without_touching_shared_chunks(tmp_path):
+    client = QdrantClient(":memory:")
+    setup_qdrant_collection(client, "presude")
+    store = DocumentStore(str(tmp_path / "store.sqlite"))
+    chunker = LegalChunker(max_tokens=15, overlap_tokens=0, length_function=lambda text: len(text.split()))
+    index_documents([document("Zaglavlje presude osnovnog suda")], client, "presude", store, StubEmbeddingModel(), chunker,
+                    slim_payload=True, verbose=False)
+    points_before = client.count("presude").count
+
+    # Drugi dokument deli paragrafe sa prvim; embedovanje njegovih novih chunk-ova pada posle potvrđene pripreme
+    failing = {"source_file": "b.docx", "full_text": "\n".join(["Rešenje višeg suda u drugom predmetu", *PARAGRAPHS]), "metadata": {}}
+    with pytest.raises(RuntimeError):
+        index_documents([failing], client, "presude", store, FailingEmbeddingModel(), chunker, slim_payload=True, verbose=False)
+    store.rollback()
+    remove_documents(client, "presude", store, [document_id(failing)], slim=True)
+
+    assert store.get_document(document_id(failing)) is None
+    assert client.count("presude").count == points_before
+    points, _ = client.scroll("presude", limit=100, with_payload=True)
+    assert {p.payload["metadata"]["ref_count"] for p in points} == {1}
+    store.close()
@@ -0,0 +1,43 @@
+# test_legal_chunker.py (Podela po pravnoj strukturi)
+#
+# Pokretanje: python -m pytest -q
+
+from legal_chunker import LegalChunker
+
+DOCUMENT = """OSNOVNI SUD U NOVOM SADU
+Tužilac: Petar Petrović
+P R E S U D U
+Usvaja se tužbeni zahtev.
+O b r a z l o ž e n j e
+Tužilac je tražio naknadu štete. Sud je izveo dokaze.
+Član 154.
+Ko drugome prouzrokuje štetu dužan je naknaditi je.
+POUKA O PRAVNOM LEKU: žalba u roku od 15 dana."""
+
+
+def test_sections_follow_legal_structure():
+    chunker = LegalChunker(max_tokens=500)
+    chunks, sections = chunker.split_with_sections(DOCUMENT)
+    assert [section["section_type"] for section in sections] == ["zaglavlje", "izreka", "obrazlozenje", "clan", "pouka"]
+    assert {chunk["section_type"] for chunk in chunks} == {"zaglavlje", "izreka", "obrazlozenje", "clan", "pouka"}
+
+
+def test_chunks_are_exact_slices_of_the_text():
+    chunker = LegalChunker(max_tokens=12, overlap_tokens=0)
+    chunks = chunker.split(DOCUMENT)
+    assert len(chunks) > 5
+    for chunk in chunks:
+        assert DOCUMENT[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
+        assert chunker.length_function(chunk["text"]) <= 12
+
+
+def test_document_without_decision_is_single_body_section():
+    _, sections = LegalChunker().split_with_sections("Ugovor o zakupu.\nZakupac plaća kiriju.")
+    assert [section["section_type"] for section in sections] == ["telo"]
+
+
+def test_long_sentence_is_cut_into_windows():
+    text = "Stavka " * 400
+    chunks = LegalChunker(max_tokens=50, overlap_tokens=0).split(text)
+    assert len(chunks) > 1
+    assert "".join(chunk["text"] for chunk in chunks) == text.rstrip("\n")
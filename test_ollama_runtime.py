@@ -0,0 +1,42 @@
+# test_ollama_runtime.py (Opcije modela i keep-warm ping)
+#
+# Pokretanje: python -m pytest -q
+
+import threading
+from ollama_runtime import KeepWarm, ollama_options, parse_keep_alive
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.called = threading.Event()
+
+    def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        self.called.set()
+        return {"response": ""}
+
+
+def test_keep_warm_ping_uses_same_runner_options_as_queries():
+    client = FakeClient()
+    options = ollama_options(num_ctx=4096, num_thread=8)
+    keep_warm = KeepWarm(client, "model", options, "30m", interval_s=60)
+    keep_warm.start()
+    assert client.called.wait(5)
+    keep_warm.stop()
+    ping_call = client.calls[0]
+    assert ping_call["prompt"] == ""
+    # Pravi upit (RAGAgent.stream_ask) šalje options=self.ollama_options; ping mora isto
+    assert ping_call["options"]["num_ctx"] == options["num_ctx"] == 4096
+    assert ping_call["options"]["num_thread"] == options["num_thread"] == 8
+    assert ping_call["keep_alive"] == "30m"
+
+
+def test_ollama_options_skips_server_defaults():
+    assert ollama_options(num_ctx=2048, num_thread=0, num_predict=0) == {"num_ctx": 2048}
+
+
+def test_parse_keep_alive():
+    assert parse_keep_alive("-1") == -1
+    assert parse_keep_alive("0") == 0
+    assert parse_keep_alive("1h") == "1h"
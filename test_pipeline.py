@@ -0,0 +1,48 @@
+# test_pipeline.py (Tabela poslova protočne obrade)
+#
+# Pokretanje: python -m pytest -q
+
+from pipeline import JobQueue
+
+
+def test_jobs_move_through_stages(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    assert queue.add("a.doc", "convert")
+    assert not queue.add("a.doc", "convert")
+    queue.add("b.docx", "extract", docx_path="b.docx")
+    assert [job["source_path"] for job in queue.claim("convert", 5)] == ["a.doc"]
+    assert queue.claim("convert") == []
+    queue.advance("a.doc", "extract", docx_path="a.docx")
+    jobs = queue.claim("extract", 5)
+    assert {job["docx_path"] for job in jobs} == {"a.docx", "b.docx"}
+    for job in jobs:
+        queue.advance(job["source_path"], "index", record='{"full_text": "..."}')
+    assert queue.pending_count("index") == 2
+    for job in queue.claim("index", 5):
+        queue.advance(job["source_path"], "done")
+    assert queue.counts() == {"done": 2}
+    assert queue.is_idle()
+    queue.close()
+
+
+def test_failed_job_is_retried_then_marked_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2)
+    queue.add("a.doc", "convert")
+    queue.claim("convert")
+    queue.fail("a.doc", "soffice pao")
+    job = queue.claim("convert")[0]
+    assert job["attempts"] == 1
+    queue.fail("a.doc", "soffice pao")
+    assert queue.counts() == {"failed": 1}
+    queue.close()
+
+
+def test_running_jobs_are_requeued_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    queue.add("a.doc", "convert")
+    queue.claim("convert")
+    queue.close()
+    queue = JobQueue(path)
+    assert queue.pending_count("convert") == 1
+    queue.close()
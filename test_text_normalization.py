@@ -0,0 +1,29 @@
+# test_text_normalization.py (Kanonsko pismo i ključevi bez dijakritika)
+#
+# Pokretanje: python -m pytest -q
+
+from text_normalization import canonical_text, canonical_value, fold_key
+
+
+def test_canonical_text_transliterates_cyrillic_and_ligatures():
+    assert canonical_text("Ђорђевић Љубомир") == "Đorđević Ljubomir"
+    assert canonical_text("ЉУБА ЊЕГОШ") == "LJUBA NJEGOŠ"
+    assert canonical_text("ǉubav i ǌiva") == "ljubav i njiva"
+
+
+def test_canonical_text_is_idempotent_and_keeps_ascii():
+    text = "Presuda P. 123/2019"
+    assert canonical_text(text) is text
+    assert canonical_text(canonical_text("Суд у Бечеју")) == "Sud u Bečeju"
+
+
+def test_fold_key_matches_across_scripts_and_diacritics():
+    assert fold_key("Ђорђевић") == fold_key("Djordjevic") == "djordjevic"
+    assert fold_key("  Osnovni   SUD\nu Beogradu ") == "osnovni sud u beogradu"
+    assert fold_key("") == ""
+
+
+def test_canonical_value_handles_lists_and_other_types():
+    assert canonical_value(["Суд", "sud"]) == ["Sud", "sud"]
+    assert canonical_value(None) is None
+    assert canonical_value(5) == 5
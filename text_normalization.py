@@ -0,0 +1,64 @@
+# text_normalization.py (Kanonsko pismo i ključevi bez dijakritika)
+#
+# Arhiva meša ćirilicu i latinicu, a posle YUSCII dekodiranja neki tekstovi
+# imaju i Unicode ligature (ǉ, ǌ, ǆ) umesto dva slova. Ako se to ne ujednači,
+# isto ime daje različite vektore, a leksička poređenja promašuju.
+#
+# canonical_text: sve u latinicu (jedan str.translate prolaz), koristi se pri
+# ekstrakciji, indeksiranju i za upite, pa se svaki chunk embeduje jednom, a
+# upit na bilo kom pismu pogađa iste tačke.
+# fold_key: kanonski tekst, mala slova i bez dijakritika (č/ć -> c, đ -> dj, ...),
+# za poređenja i grupisanje gde "Djordjevic" i "Ђорђевић" treba da budu isto.
+
+import re
+import unicodedata
+
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "ђ": "đ", "е": "e", "ж": "ž", "з": "z", "и": "i",
+    "ј": "j", "к": "k", "л": "l", "љ": "lj", "м": "m", "н": "n", "њ": "nj", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "ћ": "ć", "у": "u", "ф": "f", "х": "h", "ц": "c", "ч": "č", "џ": "dž", "ш": "š",
+    "А": "A", "Б": "B", "В": "V", "Г": "G", "Д": "D", "Ђ": "Đ", "Е": "E", "Ж": "Ž", "З": "Z", "И": "I",
+    "Ј": "J", "К": "K", "Л": "L", "Љ": "Lj", "М": "M", "Н": "N", "Њ": "Nj", "О": "O", "П": "P", "Р": "R",
+    "С": "S", "Т": "T", "Ћ": "Ć", "У": "U", "Ф": "F", "Х": "H", "Ц": "C", "Ч": "Č", "Џ": "Dž", "Ш": "Š",
+}
+# Unicode ligature za dvoslovna slova (pojavljuju se posle konverzije starih kodnih strana)
+LIGATURES = {
+    "Ǆ": "DŽ", "ǅ": "Dž", "ǆ": "dž", "Ǉ": "LJ", "ǈ": "Lj", "ǉ": "lj", "Ǌ": "NJ", "ǋ": "Nj", "ǌ": "nj",
+}
+CANONICAL_TABLE = str.maketrans({**CYRILLIC_TO_LATIN, **LIGATURES})
+FOLD_TABLE = str.maketrans({
+    "č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "dj",
+    "Č": "c", "Ć": "c", "Š": "s", "Ž": "z", "Đ": "dj",
+})
+# "ЉУБА" -> "LjUBA" posle prevođenja; u reči pisanoj velikim slovima i drugo slovo treba da bude veliko
+UPPER_DIGRAPH_PATTERN = re.compile(r"(Lj|Nj|Dž)(?=[A-ZČĆŽŠĐ])")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def canonical_text(text: str) -> str:
+    """Ćirilica i ligature u latinicu (NFC oblik). Idempotentno; ASCII tekst se vraća odmah."""
+    if not text or text.isascii():
+        return text
+    text = unicodedata.normalize("NFC", text).translate(CANONICAL_TABLE)
+    if "Lj" in text or "Nj" in text or "Dž" in text:
+        text = UPPER_DIGRAPH_PATTERN.sub(lambda match: match.group(1).upper(), text)
+    return text
+
+
+def fold_key(text: str) -> str:
+    """Ključ za poređenje: kanonsko pismo, mala slova, bez dijakritika, sažete beline."""
+    if not text:
+        return ""
+    text = canonical_text(text).translate(FOLD_TABLE).lower()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def canonical_value(value):
+    """canonical_text za metapodatke (tekst ili lista tekstova); ostale vrednosti se ne menjaju."""
+    if isinstance(value, str):
+        return canonical_text(value)
+    if isinstance(value, list):
+        return [canonical_value(item) for item in value]
+    return value